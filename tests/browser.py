@@ -0,0 +1,893 @@
+# -*- coding: utf-8 -*-
+"""
+	A simulated browser for running the Vi services outside of Pyodide.
+
+	It provides the modules the services import (flare, flare.html5, flare.network, pyodide),
+	with an event loop running in virtual time. XMLHttpRequests are sent for real to the
+	stand-in server (see standin.py), but their answers are delivered by the loop after the
+	latency reported by the server plus the transfer time of the simulated network, with
+	progress events in between. Aborting a request stops its download where it is.
+
+	The NetworkService mirrors the one of flare: it POSTs its parameters as form data, fetches
+	an skey for secure requests, retries requests failing with status 0 or -1 and reports
+	failures without a failure handler to its defaultFailureHandler.
+
+	The other parts of flare, the widgets above all, are stubs (see Stub), so that the Vi
+	widgets can be imported and their request handling driven without a DOM.
+"""
+import copy
+import heapq
+import http.client
+import importlib.abc
+import importlib.util
+import itertools
+import json
+import sys
+import types
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+
+class Loop(object):
+	"""
+		Event loop in virtual time; time() returns the virtual time in seconds.
+	"""
+
+	def __init__(self):
+		super(Loop, self).__init__()
+		self.now = 1000.0
+		self.events = []
+		self.counter = itertools.count()
+		self.cancelled = set()
+
+	def time(self):
+		return self.now
+
+	perf_counter = monotonic = time
+
+	def call(self, delay, callback, *args):
+		"""
+			Calls 'callback' after 'delay' seconds; returns an id for cancel().
+		"""
+		eventId = next(self.counter)
+		heapq.heappush(self.events, (self.now + max(delay, 0), eventId, callback, args))
+		return eventId
+
+	def cancel(self, eventId):
+		self.cancelled.add(eventId)
+
+	def run(self, until=None, limit=100000):
+		"""
+			Runs the events due until 'until' (absolute virtual time), or until none are left.
+		"""
+		while self.events and limit:
+			when, eventId, callback, args = self.events[0]
+			if until is not None and when > until:
+				break
+
+			heapq.heappop(self.events)
+			if eventId in self.cancelled:
+				self.cancelled.discard(eventId)
+				continue
+
+			self.now = max(self.now, when)
+			callback(*args)
+			limit -= 1
+
+		if until is not None:
+			self.now = max(self.now, until)
+
+	def advance(self, seconds):
+		self.run(self.now + seconds)
+
+
+class Network(object):
+	"""
+		The simulated connection: round trip time, download and upload rate, and statistics.
+	"""
+
+	def __init__(self):
+		super(Network, self).__init__()
+		self.server = None  # (host, port) of the stand-in
+		self.rtt = 0.02  # seconds
+		self.downloadRate = 1024 * 1024  # bytes per second
+		self.uploadRate = 1024 * 1024
+		self.chunk = 16 * 1024  # bytes between progress events
+		self.crossOrigin = ["storage.test"]  # hosts served by the stand-in as other origin
+		self.reset()
+
+	def reset(self):
+		self.requests = []  # XMLHttpRequests sent
+		self.bytesReceived = 0
+		self.bytesSent = 0
+
+	@property
+	def aborted(self):
+		return [xhr for xhr in self.requests if xhr.isAborted]
+
+
+class Event(object):
+	def __init__(self, type, target=None, loaded=0, total=0, data=None):
+		super(Event, self).__init__()
+		self.type = type
+		self.target = target
+		self.loaded = loaded
+		self.total = total
+		self.lengthComputable = bool(total)
+		self.data = data
+
+
+class EventTarget(object):
+	def __init__(self):
+		super(EventTarget, self).__init__()
+		self.listeners = {}
+
+	def addEventListener(self, type, callback, *args):
+		self.listeners.setdefault(type, []).append(callback)
+
+	def removeEventListener(self, type, callback, *args):
+		if callback in self.listeners.get(type, []):
+			self.listeners[type].remove(callback)
+
+	def dispatch(self, event):
+		handler = getattr(self, "on" + event.type, None)
+		if handler:
+			handler(event)
+
+		for callback in self.listeners.get(event.type, [])[:]:
+			callback(event)
+
+
+class Blob(object):
+	def __init__(self, data=b"", type=""):
+		super(Blob, self).__init__()
+		self.data = data
+		self.type = type
+
+	@classmethod
+	def new(cls, parts=(), type="", **kwargs):
+		return cls(b"".join(part.data if isinstance(part, Blob) else (part.encode("utf-8") if isinstance(part, str) else bytes(part))
+							for part in parts), type)
+
+	@property
+	def size(self):
+		return len(self.data)
+
+	def slice(self, start=0, end=None, *args):
+		return Blob(self.data[start:end], self.type)
+
+
+class File(Blob):
+	def __init__(self, name, data, type="application/octet-stream", lastModified=0):
+		super(File, self).__init__(data, type)
+		self.name = name
+		self.lastModified = lastModified
+
+
+class FormData(object):
+	def __init__(self):
+		super(FormData, self).__init__()
+		self.fields = []
+
+	@classmethod
+	def new(cls, *args):
+		return cls()
+
+	def append(self, name, value, filename=None):
+		self.fields.append((name, value, filename))
+
+	def get(self, name):
+		for field in self.fields:
+			if field[0] == name:
+				return field[1]
+
+		return None
+
+	def encode(self):
+		"""
+			Returns the body and its content type, as the browser sends them.
+		"""
+		if not any(isinstance(value, Blob) for name, value, filename in self.fields):
+			return urlencode([(name, value) for name, value, filename in self.fields]).encode("utf-8"), \
+				"application/x-www-form-urlencoded"
+
+		boundary = uuid.uuid4().hex
+		body = b""
+
+		for name, value, filename in self.fields:
+			body += b"--%s\r\n" % boundary.encode("ascii")
+
+			if isinstance(value, Blob):
+				filename = filename or getattr(value, "name", "blob")
+				body += ('Content-Disposition: form-data; name="%s"; filename="%s"\r\n' % (name, filename)).encode("utf-8")
+				body += b"Content-Type: " + (value.type or "application/octet-stream").encode("utf-8") + b"\r\n\r\n"
+				body += value.data
+			else:
+				body += ('Content-Disposition: form-data; name="%s"\r\n\r\n' % name).encode("utf-8")
+				body += str(value).encode("utf-8")
+
+			body += b"\r\n"
+
+		return body + b"--%s--\r\n" % boundary.encode("ascii"), "multipart/form-data; boundary=%s" % boundary
+
+
+class XMLHttpRequest(EventTarget):
+	"""
+		Sends the request to the stand-in at once, and delivers the answer in virtual time.
+	"""
+
+	def __init__(self):
+		super(XMLHttpRequest, self).__init__()
+		self.readyState = 0
+		self.status = 0
+		self.responseText = ""
+		self.withCredentials = False
+		self.upload = EventTarget()
+		self.requestHeaders = {}
+		self.responseHeaders = {}
+		self.events = []
+		self.received = 0
+		self.isAborted = False
+		self.onreadystatechange = None
+		self.isOpaque = False  # sent by fetch() without CORS
+
+	@classmethod
+	def new(cls):
+		return cls()
+
+	def open(self, method, url, *args):
+		self.method = method.upper()
+		self.url = url
+		self.readyState = 1
+
+	def setRequestHeader(self, name, value):
+		self.requestHeaders[name] = value
+
+	def getResponseHeader(self, name):
+		for key, value in self.responseHeaders.items():
+			if key.lower() == name.lower():
+				return value
+
+		return None
+
+	def send(self, payload=None):
+		network = browser.network
+		browser.network.requests.append(self)
+
+		if isinstance(payload, FormData):
+			body, contentType = payload.encode()
+			self.requestHeaders.setdefault("Content-Type", contentType)
+		elif isinstance(payload, Blob):
+			body = payload.data
+		elif payload is not None:
+			body = str(payload).encode("utf-8")
+		else:
+			body = b""
+
+		self.sent = body
+		network.bytesSent += len(body)
+
+		url = urlsplit(self.url)
+		path = url.path + ("?" + url.query if url.query else "")
+		isCrossOrigin = url.hostname in network.crossOrigin
+
+		status, text, headers = 0, "", {}
+
+		if isCrossOrigin and not self.isOpaque and (self.method not in ["GET", "POST"] or self.upload.listeners
+																	 or "Content-Range" in self.requestHeaders):
+			preflight = self.fetch("OPTIONS", path, b"", {"Origin": "http://vi.test",
+														  "Access-Control-Request-Method": self.method})
+			isAllowed = "Access-Control-Allow-Origin" in preflight[2]
+		else:
+			isAllowed = True
+
+		if isAllowed:
+			status, text, headers = self.fetch(self.method, path, body, self.requestHeaders)
+
+		latency = int(headers.get("X-Stand-In-Latency") or 0) / 1000.0
+		upload = len(body) / float(network.uploadRate)
+		delay = network.rtt + upload + latency
+
+		# Upload progress while the body is sent
+		sent = 0
+		sendable = len(body) if status else len(body) // 2  # a broken connection stops halfway
+		while isAllowed and body and self.upload.listeners and sent < sendable:
+			sent = min(sent + network.chunk, sendable)
+			self.schedule(network.rtt / 2 + upload * sent / len(body),
+						  self.upload.dispatch, Event("progress", self.upload, sent, len(body)))
+
+		if not status:
+			self.schedule(delay, self.finish, 0, "", {})
+			return
+
+		# Download progress, then completion
+		size = len(text.encode("utf-8"))
+		received = 0
+		while received < size:
+			received = min(received + network.chunk, size)
+			self.schedule(delay + received / float(network.downloadRate), self.onChunk, received, size, headers)
+
+		self.schedule(delay + size / float(network.downloadRate), self.finish, status, text, headers)
+
+	def fetch(self, method, path, body, headers):
+		connection = http.client.HTTPConnection(*browser.network.server, timeout=10)
+
+		try:
+			connection.request(method, path, body=body, headers=headers)
+			response = connection.getresponse()
+			return response.status, response.read().decode("utf-8"), dict(response.getheaders())
+		except (ConnectionError, http.client.HTTPException, OSError):
+			return 0, "", {}
+		finally:
+			connection.close()
+
+	def schedule(self, delay, callback, *args):
+		self.events.append(browser.loop.call(delay, callback, *args))
+
+	def onChunk(self, received, size, headers):
+		browser.network.bytesReceived += received - self.received
+		self.received = received
+		self.responseHeaders = headers
+		self.readyState = 3
+		self.dispatch(Event("readystatechange", self))
+		self.dispatch(Event("progress", self, received, size))
+
+	def finish(self, status, text, headers):
+		self.events = []
+		self.status = status
+		self.responseText = text
+		self.responseHeaders = headers
+		self.readyState = 4
+
+		self.dispatch(Event("readystatechange", self))
+		self.dispatch(Event("load" if status else "error", self))
+		self.dispatch(Event("loadend", self))
+
+		if self.upload.listeners:
+			self.upload.dispatch(Event("loadend", self.upload))
+
+	def abort(self):
+		if self.readyState == 4 or self.isAborted:
+			return
+
+		self.isAborted = True
+
+		for eventId in self.events:
+			browser.loop.cancel(eventId)
+
+		self.events = []
+		self.status = 0
+		self.readyState = 4
+		self.dispatch(Event("abort", self))
+		self.dispatch(Event("loadend", self))
+
+
+class Promise(object):
+	"""
+		Settles once, and calls its callbacks by the loop.
+	"""
+
+	def __init__(self):
+		super(Promise, self).__init__()
+		self.state = None  # "resolved" or "rejected"
+		self.value = None
+		self.callbacks = []  # (onResolved, onRejected, next promise)
+
+	def settle(self, state, value):
+		if self.state:
+			return
+
+		self.state = state
+		self.value = value
+
+		for callback in self.callbacks:
+			browser.loop.call(0, self.run, *callback)
+
+	def run(self, onResolved, onRejected, promise):
+		handler = onResolved if self.state == "resolved" else onRejected
+		if not handler:
+			promise.settle(self.state, self.value)
+			return
+
+		try:
+			promise.settle("resolved", handler(self.value))
+		except Exception as e:
+			promise.settle("rejected", e)
+
+	def then(self, onResolved=None, onRejected=None):
+		promise = Promise()
+		self.callbacks.append((onResolved, onRejected, promise))
+
+		if self.state:
+			browser.loop.call(0, self.run, onResolved, onRejected, promise)
+
+		return promise
+
+	def catch(self, onRejected):
+		return self.then(None, onRejected)
+
+
+def fetch(url, options=None):
+	"""
+		Supports mode "no-cors" only: the response is opaque, the promise is rejected on network errors.
+	"""
+	options = options or {}
+	assert options.get("mode") == "no-cors"
+
+	promise = Promise()
+	xhr = XMLHttpRequest()
+	xhr.isOpaque = True
+	xhr.open(options.get("method", "GET"), url)
+	xhr.addEventListener("loadend", lambda event: promise.settle("resolved" if xhr.status else "rejected", None))
+	xhr.send(options.get("body"))
+	return promise
+
+
+class JsObject(object):
+	"""
+		A JsProxy of a message posted by a worker: attributes and items stay proxies until to_py() converts them.
+	"""
+
+	def __init__(self, value):
+		super(JsObject, self).__init__()
+		self.value = value
+
+	@staticmethod
+	def wrap(value):
+		return JsObject(value) if isinstance(value, (dict, list)) else value
+
+	def __getattr__(self, name):
+		value = self.__dict__["value"]
+
+		if isinstance(value, dict) and name in value:
+			return JsObject.wrap(value[name])
+
+		raise AttributeError(name)
+
+	def __getitem__(self, idx):
+		return JsObject.wrap(self.value[idx])
+
+	def __len__(self):
+		return len(self.value)
+
+	def to_py(self):
+		return copy.deepcopy(self.value)
+
+
+class Worker(EventTarget):
+	"""
+		Records the messages posted to it; tests answer them by reply(), or let the worker fail().
+	"""
+	instances = []
+
+	def __init__(self, url):
+		super(Worker, self).__init__()
+		self.url = url
+		self.messages = []
+		self.isTerminated = False
+		Worker.instances.append(self)
+
+	@classmethod
+	def new(cls, url, *args):
+		return cls(url)
+
+	def postMessage(self, message, *args):
+		self.messages.append(message)
+
+	def terminate(self):
+		self.isTerminated = True
+
+	def reply(self, data):
+		browser.loop.call(0, self.dispatch, Event("message", self, data=JsObject(data)))
+
+	def fail(self, message="failed"):
+		event = Event("error", self)
+		event.message = message
+		browser.loop.call(0, self.dispatch, event)
+
+
+class Storage(object):
+	def __init__(self):
+		super(Storage, self).__init__()
+		self.items = {}
+
+	def getItem(self, key):
+		return self.items.get(key)
+
+	def setItem(self, key, value):
+		self.items[key] = str(value)
+
+	def removeItem(self, key):
+		self.items.pop(key, None)
+
+	def clear(self):
+		self.items.clear()
+
+	@property
+	def length(self):
+		return len(self.items)
+
+	def key(self, idx):
+		keys = list(self.items.keys())
+		return keys[idx] if idx < len(keys) else None
+
+
+class Window(EventTarget):
+	def __init__(self):
+		super(Window, self).__init__()
+		self.localStorage = Storage()
+		self.location = types.SimpleNamespace(origin="http://vi.test", href="http://vi.test/vi/")
+		self.XMLHttpRequest = XMLHttpRequest
+		self.fetch = fetch
+		self.FormData = FormData
+		self.Blob = Blob
+		self.Worker = Worker
+		self.OffscreenCanvas = object
+		self.crypto = types.SimpleNamespace(subtle=object())
+		self.Object = types.SimpleNamespace(fromEntries=dict)
+		self.performance = types.SimpleNamespace(now=lambda: browser.loop.now * 1000)
+		self.Date = types.SimpleNamespace(now=lambda: browser.loop.now * 1000)
+		self.URL = types.SimpleNamespace(createObjectURL=lambda obj: "blob:%s" % uuid.uuid4().hex,
+										 revokeObjectURL=lambda url: None)
+
+	def setTimeout(self, callback, ms=0, *args):
+		return browser.loop.call(ms / 1000.0, callback, *args)
+
+	def clearTimeout(self, timerId):
+		browser.loop.cancel(timerId)
+
+	def setInterval(self, callback, ms=0, *args):
+		def tick():
+			callback(*args)
+			state["id"] = browser.loop.call(ms / 1000.0, tick)
+
+		state = {"id": browser.loop.call(ms / 1000.0, tick)}
+		return state
+
+	def requestAnimationFrame(self, callback):
+		return browser.loop.call(1 / 60.0, callback, browser.loop.now * 1000)
+
+
+# Fake modules
+
+class Proxy(object):
+	def __init__(self, callback):
+		super(Proxy, self).__init__()
+		self.callback = callback
+		self.isDestroyed = False
+
+	def __call__(self, *args, **kwargs):
+		assert not self.isDestroyed, "called a destroyed proxy"
+		return self.callback(*args, **kwargs)
+
+	def destroy(self):
+		self.isDestroyed = True
+
+
+def makePyodide():
+	pyodide = types.ModuleType("pyodide")
+	pyodide.create_proxy = Proxy
+	pyodide.create_once_callable = Proxy
+	pyodide.to_js = lambda obj, *args, **kwargs: obj
+	return pyodide
+
+
+class DeferredCall(object):
+	def __init__(self, func, *args, **kwargs):
+		super(DeferredCall, self).__init__()
+		delay = kwargs.pop("_delay", 25)
+		self.func = func
+		self.args = args
+		self.kwargs = kwargs
+		browser.loop.call(delay / 1000.0, self.run)
+
+	def run(self):
+		self.func(*self.args, **self.kwargs)
+
+
+class NetworkService(object):
+	"""
+		Mirrors flare.network.NetworkService.
+	"""
+	prefix = "/vi"
+	host = ""
+	changeListeners = []
+	retryCodes = [0, -1]
+	retryMax = 3
+	retryDelay = 5000
+	failures = []  # requests reported to defaultFailureHandler
+
+	def __init__(self, module, url, params, successHandler, failureHandler, finishedHandler,
+				 modifies, secure, kickoff):
+		super(NetworkService, self).__init__()
+		self.module = module
+		self.url = url
+		self.params = params
+		self.successHandler = [successHandler] if successHandler else []
+		self.failureHandler = [failureHandler] if failureHandler else []
+		self.finishedHandler = [finishedHandler] if finishedHandler else []
+		self.modifies = modifies
+		self.secure = secure
+		self.status = "running"
+		self.result = None
+		self.retryCount = 0
+
+		if kickoff:
+			self.kickoff()
+
+	@staticmethod
+	def request(module, url, params=None, successHandler=None, failureHandler=None,
+				finishedHandler=None, modifies=False, secure=False, kickoff=True, group=None):
+		return NetworkService(module, url, params, successHandler, failureHandler, finishedHandler,
+							  modifies, secure, kickoff)
+
+	@staticmethod
+	def decode(req):
+		return json.loads(req.result)
+
+	@staticmethod
+	def isOkay(req):
+		return True
+
+	@staticmethod
+	def registerChangeListener(listener):
+		if listener not in NetworkService.changeListeners:
+			NetworkService.changeListeners.append(listener)
+
+	@staticmethod
+	def removeChangeListener(listener):
+		if listener in NetworkService.changeListeners:
+			NetworkService.changeListeners.remove(listener)
+
+	@staticmethod
+	def notifyChange(module, **kwargs):
+		for listener in NetworkService.changeListeners[:]:
+			listener.onDataChanged(module, **kwargs)
+
+	@staticmethod
+	def defaultFailureHandler(code, *args, **kwargs):
+		NetworkService.failures.append(code)
+
+	def getUrl(self):
+		if self.module:
+			return "%s/%s/%s" % (self.prefix, self.module, self.url)
+
+		return self.url
+
+	def kickoff(self):
+		self.status = "running"
+
+		if self.secure:
+			self.send("/vi/skey", None, self.onSkey)
+		else:
+			self.doFetch(self.getUrl(), self.params)
+
+	def onSkey(self, text):
+		params = dict(self.params or {})
+		params["skey"] = json.loads(text)
+		self.doFetch(self.getUrl(), params)
+
+	def doFetch(self, url, params):
+		self.send(url, params, self.onCompletion)
+
+	def send(self, url, params, callback):
+		self.xhr = xhr = XMLHttpRequest()
+
+		if params:
+			payload = FormData()
+			for key, value in params.items():
+				for entry in value if isinstance(value, list) else [value]:
+					payload.append(key, entry)
+
+			xhr.open("POST", url)
+		else:
+			payload = None
+			xhr.open("GET", url)
+
+		def onLoadEnd(event):
+			if 200 <= xhr.status < 300:
+				callback(xhr.responseText)
+			else:
+				self.onError(xhr.responseText, xhr.status)
+
+		xhr.addEventListener("loadend", onLoadEnd)
+		xhr.send(payload)
+
+	def onCompletion(self, text):
+		self.result = text
+		self.status = "succeeded"
+
+		for s in self.successHandler:
+			s(self)
+
+		for s in self.finishedHandler:
+			s(self)
+
+		if self.modifies:
+			NetworkService.notifyChange(self.module, key=(self.params or {}).get("key"), action=self.url)
+
+	def onError(self, text, code):
+		if code in self.retryCodes and self.retryCount < self.retryMax:
+			self.retryCount += 1
+			DeferredCall(self.kickoff, _delay=self.retryDelay)
+			return
+
+		self.result = text
+		self.status = "failed"
+
+		if self.failureHandler:
+			for s in self.failureHandler:
+				s(self, code)
+		else:
+			self.defaultFailureHandler(code)
+
+		for s in self.finishedHandler:
+			s(self)
+
+
+class requestGroup(object):
+	def __init__(self, callback=None):
+		super(requestGroup, self).__init__()
+		self.callback = callback
+		self.requests = []
+
+	def addRequest(self, req):
+		self.requests.append(req)
+
+	def call(self):
+		for req in self.requests:
+			req.kickoff()
+
+
+class EventDispatcher(object):
+	def __init__(self, name):
+		super(EventDispatcher, self).__init__()
+		self.name = name
+		self.queue = []
+
+	def register(self, callback, reset=False):
+		self.queue.append(callback)
+
+	def unregister(self, callback):
+		if callback in self.queue:
+			self.queue.remove(callback)
+
+	def fire(self, *args, **kwargs):
+		for callback in self.queue[:]:
+			getattr(callback, "on" + self.name[0].upper() + self.name[1:])(*args, **kwargs)
+
+
+class StubType(type):
+	def __getattr__(cls, name):
+		if name.startswith("__"):
+			raise AttributeError(name)
+
+		return Stub
+
+
+class Stub(object, metaclass=StubType):
+	"""
+		Any class, function or value of flare which isn't simulated: it takes any arguments,
+		and all of its attributes, items and calls are stubs again.
+	"""
+
+	def __init__(self, *args, **kwargs):
+		pass
+
+	def __getattr__(self, name):
+		if name.startswith("__"):
+			raise AttributeError(name)
+
+		return Stub()
+
+	def __call__(self, *args, **kwargs):
+		return Stub()
+
+	def __getitem__(self, key):
+		return Stub()
+
+	def __setitem__(self, key, value):
+		pass
+
+	def __contains__(self, item):
+		return False
+
+	def __iter__(self):
+		return iter([])
+
+
+class StubModule(types.ModuleType):
+	def __getattr__(self, name):
+		if name.startswith("__"):
+			raise AttributeError(name)
+
+		return Stub
+
+
+class StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+	"""
+		Imports every module of flare which isn't simulated as StubModule.
+	"""
+
+	def find_spec(self, name, path, target=None):
+		if name.split(".")[0] == "flare" and name not in sys.modules:
+			return importlib.util.spec_from_loader(name, self, is_package=True)
+
+		return None
+
+	def create_module(self, spec):
+		return StubModule(spec.name)
+
+	def exec_module(self, module):
+		module.__path__ = []
+
+
+def makeFlare():
+	flare = StubModule("flare")
+	flare.__path__ = []
+
+	html5 = StubModule("flare.html5")
+	html5.window = browser.window
+	html5.document = types.SimpleNamespace(createDocumentFragment=Stub)
+
+	network = types.ModuleType("flare.network")
+	network.NetworkService = NetworkService
+	network.DeferredCall = DeferredCall
+	network.requestGroup = requestGroup
+
+	event = types.ModuleType("flare.event")
+	event.EventDispatcher = EventDispatcher
+
+	i18n = types.ModuleType("flare.i18n")
+	i18n.translate = lambda key, fallback=None, **kwargs: (fallback or key).format(**kwargs) if kwargs else (fallback or key)
+
+	config = types.ModuleType("flare.config")
+	config.conf = {}
+
+	utils = types.ModuleType("flare.utils")
+
+	viur = StubModule("flare.viur")
+	viur.__path__ = []
+
+	formatString = types.ModuleType("flare.viur.formatString")
+	formatString.formatString = lambda format, data, *args, **kwargs: format
+
+	flare.html5 = html5
+	flare.network = network
+	flare.event = event
+	flare.i18n = i18n
+	flare.config = config
+	flare.utils = utils
+	flare.viur = viur
+	viur.formatString = formatString
+
+	js = types.ModuleType("js")
+	js.CustomEvent = types.SimpleNamespace(new=lambda *args: None)
+
+	return {"flare": flare, "flare.html5": html5, "flare.network": network,
+			"flare.event": event, "flare.i18n": i18n, "flare.config": config, "flare.utils": utils,
+			"flare.viur": viur, "flare.viur.formatString": formatString, "js": js}
+
+
+class Browser(object):
+	def __init__(self):
+		super(Browser, self).__init__()
+		self.loop = Loop()
+		self.network = Network()
+		self.window = Window()
+
+	def install(self):
+		sys.modules.update(makeFlare())
+		sys.meta_path.insert(0, StubFinder())
+		sys.modules["pyodide"] = makePyodide()
+
+	def reset(self):
+		self.loop.__init__()
+		self.network.reset()
+		self.window.localStorage.clear()
+		NetworkService.changeListeners[:] = []
+		NetworkService.failures[:] = []
+		Worker.instances[:] = []
+
+
+browser = Browser()
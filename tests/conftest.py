@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from browser import browser  # noqa: E402
+from standin import StandInServer  # noqa: E402
+
+browser.install()
+
+# Import the services and widgets without vi/__init__.py, which starts the application,
+# and without vi/widgets/__init__.py, which imports all widgets
+for name in ["vi", "vi.widgets"]:
+	package = types.ModuleType(name)
+	package.__path__ = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), *name.split("."))]
+	sys.modules[name] = package
+
+from vi.config import conf, vi_conf  # noqa: E402
+
+conf.update(vi_conf)
+defaults = dict(conf)
+
+
+@pytest.fixture(autouse=True)
+def freshBrowser():
+	"""
+		Starts every test with the default configuration, an empty browser and fresh service singletons,
+		running in virtual time.
+	"""
+	browser.reset()
+	conf.clear()
+	conf.update(defaults)
+
+	for name, module in list(sys.modules.items()):
+		if not name.startswith("vi.") or module is None:
+			continue
+
+		if getattr(module, "time", None) is time:
+			module.time = browser.loop
+
+		if name.startswith("vi.services."):
+			for value in list(vars(module).values()):
+				if type(value).__module__ == name and not isinstance(value, type):
+					value.__init__()
+
+	yield browser
+
+
+@pytest.fixture
+def server():
+	server = StandInServer()
+	browser.network.server = ("127.0.0.1", server.serve())
+	yield server
+	server.shutdown()
+
+
+@pytest.fixture
+def loop():
+	return browser.loop
+
+
+@pytest.fixture
+def network():
+	return browser.network
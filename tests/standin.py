@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+	A stand-in for the ViUR server and the storage the files are uploaded to.
+
+	It answers what the tests and benchmarks of the Vi services need: skeys, list and view
+	requests of modules with ETag and 304 support, and resumable uploads speaking the
+	protocol of Google Cloud Storage (PUT of Content-Range chunks, 308 with a Range header,
+	status queries by "bytes */<size>").
+
+	Latency and failures are injected per path prefix. The latency is reported in the
+	X-Stand-In-Latency header and applied by the simulated browser in virtual time, so slow
+	servers don't slow the tests down; run standalone, the server sleeps instead:
+
+		python tests/standin.py --port 8080 --latency 300 --fail /vi/file/list=503
+"""
+import argparse
+import email.parser
+import email.policy
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class Request(object):
+	def __init__(self, method, path, query, headers, body):
+		super(Request, self).__init__()
+		self.method = method
+		self.path = path
+		self.query = query
+		self.headers = headers
+		self.body = body
+		self.formLists = dict(self.query)  # name -> all values
+		self.form = self.parseForm()
+
+	def parseForm(self):
+		form = {key: values[-1] for key, values in self.query.items()}
+		contentType = self.headers.get("Content-Type") or ""
+
+		if contentType.startswith("application/x-www-form-urlencoded"):
+			self.formLists.update(parse_qs(self.body.decode("utf-8"), keep_blank_values=True))
+			form.update({key: values[-1] for key, values in self.formLists.items()})
+
+		elif contentType.startswith("multipart/form-data"):
+			msg = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+				b"Content-Type: " + contentType.encode("utf-8") + b"\r\n\r\n" + self.body)
+
+			for part in msg.iter_parts():
+				name = part.get_param("name", header="content-disposition")
+				payload = part.get_payload(decode=True)
+				form[name] = payload if part.get_filename() else payload.decode("utf-8")
+
+		return form
+
+
+class Response(object):
+	def __init__(self, status=200, body=b"", headers=None):
+		super(Response, self).__init__()
+		self.status = status
+		self.body = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+		self.headers = dict(headers or {})
+
+
+class Upload(object):
+	def __init__(self, skel):
+		super(Upload, self).__init__()
+		self.size = None  # known from the first chunk, or the file posted
+		self.skel = skel
+		self.data = b""
+		self.isComplete = False
+		self.puts = 0
+		self.posts = 0
+
+
+class StandInServer(object):
+	"""
+		The state of the stand-in, usable with or without its HTTP server.
+	"""
+
+	def __init__(self):
+		super(StandInServer, self).__init__()
+		self.lock = threading.Lock()
+		self.latency = {}  # path prefix -> ms
+		self.failures = []  # dicts of prefix, method, status, reset, cors, times
+		self.modules = {}  # module -> list of entities
+		self.uploads = {}  # upload id -> Upload
+		self.log = []  # (method, path, status)
+		self.nextKey = 0
+		self.httpd = None
+		self.sleep = False
+
+	# Configuration
+
+	def addModule(self, module, entities):
+		self.modules[module] = [dict(entity) for entity in entities]
+
+	def setLatency(self, prefix, ms):
+		self.latency[prefix] = ms
+
+	def fail(self, prefix, status=None, reset=False, cors=False, times=1, method=None):
+		"""
+			Lets the next 'times' requests to 'prefix' fail with 'status', by a reset connection,
+			or by refusing their CORS preflight.
+		"""
+		self.failures.append({"prefix": prefix, "method": method, "status": status,
+							  "reset": reset, "cors": cors, "times": times})
+
+	def getLatency(self, path):
+		return max([ms for prefix, ms in self.latency.items() if path.startswith(prefix)] or [0])
+
+	def takeFailure(self, method, path, preflight=False):
+		with self.lock:
+			for failure in self.failures:
+				if (failure["times"] and path.startswith(failure["prefix"])
+						and failure["method"] in [None, method] and failure["cors"] == preflight):
+					failure["times"] -= 1
+					return failure
+
+		return None
+
+	def count(self, method=None, prefix=""):
+		return len([True for entry in self.log if method in [None, entry[0]] and entry[1].startswith(prefix)])
+
+	# Dispatching
+
+	def preflight(self, method, path):
+		"""
+			Returns False if the CORS preflight of a cross-origin request is refused.
+		"""
+		return self.takeFailure(method, path, preflight=True) is None
+
+	def handle(self, request):
+		failure = self.takeFailure(request.method, request.path)
+
+		if failure and failure["reset"]:
+			self.log.append((request.method, request.path, 0))
+			return None
+
+		if failure:
+			response = Response(failure["status"], {"error": "injected"})
+		else:
+			response = self.route(request)
+
+		response.headers.setdefault("Content-Type", "application/json")
+		response.headers["X-Stand-In-Latency"] = str(self.getLatency(request.path))
+
+		self.log.append((request.method, request.path, response.status))
+		return response
+
+	def route(self, request):
+		parts = request.path.strip("/").split("/")
+
+		if request.path == "/vi/skey":
+			amount = int(request.form.get("amount") or 0)
+			keys = ["skey%d" % (self.nextKey + i) for i in range(max(amount, 1))]
+			self.nextKey += len(keys)
+			return Response(200, keys if amount else keys[0])
+
+		if parts[0] == "upload" and len(parts) == 2:
+			return self.onUploadChunk(request, parts[1])
+
+		if len(parts) >= 3 and parts[0] == "vi" and parts[1] in self.modules:
+			handler = getattr(self, "on_%s" % parts[2].replace("-", "_"), None)
+			if handler:
+				return handler(request, parts[1], *parts[3:])
+
+		return Response(404, {"error": "not found"})
+
+	def withETag(self, request, body):
+		body = json.dumps(body).encode("utf-8")
+		etag = '"%s"' % hashlib.sha1(body).hexdigest()
+
+		if request.headers.get("If-None-Match") == etag:
+			if request.method in ["GET", "HEAD"]:
+				return Response(304, b"", {"ETag": etag})
+
+			return Response(412, {"error": "precondition failed"}, {"ETag": etag})  # RFC 9110, 13.1.2
+
+		return Response(200, body, {"ETag": etag})
+
+	# Modules
+
+	def on_list(self, request, module, skelType=None):
+		entities = self.modules[module]
+
+		for name, value in request.form.items():
+			if name in ["amount", "cursor", "orderby", "skey", "limit"]:
+				continue
+
+			values = request.formLists.get(name) or [value]
+			entities = [entity for entity in entities if str(entity.get(name)) in values]
+
+		amount = int(request.form.get("amount") or request.form.get("limit") or 30)
+		start = int(request.form.get("cursor") or 0)
+		page = entities[start:start + amount]
+
+		return self.withETag(request, {
+			"action": "list",
+			"skellist": page,
+			"cursor": str(start + amount) if start + amount < len(entities) else None,
+			"structure": [],
+		})
+
+	def on_view(self, request, module, *args):
+		key = args[-1] if args else request.form.get("key")
+
+		for entity in self.modules[module]:
+			if entity.get("key") == key:
+				return self.withETag(request, {"action": "view", "values": entity, "structure": []})
+
+		return Response(404, {"error": "not found"})
+
+	def on_getUploadURL(self, request, module, *args):
+		key = "file%d" % len(self.uploads)
+		self.uploads[key] = Upload({"key": key, "name": request.form.get("fileName"),
+									"mimetype": request.form.get("mimeType"), "parententry": request.form.get("node")})
+
+		return Response(200, {"values": {"uploadKey": key, "uploadUrl": "http://storage.test/upload/%s" % key}})
+
+	def on_add(self, request, module, *args):
+		upload = self.uploads.get(request.form.get("key"))
+
+		if not upload or not upload.isComplete:
+			return Response(400, {"error": "incomplete upload"})
+
+		upload.skel["size"] = str(upload.size)
+		self.modules[module].append(upload.skel)
+		return Response(200, {"action": "addSuccess", "values": upload.skel})
+
+	# Uploads
+
+	def onUploadChunk(self, request, key):
+		upload = self.uploads.get(key)
+		if not upload:
+			return Response(404, {"error": "no such upload"})
+
+		if request.method == "POST":  # the whole file at once
+			upload.posts += 1
+			upload.data = request.form.get("file") or request.body
+			upload.size = len(upload.data)
+			upload.isComplete = True
+			return Response(200, {})
+
+		upload.puts += 1
+		contentRange = request.headers.get("Content-Range") or ""
+		upload.size = int(contentRange.rsplit("/", 1)[1])
+
+		if contentRange.startswith("bytes */"):  # status query
+			pass
+
+		elif contentRange.startswith("bytes "):
+			first = int(contentRange[6:].split("-")[0])
+
+			if first != len(upload.data):
+				return Response(400, {"error": "unexpected offset"})
+
+			upload.data += request.body
+
+		if len(upload.data) >= upload.size:
+			upload.isComplete = True
+			return Response(200, {})
+
+		if not upload.data:
+			return Response(308, b"")
+
+		return Response(308, b"", {"Range": "bytes=0-%d" % (len(upload.data) - 1)})
+
+	# HTTP
+
+	def serve(self, port=0):
+		server = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def log_message(self, *args):
+				pass
+
+			def do(self):
+				url = urlsplit(self.path)
+				body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+				if self.command == "OPTIONS":
+					self.send_response(204)
+					if server.preflight(self.headers.get("Access-Control-Request-Method"), url.path):
+						self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+						self.send_header("Access-Control-Allow-Methods", "GET, POST, PUT")
+						self.send_header("Access-Control-Allow-Headers", "Content-Range, Content-Type")
+					self.end_headers()
+					return
+
+				response = server.handle(Request(self.command, url.path, parse_qs(url.query), self.headers, body))
+
+				if response is None:
+					self.close_connection = True
+					self.connection.shutdown(2)
+					return
+
+				if server.sleep:
+					time.sleep(int(response.headers["X-Stand-In-Latency"]) / 1000.0)
+
+				self.send_response(response.status)
+				self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+				self.send_header("Access-Control-Expose-Headers", "ETag, Range, X-Stand-In-Latency")
+				self.send_header("Content-Length", str(len(response.body)))
+				for name, value in response.headers.items():
+					self.send_header(name, value)
+				self.end_headers()
+				self.wfile.write(response.body)
+
+			do_GET = do_POST = do_PUT = do_OPTIONS = do
+
+		self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+		threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+		return self.httpd.server_address[1]
+
+	def shutdown(self):
+		if self.httpd:
+			self.httpd.shutdown()
+			self.httpd.server_close()
+			self.httpd = None
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Runs the stand-in server of the Vi tests.")
+	parser.add_argument("--port", type=int, default=8080)
+	parser.add_argument("--latency", type=int, default=0, help="latency of every request in ms")
+	parser.add_argument("--fail", action="append", default=[], metavar="PREFIX=STATUS",
+						help="let the next request to PREFIX fail with STATUS, 'reset' or 'cors'")
+	parser.add_argument("--module", action="append", default=[], metavar="NAME=ROWS",
+						help="serve a module with ROWS generated entities")
+	args = parser.parse_args()
+
+	server = StandInServer()
+	server.sleep = True
+	server.setLatency("/", args.latency)
+
+	for spec in args.fail:
+		prefix, how = spec.rsplit("=", 1)
+		if how in ["reset", "cors"]:
+			server.fail(prefix, **{how: True})
+		else:
+			server.fail(prefix, status=int(how))
+
+	for spec in args.module:
+		name, rows = spec.split("=")
+		server.addModule(name, [{"key": "%s%d" % (name, i), "name": "Entry %d" % i} for i in range(int(rows))])
+
+	print("Stand-in server listening on http://127.0.0.1:%d" % server.serve(args.port))
+
+	try:
+		threading.Event().wait()
+	except KeyboardInterrupt:
+		server.shutdown()
+
+
+if __name__ == "__main__":
+	main()
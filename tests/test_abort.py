@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+	Measures what aborting superseded reads saves against a slow server: run with -s to see the numbers.
+"""
+import json
+
+from vi.config import conf
+from vi.services.abort import abortRequest, abortRequests
+from vi.services.scheduler import scheduler
+from vi.services.skeys import skeyPool
+
+
+rows = [{"key": "entry%d" % i, "name": "Entry %d" % i, "descr": "x" * 500} for i in range(1000)]
+
+
+def listRequest(decoded):
+	return scheduler.request("file", "list", {"amount": 1000},
+							 successHandler=lambda req: decoded.append(len(json.loads(req.result)["skellist"])),
+							 failureHandler=lambda req, code: decoded.append(code),
+							 priority="visible", conditional=True)
+
+
+def testSupersededReadsStopTransferring(server, loop, network):
+	server.addModule("file", rows)
+	server.setLatency("/vi/file/list", 300)
+	network.downloadRate = 256 * 1024
+	conf["revalidate"] = False  # transfer every response entirely
+	decoded = []
+
+	# Without aborting, every superseded response is transferred and decoded
+	for i in range(4):
+		listRequest(decoded)
+		loop.advance(0.5)
+
+	loop.run()
+	fullBytes, fullDecoded = network.bytesReceived, len(decoded)
+
+	# A user paging quickly: each request is superseded by the next one after 500 ms
+	network.reset()
+	decoded = []
+	requests = []
+
+	for i in range(4):
+		abortRequests(requests)
+		requests.append(listRequest(decoded))
+		loop.advance(0.5)
+
+	loop.run()
+
+	print("\nabort: %d -> %d bytes transferred, %d -> %d responses decoded"
+		  % (fullBytes, network.bytesReceived, fullDecoded, len(decoded)))
+
+	assert fullDecoded == 4 and decoded == [1000]
+	assert len(network.aborted) == 3
+	assert network.bytesReceived < fullBytes / 2
+	assert not scheduler.running
+
+
+def testAbortedReadIsNotSentWhileQueued(server, loop, network):
+	server.addModule("file", rows[:10])
+	conf["scheduler.maxConcurrent"] = 1
+	decoded = []
+
+	first = listRequest(decoded)
+	second = listRequest(decoded)
+	abortRequest(second)
+	loop.run()
+
+	assert first.status == "succeeded" and decoded == [10]
+	assert len(network.requests) == 1
+
+
+def testAbortedSecureRequestIsNotSentWithItsKey(server, loop, network):
+	server.addModule("file", rows[:10])
+	done = []
+
+	req = skeyPool.request("file", "delete", {"key": "entry1"}, successHandler=done.append)
+	abortRequest(req)
+	loop.run()
+
+	assert not done
+	assert server.count(prefix="/vi/file") == 0
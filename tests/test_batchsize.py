@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import json
+
+from vi.config import conf
+from vi.services.batchsize import BatchSizeController
+from vi.services.scheduler import scheduler
+
+
+rows = [{"key": "entry%d" % i, "name": "Entry %d" % i, "descr": "x" * 1000} for i in range(500)]
+
+
+def learn(loop, batches=6):
+	controller = BatchSizeController("file", conf["batchSize"])
+
+	for i in range(batches):
+		req = scheduler.request("file", "list", {"amount": controller.batchSize},
+								successHandler=lambda req: controller.measure(
+									req, len(json.loads(req.result)["skellist"]), len(req.result), 0))
+		controller.requestStarted(req)
+		loop.run()
+
+	return controller
+
+
+def testHighLatencyDoesNotShrinkTheBatches(server, loop, network):
+	server.addModule("file", rows)
+	server.setLatency("/vi/file/list", 1500)
+	network.downloadRate = 10 * 1024 * 1024
+
+	controller = learn(loop)
+
+	assert controller.latency > conf["batchSize.latencyBudget"]
+	assert controller.batchSize == conf["batchSize.max"]
+
+
+def testSlowTransferShrinksTheBatches(server, loop, network):
+	server.addModule("file", rows)
+	server.setLatency("/vi/file/list", 100)
+	network.downloadRate = 20 * 1024  # about 0.05 s per row
+
+	controller = learn(loop)
+
+	assert 0.05 < controller.latency < 0.2
+	assert 0.04 < controller.transferPerRow < 0.07
+	assert 12 <= controller.batchSize <= 22
+
+
+def testConcurrentBatchesAreMeasuredByTheirOwnStart(loop):
+	controller = BatchSizeController("file", 30)
+	first, second = type("Request", (), {})(), type("Request", (), {})()
+
+	controller.requestStarted(first)
+	loop.advance(0.5)
+	controller.requestStarted(second)
+	loop.advance(0.1)
+
+	controller.measure(second, 30, 3000, 0)
+	controller.measure(first, 30, 3000, 0)
+
+	assert [round(duration, 3) for rows, duration in controller.samples] == [0.1, 0.6]
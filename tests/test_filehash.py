@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from browser import File, Worker
+from vi.config import conf
+from vi.services.filehash import fileHashes
+
+
+def check(file, results):
+	fileHashes.check("file", "node1", file, lambda skel: results.append(("duplicate", skel["key"])),
+					 lambda: results.append(("unique", file.name)))
+
+
+def testFailingWorkerLetsPendingFilesUpload(loop):
+	fileHashes.getIndex("file")["abc"] = {"key": "file0", "node": "node1", "size": 1000}
+	results = []
+
+	check(File("a.bin", b"a" * 1000), results)
+	check(File("b.bin", b"b" * 1000), results)
+	loop.run()
+	assert not results and len(Worker.instances[0].messages) == 2
+
+	Worker.instances[0].fail("crypto.subtle is undefined")
+	loop.run()
+
+	assert results == [("unique", "a.bin"), ("unique", "b.bin")]
+	assert Worker.instances[0].isTerminated and not conf["upload.dedup"]
+
+	check(File("c.bin", b"c" * 1000), results)
+	loop.run()
+
+	assert results[-1] == ("unique", "c.bin")
+	assert len(Worker.instances) == 1
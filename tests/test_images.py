@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import types
+
+from vi.config import conf
+from vi.services.images import imageLoader
+
+
+class Element(object):
+	def __init__(self):
+		super(Element, self).__init__()
+		self.attributes = {}
+
+	def setAttribute(self, name, value):
+		self.attributes[name] = value
+
+	def getAttribute(self, name):
+		return self.attributes.get(name)
+
+	def removeAttribute(self, name):
+		self.attributes.pop(name, None)
+
+
+def widget():
+	return types.SimpleNamespace(element=Element())
+
+
+def testTaskNotCallingDoneFreesItsSlotAfterTheTimeout(loop):
+	conf["images.maxLoading"] = 1
+	started = []
+
+	imageLoader.observe(widget(), lambda done: started.append("lost"))  # never calls done
+	imageLoader.observe(widget(), lambda done: (started.append("second"), done()))
+	loop.advance(1)
+
+	assert started == ["lost"] and imageLoader.running == 1
+
+	loop.advance(conf["images.timeout"])
+
+	assert started == ["lost", "second"] and imageLoader.running == 0
+
+
+def testDoneIsCountedOnce(loop):
+	conf["images.maxLoading"] = 1
+	dones = []
+
+	imageLoader.observe(widget(), dones.append)
+	loop.advance(1)
+	dones[0]()
+	loop.advance(conf["images.timeout"])
+
+	assert imageLoader.running == 0
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+	Counts the skeletons of list responses converted on the main thread when they are decoded
+	by the ingest worker, through the list widgets: run with -s to see the numbers.
+"""
+import json
+from collections import OrderedDict
+
+import pytest
+
+from browser import Stub, Worker
+from vi.config import conf
+from vi.services.ingest import LazySkellist, skelIngest
+from vi.services.store import entityStore
+
+
+class Request(object):
+	def __init__(self, result):
+		super(Request, self).__init__()
+		self.result = result
+
+
+class TextBone(object):
+	def __init__(self, *args, **kwargs):
+		super(TextBone, self).__init__()
+
+	def viewWidget(self, value):
+		return Stub(value)
+
+
+def decodeInWorker(message):
+	"""
+		Answers a message like the worker script does.
+	"""
+	id, text, fields = message
+	data = json.loads(text)
+	skellist = data.pop("skellist")
+	fields = fields or sorted({name for skel in skellist for name in skel})
+	rows, missing = [], {}
+
+	for i, skel in enumerate(skellist):
+		rows.append([skel.get(name) for name in fields])
+		absent = [j for j, name in enumerate(fields) if name not in skel]
+
+		if absent:
+			missing[str(i)] = absent
+
+	return {"id": id, "data": data, "fields": fields, "rows": rows, "missing": missing}
+
+
+def runWithWorker(loop):
+	"""
+		Runs the loop, answering the messages posted to the ingest worker.
+	"""
+	answered = 0
+
+	while True:
+		loop.run()
+
+		if not Worker.instances or answered == len(Worker.instances[0].messages):
+			return
+
+		for message in Worker.instances[0].messages[answered:]:
+			Worker.instances[0].reply(decodeInWorker(message))
+
+		answered = len(Worker.instances[0].messages)
+
+
+def ingest(loop, response, fields=None):
+	received = []
+	projection = type("Projection", (), {"fields": fields})()
+
+	skelIngest.wrap(lambda req: received.append(skelIngest.decode(req)), projection)(Request(json.dumps(response)))
+	runWithWorker(loop)
+	return received[0]
+
+
+def response(rows):
+	return {"action": "list", "cursor": "c1", "structure": [["name", {"type": "str"}]],
+			"skellist": [{"key": "entry%d" % i, "name": "Entry %d" % i, "descr": "x" * 200} for i in range(rows)]}
+
+
+def testSkeletonsAreConvertedWhenUsed(loop):
+	conf["ingest.minBytes"] = 0
+	data = response(3)
+	del data["skellist"][1]["descr"]
+
+	received = ingest(loop, data)
+	skellist = received["skellist"]
+
+	assert received["cursor"] == "c1" and received["structure"] == data["structure"]
+	assert isinstance(skellist, LazySkellist) and skellist.converted == 0
+	assert skellist[1] == data["skellist"][1] and skellist.converted == 1
+
+	skellist[-1]["name"] = "Renamed"
+	assert skellist[2]["name"] == "Renamed"
+	assert skellist[:2] == data["skellist"][:2]
+	assert data["skellist"][:2] + [skellist[2]] == skellist
+
+
+def testSkeletonsCanBeChangedLikeAList(loop):
+	conf["ingest.minBytes"] = 0
+	data = response(4)
+	skellist = ingest(loop, data)["skellist"]
+
+	skellist[1] = {"key": "new"}
+	skellist.insert(0, {"key": "first"})
+	popped = skellist.pop(3)
+	del skellist[-1]
+
+	assert [skel["key"] for skel in skellist] == ["first", "entry0", "new"]
+	assert popped == data["skellist"][2]
+	assert skellist.index(skellist[2]) == 2
+
+
+def testProjectedFieldsAreKeptOnly(loop):
+	conf["ingest.minBytes"] = 0
+
+	skellist = ingest(loop, response(2), fields={"key", "name"})["skellist"]
+
+	assert list(skellist) == [{"key": "entry0", "name": "Entry 0"}, {"key": "entry1", "name": "Entry 1"}]
+
+
+# The list widgets
+
+rows = [{"key": "entry%d" % i, "name": "Entry %d" % i, "descr": "x" * 500} for i in range(300)]
+
+
+@pytest.fixture
+def makeList(server, monkeypatch):
+	from vi.widgets import list as listModule
+
+	server.addModule("file", rows)
+	conf["ingest.minBytes"] = 0
+	monkeypatch.setattr(listModule, "BoneSelector",
+						type("BoneSelector", (), {"select": staticmethod(lambda *args: TextBone)}))
+
+	def makeList(widgetClass):
+		conf["modules"] = {"file": {"handler": "list", "name": "File"}}
+		widget = widgetClass("file", batchSize=30, autoload=False)
+		widget.table.table = Stub()  # the grid
+		widget.viewStructure = OrderedDict([("key", {"visible": False, "type": "key"}),
+											("name", {"visible": True, "type": "str"})])
+		return widget
+
+	return makeList
+
+
+def storedRows():
+	return len([key for key in entityStore.entries if key[0] == "file"])
+
+
+def testListConvertsTheRowsItRenders(makeList, loop, monkeypatch):
+	from vi.widgets.list import ListWidget
+
+	skellists = []
+	decode = skelIngest.decode
+	monkeypatch.setattr(skelIngest, "decode", lambda req: skellists.append(decode(req)["skellist"]) or {
+		"skellist": skellists[-1], "cursor": json.loads(req.result)["cursor"]})
+
+	widget = makeList(ListWidget)
+	widget.reloadData()
+	runWithWorker(loop)
+	widget.onNextBatchNeeded()
+	runWithWorker(loop)
+
+	converted = sum(skellist.converted for skellist in skellists)
+	print("\ningest, list: %d rows received, %d converted on the main thread, %d rendered"
+		  % (sum(map(len, skellists)), converted, widget.table.getRowCount()))
+
+	assert widget.table.getRowCount() == 60
+	assert converted == 60  # each once, by the table
+	assert storedRows() == 60
+
+
+def testViewportConvertsTheShownPagesOnly(makeList, loop):
+	from vi.widgets.list import ViewportListWidget
+
+	widget = makeList(ViewportListWidget)
+	widget.reloadData()
+	runWithWorker(loop)
+
+	widget.setPage(4)  # walks through pages 2 to 4, which have no cursor checkpoint yet
+	runWithWorker(loop)
+
+	pages = widget._pages
+	print("\ningest, viewport: %d rows received, %d converted on the main thread, %d shown"
+		  % (sum(map(len, pages.values())), sum(page.converted for page in pages.values()),
+			 widget.table.getRowCount()))
+
+	assert widget.currentPage == 5
+	assert {page: skellist.converted for page, skellist in pages.items()} == {1: 30, 2: 0, 3: 0, 4: 0, 5: 30}
+	assert storedRows() == 60
+
+
+def testViewportPatchesPagesFromTheWorker(makeList, loop):
+	from vi.widgets.list import ViewportListWidget
+
+	widget = makeList(ViewportListWidget)
+	widget.reloadData()
+	runWithWorker(loop)
+	widget.setPage(1)
+	runWithWorker(loop)
+
+	widget.onEntryChanged(dict(rows[33], name="Shown"), "edit")  # on the shown page 2
+	widget.onEntryChanged(dict(rows[10], name="Kept"), "edit")  # on page 1, kept in the window
+
+	assert isinstance(widget.table._model, LazySkellist)
+	assert widget.table._model[3]["name"] == "Shown"
+	assert widget._pages[1][10]["name"] == "Kept"
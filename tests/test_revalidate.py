@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import json
+
+from browser import NetworkService
+from vi.config import conf
+from vi.services.http import HTTPRequest, buildFormData, buildUrl
+from vi.services.revalidate import ConditionalRequest, validatorCache
+from vi.services.scheduler import scheduler
+
+
+rows = [{"key": "entry%d" % i, "name": "Entry %d" % i, "descr": "x" * 200} for i in range(50)]
+
+
+def fetch(loop, params=None, **kwargs):
+	results = []
+	req = ConditionalRequest("file", "list", params,
+							 successHandler=lambda req: results.append(("success", NetworkService.decode(req))),
+							 failureHandler=lambda req, code: results.append(("failure", code)),
+							 finishedHandler=lambda req: results.append(("finished", req.status)), **kwargs)
+	loop.run()
+	return req, results
+
+
+def testFirstResponseIsStoredAndRevalidated(server, loop, network):
+	server.addModule("file", rows)
+
+	req, results = fetch(loop, {"amount": 50})
+	assert [result[0] for result in results] == ["success", "finished"]
+	assert len(results[0][1]["skellist"]) == 50
+	assert not req.isCacheHit
+	size = network.bytesReceived
+
+	req, results = fetch(loop, {"amount": 50})
+	assert results[0][1]["skellist"] == rows
+	assert req.isCacheHit
+	assert network.bytesReceived == size  # nothing but the headers
+	assert validatorCache.hits == 1 and validatorCache.bytesSaved > 10000
+	assert server.log[-1] == ("GET", "/vi/file/list", 304)
+
+
+def testChangedResourceIsTransferredAgain(server, loop):
+	server.addModule("file", rows)
+	fetch(loop, {"amount": 50})
+
+	server.modules["file"][0]["name"] = "Renamed"
+	req, results = fetch(loop, {"amount": 50})
+
+	assert not req.isCacheHit
+	assert results[0][1]["skellist"][0]["name"] == "Renamed"
+	assert server.log[-1][2] == 200
+
+
+def testParametersOfRevalidatedReadsAreSentInTheQuery(server, loop):
+	server.addModule("file", rows)
+
+	req, results = fetch(loop, {"amount": 5, "cursor": "10"})
+	assert [entry["key"] for entry in results[0][1]["skellist"]] == ["entry%d" % i for i in range(10, 15)]
+	assert server.log[-1][:2] == ("GET", "/vi/file/list")
+
+
+def testOtherReadsArePostedLikeTheNetworkService(server, loop):
+	server.addModule("file", rows)
+
+	req, results = fetch(loop, {"amount": 5, "cursor": "10"}, revalidate=False)
+	assert [entry["key"] for entry in results[0][1]["skellist"]] == ["entry%d" % i for i in range(10, 15)]
+	assert server.log[-1][:2] == ("POST", "/vi/file/list")
+
+	fetch(loop, revalidate=False)
+	assert server.log[-1][:2] == ("GET", "/vi/file/list")
+
+
+def testEvictedBodyIsFetchedEntirely(server, loop):
+	server.addModule("file", rows)
+	conf["revalidate.maxBytes"] = 20000
+
+	fetch(loop, {"amount": 50})
+	fetch(loop, {"amount": 40})  # pushes the first response out
+	assert len(validatorCache.entries) == 1
+	assert validatorCache.size <= conf["revalidate.maxBytes"]
+
+	req, results = fetch(loop, {"amount": 50})
+	assert results[0][1]["skellist"] == rows
+	assert not req.isCacheHit
+
+
+def testBodiesLargerThanTheBoundAreNotKept(server, loop):
+	server.addModule("file", rows)
+	conf["revalidate.maxBytes"] = 1000
+
+	fetch(loop, {"amount": 50})
+	assert not validatorCache.entries and validatorCache.size == 0
+
+
+def testTransientFailureIsRetriedByTheNetworkService(server, loop):
+	server.addModule("file", rows)
+	server.fail("/vi/file/list", reset=True, times=2)
+
+	req, results = fetch(loop, {"amount": 50})
+
+	assert [result[0] for result in results] == ["success", "finished"]
+	assert results[0][1]["skellist"] == rows
+	assert req.fallback is not None and req.fallback.retryCount == 1
+
+
+def testFailureWithoutHandlerReachesTheDefaultFailureHandler(server, loop):
+	server.addModule("file", rows)
+	server.fail("/vi/file/list", status=500, times=2)
+
+	finished = []
+	req = ConditionalRequest("file", "list", {"amount": 5}, finishedHandler=finished.append)
+	loop.run()
+
+	assert NetworkService.failures == [500]
+	assert finished == [req] and req.status == "failed"
+
+
+def testFailureIsPassedToTheFailureHandler(server, loop):
+	server.addModule("file", rows)
+	server.fail("/vi/file/list", status=403, times=2)
+
+	req, results = fetch(loop, {"amount": 5})
+	assert results == [("failure", 403), ("finished", "failed")]
+	assert not NetworkService.failures
+
+
+def testScheduledReadsAreRevalidated(server, loop):
+	server.addModule("file", rows)
+	results = []
+
+	for i in range(2):
+		scheduler.request("file", "list", {"amount": 10},
+						  successHandler=lambda req: results.append(json.loads(req.result)),
+						  conditional=True)
+		loop.run()
+
+	assert results[0] == results[1]
+	assert [entry[2] for entry in server.log] == [200, 304]
+	assert not scheduler.running
+
+
+def testConditionalPostIsRefusedSoPostedReadsCarryNoValidators(server, loop):
+	server.addModule("file", rows)
+	fetch(loop, {"amount": 5})  # stores the validators
+
+	refused = []
+	HTTPRequest("POST", buildUrl("file", "list"), payload=buildFormData({"amount": 5}),
+				headers=validatorCache.getHeaders(buildUrl("file", "list", {"amount": 5})),
+				callbackFailure=lambda text, code, request: refused.append(code))
+	loop.run()
+	assert refused == [412]
+
+	req, results = fetch(loop, {"amount": 5}, revalidate=False)
+	assert results[0][0] == "success" and not req.isCacheHit
+	assert server.log[-1] == ("POST", "/vi/file/list", 200)
+	assert req.fallback is None  # answered by the first request
+
+
+def testCrossOriginReadsAreNotRevalidated(server, loop, monkeypatch):
+	server.addModule("file", rows)
+	monkeypatch.setattr(NetworkService, "host", "http://storage.test")
+
+	for i in range(2):
+		req, results = fetch(loop, {"amount": 5})
+		assert results[0][0] == "success" and not req.isCacheHit
+
+	assert [entry[:2] for entry in server.log] == [("POST", "/vi/file/list")] * 2
+	assert not validatorCache.entries
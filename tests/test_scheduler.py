@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+	Simulates the request scheduler against a slow stand-in server.
+"""
+from vi.config import conf
+from vi.services.scheduler import scheduler
+
+
+rows = [{"key": "entry%d" % i, "name": "Entry %d" % i} for i in range(10)]
+
+
+def runThroughErrors(loop):
+	"""
+		Runs the loop like a browser, which reports an exception raised by a handler and carries on.
+	"""
+	errors = []
+
+	while loop.events:
+		try:
+			loop.run()
+		except RuntimeError as e:
+			errors.append(e)
+
+	return errors
+
+
+def raiser(req, *args):
+	raise RuntimeError("handler of %s failed" % req.url)
+
+
+def testSlotsAreBoundedAndFreedOnResponse(server, loop):
+	server.addModule("file", rows)
+	server.setLatency("/vi/file/list", 500)
+	done = []
+	busy = []
+	start = loop.now
+
+	for i in range(8):
+		scheduler.request("file", "list", {"amount": i + 1},
+						  successHandler=lambda req: (done.append(req), busy.append(scheduler.getRunning("visible"))))
+
+	loop.run()
+
+	assert len(done) == 8
+	assert max(busy) <= conf["scheduler.slots"]["visible"]
+	assert loop.now - start < 1.5  # two rounds of four requests
+	assert not scheduler.running
+
+
+def testRaisingHandlersFreeTheirSlots(server, loop):
+	server.addModule("file", rows)
+	server.setLatency("/vi/file/list", 500)
+	server.fail("/vi/file/list", status=500, times=4)
+	start = loop.now
+
+	for i in range(8):
+		scheduler.request("file", "list", {"amount": i + 1}, successHandler=raiser, failureHandler=raiser)
+
+	errors = runThroughErrors(loop)
+
+	assert len(errors) == 8
+	assert loop.now - start < 1.5  # not waiting for conf["scheduler.timeout"]
+	assert not scheduler.running and not any(scheduler.queues.values())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from vi.config import conf
+from vi.services.entities import entityLoader
+from vi.services.store import entityStore
+
+
+def testEntriesExpire(loop):
+	entityStore.put("file", {"key": "entry1", "name": "Entry 1"})
+	assert not entityStore.isExpired("file", "entry1")
+
+	loop.advance(conf["entityStore.maxAge"] + 1)
+	assert entityStore.isExpired("file", "entry1")
+	assert entityStore.get("file", "entry1") == {"key": "entry1", "name": "Entry 1"}  # still readable
+	assert entityStore.isExpired("file", "entry2")
+
+
+def testRevalidationNotifiesSubscribers(server, loop):
+	server.addModule("file", [{"key": "entry1", "name": "Renamed"}])
+	entityStore.put("file", {"key": "entry1", "name": "Entry 1"})
+	seen = []
+	entityStore.subscribe("file", "entry1", seen.append)
+
+	entityLoader.load("file", "entry1", lambda values: None, priority="background")
+	loop.run()
+
+	assert seen == [{"key": "entry1", "name": "Renamed"}]
+	assert not entityStore.isExpired("file", "entry1")
+
+
+def testViewsAreBatchedUnlessDisabled(server, loop):
+	server.addModule("file", [{"key": "entry%d" % i, "name": "Entry %d" % i} for i in range(3)])
+	conf["modules"] = {"file": {"batchedView": False}}
+	loaded = []
+
+	for key in ["entry0", "entry1", "entry2"]:
+		entityLoader.load("file", key, loaded.append)
+
+	loop.run()
+	assert len(loaded) == 3 and server.count(prefix="/vi/file/view/") == 3
+
+	conf["modules"] = {"file": {}}
+
+	for key in ["entry0", "entry1", "entry2"]:
+		entityLoader.load("file", key, loaded.append)
+
+	loop.run()
+	assert len(loaded) == 6 and server.count(prefix="/vi/file/list") == 1
+
+
+def testBatchedViewsAreFilteredByTheirKeys(server, loop):
+	server.addModule("file", [{"key": "entry%d" % i, "name": "Entry %d" % i} for i in range(100)])
+	conf["modules"] = {"file": {}}
+	loaded = []
+
+	for key in ["entry50", "entry51", "entry52"]:
+		entityLoader.load("file", key, loaded.append)
+
+	loop.run()
+
+	assert sorted(values["key"] for values in loaded) == ["entry50", "entry51", "entry52"]
+	assert server.count(prefix="/vi/file/list") == 1 and server.count(prefix="/vi/file/view/") == 0
+
+
+def testViewsIgnoredByTheFilterAreFetchedSingly(server, loop):
+	server.addModule("file", [{"key": "entry%d" % i, "name": "Entry %d" % i} for i in range(100)])
+	conf["modules"] = {"file": {"batchedView": "orderby"}}  # not a filter to the stand-in
+	loaded = []
+
+	for key in ["entry1", "entry51", "entry52"]:
+		entityLoader.load("file", key, loaded.append)
+
+	loop.run()
+
+	assert sorted(values["key"] for values in loaded) == ["entry1", "entry51", "entry52"]
+	assert server.count(prefix="/vi/file/list") == 1 and server.count(prefix="/vi/file/view/") == 2
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import json
+
+from vi.services.tabs import tabBus
+
+
+class Message(object):
+	def __init__(self, **kwargs):
+		super(Message, self).__init__()
+		self.data = json.dumps(kwargs)
+
+
+class Channel(object):
+	def __init__(self):
+		super(Channel, self).__init__()
+		self.posted = []
+
+	def postMessage(self, data):
+		self.posted.append(json.loads(data))
+
+
+def testHandlersAreUnregistered():
+	received = []
+	tabBus.on("session", received.append)
+
+	tabBus.onMessage(Message(type="session", userKey="user1"))
+	tabBus.off("session", received.append)
+	tabBus.onMessage(Message(type="session", userKey="user2"))
+
+	assert [msg["userKey"] for msg in received] == ["user1"]
+	assert tabBus.handlers["session"] == []
+
+
+def testOnlyBroadcastChangesArePosted():
+	tabBus.channel = Channel()
+
+	tabBus.onDataChanged("file", broadcast=False)  # e.g. the amount of rows per page
+	tabBus.onDataChanged("file", key="entry1", action="edit")
+	tabBus.onDataChanged("file", events=[{"broadcast": False}, {"key": "entry2", "action": "delete"}])
+	tabBus.onDataChanged("file", key="entry3", action="edit", fromTab="other")  # replayed
+
+	assert [(msg["type"], msg["events"]) for msg in tabBus.channel.posted] == [
+		("change", [{"key": "entry1", "action": "edit"}]),
+		("change", [{"key": "entry2", "action": "delete"}]),
+	]
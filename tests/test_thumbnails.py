@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from browser import Worker
+from vi.config import conf
+from vi.services.thumbnails import thumbnailCache
+from vi.utils import getImagePreview
+
+
+image = {"dlkey": "dl1", "downloadUrl": "/file/download/dl1", "mimetype": "image/jpeg"}
+
+
+def testPreviewUsesTheImageServingUrl():
+	assert getImagePreview(dict(image, serving_url="https://img.test/abc"), True, 150) == "https://img.test/abc=s150-c"
+	assert getImagePreview(dict(image, servingurl="https://img.test/abc"), False, 80) == "https://img.test/abc=s80"
+	assert getImagePreview(image) == "/file/download/dl1"
+
+
+def testThumbnailsAreMadeByTheWorker(loop):
+	urls = []
+	thumbnailCache.load(image, 150, True, urls.append)
+	thumbnailCache.load(image, 150, True, urls.append)
+
+	worker = Worker.instances[0]
+	assert len(worker.messages) == 1
+	assert worker.messages[0][-1] == conf["thumbnails.maxCached"]
+
+	worker.reply({"id": worker.messages[0][0], "blob": object()})
+	loop.run()
+
+	assert len(urls) == 2 and urls[0] and urls[0] == urls[1]
+
+
+def testFailingWorkerAnswersPendingRequestsAndIsDisabled(loop):
+	urls = []
+	thumbnailCache.load(image, 150, True, urls.append)
+	thumbnailCache.load(dict(image, dlkey="dl2"), 150, True, urls.append)
+
+	Worker.instances[0].fail("OffscreenCanvas is not supported")
+	loop.run()
+
+	assert urls == [None, None]
+	assert Worker.instances[0].isTerminated
+	assert not conf["thumbnails.worker"] and not thumbnailCache.isSupported(image)
+
+	thumbnailCache.load(dict(image, dlkey="dl3"), 150, True, urls.append)
+	loop.run()
+
+	assert urls == [None, None, None]
+	assert len(Worker.instances) == 1
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+	Counts the children walked by item lookups and shift-selections of the tree widget,
+	on synthetic wide and deep trees: run with -s to see the numbers.
+"""
+import pytest
+
+from browser import Stub
+from vi.config import conf
+
+counters = {"walked": 0, "parents": 0}
+
+
+class Children(list):
+	"""
+		The children of a list, counting how many of them are walked.
+	"""
+	def __iter__(self):
+		counters["walked"] += len(self)
+		return super(Children, self).__iter__()
+
+	def index(self, *args):
+		counters["walked"] += len(self)
+		return super(Children, self).index(*args)
+
+
+class Ol(object):
+	def __init__(self, parent=None):
+		super(Ol, self).__init__()
+		self._children = Children()
+		self._parent = parent
+		self._isAttached = False
+		self.element = Stub()
+
+	def parent(self):
+		counters["parents"] += 1
+		return self._parent
+
+	def removeChild(self, child):
+		self._children.remove(child)
+		child._parent = None
+
+	def removeAllChildren(self):
+		for child in self._children[:]:
+			self.removeChild(child)
+
+
+class Item(object):
+	def __init__(self, key, sortindex):
+		super(Item, self).__init__()
+		self.data = {"key": key, "sortindex": sortindex}
+		self.ol = Ol(self)
+		self._parent = None
+		self.element = Stub()
+		self.classes = set()
+		self.isExpanded = False
+		self.childrenLoaded = False
+
+	def parent(self):
+		counters["parents"] += 1
+		return self._parent
+
+	def addClass(self, name):
+		self.classes.add(name)
+
+	def removeClass(self, name):
+		self.classes.discard(name)
+
+	def toggleExpand(self):
+		self.isExpanded = not self.isExpanded
+
+
+class Node(Item):
+	def __init__(self, module, skel, structure, tree):
+		super(Node, self).__init__(skel["key"], skel.get("sortindex"))
+		self.data = skel
+
+
+@pytest.fixture
+def tree(server, loop):
+	from vi.widgets.tree import TreeWidget
+
+	server.addModule("file", [])
+	conf["modules"] = {"file": {"handler": "tree", "name": "File"}}
+	tree = TreeWidget("file", rootNode="root")
+	loop.run()
+
+	tree.entryFrame = Ol(tree)
+	tree.selectionAllow = Item
+	tree.selectionMulti = True
+	counters.update(walked=0, parents=0)
+	return tree
+
+
+def insert(tree, node, ol, items):
+	tree.insertSorted(ol, items)
+
+	for item in items:
+		tree.registerItem(item, node)
+
+
+def click(tree, item, shift=False):
+	tree._isShiftPressed = shift
+	tree.extendSelection(item)
+
+
+def testShiftSelectionInAWideTree(tree):
+	items = [Item("entry%d" % i, i) for i in range(5000)]
+	for start in range(0, len(items), 100):
+		insert(tree, "root", tree.entryFrame, items[start:start + 100])
+
+	counters.update(walked=0)
+	click(tree, items[10])
+
+	for i in range(100):
+		click(tree, items[20 + i * 40], shift=True)
+
+	print("\ntree, wide: %d children walked for 101 clicks into %d items" % (counters["walked"], len(items)))
+
+	assert tree.selection == items[20 + 98 * 40:20 + 99 * 40 + 1]  # from the previous click
+	assert [item for item in items if "is-focused" in item.classes] == tree.selection
+	assert counters["walked"] == len(items)  # the positions, once
+
+	# Inserting in front of the clicked items moves them, their positions are found once again
+	insert(tree, "root", tree.entryFrame, [Item("first", -1)])
+	counters.update(walked=0)
+	click(tree, items[30])
+	click(tree, items[33], shift=True)
+
+	assert tree.selection == items[30:34]
+	assert counters["walked"] == len(items) + 1
+
+
+def testLookupAndSelectionInADeepTree(tree):
+	depth, width = 200, 10
+	node, ol, levels = "root", tree.entryFrame, []
+
+	for level in range(depth):
+		items = [Item("entry%d-%d" % (level, i), i) for i in range(width)]
+		insert(tree, node, ol, items)
+		levels.append(items)
+		node, ol = items[0].data["key"], items[0].ol
+
+	counters.update(walked=0, parents=0)
+	item = tree.itemForKey("entry%d-5" % (depth - 1))
+
+	print("\ntree, deep: %d parents visited and %d children walked to find an item at depth %d"
+		  % (counters["parents"], counters["walked"], depth))
+
+	assert item is levels[-1][5]
+	assert tree.parentKeyForKey(item.data["key"]) == "entry%d-0" % (depth - 2)
+	assert counters["walked"] == 0
+	assert counters["parents"] <= 2 * (2 * depth + 1)  # once by itemForKey(), once by parentKeyForKey()
+
+	# Shift-selection within a nested list
+	click(tree, levels[-1][2])
+	click(tree, levels[-1][7], shift=True)
+
+	assert tree.selection == levels[-1][2:8]
+	assert counters["walked"] == width
+
+
+@pytest.mark.parametrize("batchFilter, requests", [("parententry", 2), (None, 4)])
+def testExpandedNodesAreRestoredInBatches(tree, server, loop, batchFilter, requests):
+	server.addModule("file", [{"key": "%s%d" % (parent, i), "parententry": parent, "sortindex": i}
+							  for parent in ["root", "root0", "root1", "root2"] for i in range(3)])
+	conf["tree.restore.batchFilter"] = batchFilter
+	tree.nodeWidget = Node
+	tree.leafWidget = None
+	tree._expandedNodes = {"root0", "root1", "root2"}
+	start = server.count(prefix="/vi/file/list/node")
+
+	tree.reloadData()
+	loop.run()
+
+	assert [item.data["key"] for item in tree.entryFrame._children] == ["root0", "root1", "root2"]
+
+	for item in tree.entryFrame._children:
+		assert item.isExpanded
+		assert [child.data["key"] for child in item.ol._children] == [item.data["key"] + "%d" % i for i in range(3)]
+
+	assert server.count(prefix="/vi/file/list/node") - start == requests  # the root, then its expanded nodes
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from browser import File
+from vi.config import conf
+from vi.services.upload import FileUpload
+
+
+def start(file):
+	results = []
+	progress = []
+	FileUpload("file", "node1", file,
+			   lambda targetKey: results.append(("success", targetKey)),
+			   lambda status: results.append(("failure", status)),
+			   lambda loaded, total: progress.append(loaded))
+	return results, progress
+
+
+def upload(loop, data):
+	results, progress = start(File("test.bin", data))
+	loop.run()
+	return results, progress
+
+
+def testFileIsPostedInOnePiece(server, loop):
+	server.addModule("file", [])
+	data = b"x" * 100000
+
+	results, progress = upload(loop, data)
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].data == data and server.uploads["file0"].posts == 1
+	assert progress[-1] == len(data)
+
+
+def testServerErrorsAreRetriedThenReported(server, loop):
+	server.addModule("file", [])
+	server.fail("/upload/", status=500, times=10)
+
+	results, progress = upload(loop, b"x" * 1000)
+
+	assert results == [("failure", 500)]
+	assert server.count("POST", "/upload/") == 1 + conf["upload.retries"]
+
+
+def testTransientServerErrorIsRetried(server, loop):
+	server.addModule("file", [])
+	server.fail("/upload/", status=503)
+
+	results, progress = upload(loop, b"x" * 1000)
+
+	assert results == [("success", "file0")]
+	assert server.count("POST", "/upload/") == 2
+
+
+def testUploadUrlWithoutCorsIsPostedOpaquely(server, loop):
+	server.addModule("file", [])
+	server.fail("/upload/", cors=True)
+
+	results, progress = upload(loop, b"x" * 1000)
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].isComplete and server.uploads["file0"].posts == 1
+
+
+# Chunked uploads
+
+data = bytes(range(256)) * 1200  # 300 KiB, 5 chunks
+
+
+def chunkedFile():
+	conf["upload.chunkSize"] = 64 * 1024
+	return File("large.bin", data, lastModified=1)
+
+
+def testLargeFileIsPutInChunks(server, loop):
+	server.addModule("file", [])
+
+	results, progress = start(chunkedFile())
+	loop.run()
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].data == data and server.uploads["file0"].puts == 5
+	assert progress == sorted(progress) and progress[-1] == len(data)
+
+
+def testBrokenChunkIsResumed(server, loop):
+	server.addModule("file", [])
+	results, progress = start(chunkedFile())
+
+	while not server.uploads.get("file0") or server.uploads["file0"].puts < 2:
+		loop.run(limit=1)
+
+	server.fail("/upload/", reset=True)
+	loop.run()
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].data == data
+	assert server.count("PUT", "/upload/") == 5 + 2  # the broken chunk, the status query
+
+
+def testFailedPreflightOfTheFirstChunkIsRetriedOnce(server, loop):
+	server.addModule("file", [])
+	server.fail("/upload/", cors=True)  # as if the network failed before anything was sent
+
+	results, progress = start(chunkedFile())
+	loop.run()
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].puts == 5 and server.uploads["file0"].posts == 0
+
+
+def testUploadUrlRefusingChunksGetsTheWholeFile(server, loop):
+	server.addModule("file", [])
+	server.fail("/upload/", cors=True, times=10)
+
+	results, progress = start(chunkedFile())
+	loop.run()
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].data == data
+	assert server.uploads["file0"].puts == 0 and server.uploads["file0"].posts == 1
+
+
+def testBrokenFirstChunkIsNotPostedAsAWhole(server, loop):
+	server.addModule("file", [])
+	server.fail("/upload/", reset=True)  # after sending half of the chunk
+
+	results, progress = start(chunkedFile())
+	loop.run()
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].posts == 0 and server.uploads["file0"].data == data
+
+
+def testUploadContinuesAfterReload(server, loop, network):
+	server.addModule("file", [])
+	results, progress = start(chunkedFile())
+
+	while not server.uploads.get("file0") or server.uploads["file0"].puts < 3:
+		loop.run(limit=1)
+
+	server.fail("/upload/", status=503, times=10)
+	loop.run()
+	assert results == [("failure", 503)]
+
+	# Dropped again after a reload: continues with the fourth chunk
+	server.failures = []
+	sent = network.bytesSent
+	results, progress = start(chunkedFile())
+	loop.run()
+
+	assert results == [("success", "file0")]
+	assert server.uploads["file0"].data == data
+	assert network.bytesSent - sent == len(data) - 3 * conf["upload.chunkSize"]
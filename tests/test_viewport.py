@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+import pytest
+
+from browser import Stub
+from vi.config import conf
+
+rows = [{"key": "entry%d" % i, "name": "Entry %d" % i} for i in range(100)]
+
+
+class TextBone(object):
+	def __init__(self, *args, **kwargs):
+		super(TextBone, self).__init__()
+
+	def viewWidget(self, value):
+		return Stub(value)
+
+
+@pytest.fixture
+def viewport(server, monkeypatch):
+	from vi.widgets import list as listModule
+
+	server.addModule("file", rows)
+	monkeypatch.setattr(listModule, "BoneSelector",
+						type("BoneSelector", (), {"select": staticmethod(lambda *args: TextBone)}))
+
+	conf["modules"] = {"file": {"handler": "list.viewport", "name": "File"}}
+	widget = listModule.ViewportListWidget("file", batchSize=30, autoload=False)
+	widget.table.table = Stub()  # the grid
+	widget.viewStructure = OrderedDict([("key", {"visible": False, "type": "key"}),
+										("name", {"visible": True, "type": "str"})])
+	return widget
+
+
+def testPagesCanBeRequestedBeforeTheFirstLoad(viewport, loop):
+	viewport.onEntryChanged(dict(rows[3], name="Renamed"), "edit")
+	viewport.onNextBatchNeeded()
+	loop.run()
+
+	assert viewport.currentPage == 1 and viewport.table._model[3] == rows[3]
+
+	viewport.setPage(1)
+	loop.run()
+
+	assert viewport.currentPage == 2 and viewport.table._model[0] == rows[30]
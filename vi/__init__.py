@@ -17,6 +17,9 @@ from . import exception
 from .login import LoginScreen
 from .admin import AdminScreen
 from .config import conf
+from .services.scheduler import scheduler
+from .services.store import entityStore
+from .services.tabs import tabBus
 
 from flare.i18n import buildTranslations,translate
 from flare import i18n
@@ -45,9 +48,10 @@ class Application(html5.Div):
 			                               successHandler=self.getVersionSuccess,
 			                               failureHandler=self.startupFailure)
 		else:
-			network.NetworkService.request(None, "/vi/config",
-			                                successHandler=self.getConfigSuccess,
-											failureHandler=self.startupFailure)
+			scheduler.request(None, "/vi/config",
+			                  successHandler=self.getConfigSuccess,
+			                  failureHandler=self.startupFailure,
+			                  priority="interactive", conditional=True, shared=True)
 
 	def getVersionSuccess(self, req):
 		conf["core.version"] = network.NetworkService.decode(req)
@@ -194,6 +198,8 @@ def start():
 	network.NetworkService.host = ""
 	conf["currentLanguage"] = i18n.getLanguage()
 	conf["indexeddb"] = utils.indexeddb("vi-cache")
+	entityStore.restore()
+	tabBus.start()
 
 	preloadIcons()
 
@@ -3,8 +3,9 @@ from flare import html5
 
 from vi.config import conf
 from flare.i18n import translate
-from flare.network import NetworkService,requestGroup,DeferredCall
+from flare.network import NetworkService,DeferredCall
 from vi.priorityqueue import actionDelegateSelector
+from vi.services.skeys import skeyPool
 from vi.widgets.edit import EditWidget
 from flare.button import Button
 from flare.popup import Confirm
@@ -257,9 +258,9 @@ class DeleteAction(Button):
 
 	def doDelete(self, dialog):
 		deleteList = dialog.deleteList
-		agroup = requestGroup( self.allDeletedSuccess )
+		agroup = skeyPool.group( self.allDeletedSuccess )
 		for x in deleteList:
-			NetworkService.request( self.parent().parent().module, "delete", {"key": x, "skelType":"node"}, secure=True,group=agroup)
+			skeyPool.request( self.parent().parent().module, "delete", {"key": x, "skelType":"node"}, group=agroup)
 
 		agroup.call()
 
@@ -295,7 +296,7 @@ class ReloadAction(Button):
 
 	def onClick(self, sender=None):
 		self.addClass("is-loading")
-		NetworkService.notifyChange( self.parent().parent().module )
+		NetworkService.notifyChange( self.parent().parent().module, broadcast = False )
 
 	def resetLoadingState(self):
 		if self.hasClass("is-loading"):
@@ -8,10 +8,12 @@ from vi.config import conf
 from vi.widgets.csvexport import ExportCsvStarter
 from vi.sidebarwidgets.internalpreview import InternalPreview
 from vi.sidebarwidgets.filterselector import FilterSelector
+from vi.services.skeys import skeyPool
+from vi.services.store import entityStore
 from flare.i18n import translate
 from flare.button import Button
-from flare.network import DeferredCall, requestGroup
-import pyodide
+from flare.network import DeferredCall
+import re
 
 """
 	Provides the actions suitable for list applications
@@ -251,13 +253,13 @@ class DeleteAction(Button):
 	def doDelete(self, dialog):
 		deleteList = dialog.deleteList
 
-		agroup = requestGroup(self.allDeletedSuccess)
+		agroup = skeyPool.group(self.allDeletedSuccess)
 
 		for x in deleteList:
-			NetworkService.request(self.parent().parent().module, "delete", {"key": x},
-								   secure=True, modifies=False, group=agroup,
-								   successHandler=self.deletedSuccess,
-								   failureHandler=self.deletedFailed)
+			skeyPool.request(self.parent().parent().module, "delete", {"key": x},
+							 modifies=False, group=agroup,
+							 successHandler=self.deletedSuccess,
+							 failureHandler=self.deletedFailed)
 		agroup.call()
 
 		self.deleteProgressMessage = conf["mainWindow"].log("progress",
@@ -393,12 +395,30 @@ class ListPreviewAction(html5.Span):
 				for k, v in conf["default_params"].items():
 					newUrl = newUrl.replace("{{%s}}" % k, v)
 
-			for k, v in entry.items():
-				newUrl = newUrl.replace("{{%s}}" % k, str(v))
+			target = "%s-%s" % (self.parent().parent().module, entry.get("key"))
 
-			newUrl = newUrl.replace("'", "\\'")
+			# Projected list entries may lack fields used by the url; the window must be opened
+			# within the click event, so it is navigated once the entire entry was fetched.
+			fields = re.findall(r"{{(\w+)}}", newUrl)
+			if any(field not in entry for field in fields):
+				win = html5.window.open("", target)
+			else:
+				win = None
 
-			target = "%s-%s" % (self.parent().parent().module, entry.get("key"))
+			self.parent().parent().requestFullEntry(
+				entry, lambda entry, newUrl=newUrl, target=target, win=win: self.openPreview(entry, newUrl, target, win),
+				fields=fields
+			)
+
+	def openPreview(self, entry, newUrl, target, win=None):
+		for k, v in entry.items():
+			newUrl = newUrl.replace("{{%s}}" % k, str(v))
+
+		newUrl = newUrl.replace("'", "\\'")
+
+		if win:
+			win.location.href = newUrl
+		else:
 			html5.window.open(newUrl, target)
 
 	@staticmethod
@@ -424,6 +444,7 @@ class ListPreviewInlineAction(Button):
 		self["class"] = "bar-item btn btn--small btn--intpreview"
 		self.urls = None
 		self.intPrevActive = False
+		self.subscribedKey = None
 		self.addClass("is-disabled")
 
 	def onAttach(self):
@@ -431,9 +452,15 @@ class ListPreviewInlineAction(Button):
 		self.parent().parent().selectionChangedEvent.register(self)
 
 	def onDetach(self):
+		self.unsubscribe()
 		self.parent().parent().selectionChangedEvent.unregister(self)
 		super(ListPreviewInlineAction, self).onDetach()
 
+	def unsubscribe(self):
+		if self.subscribedKey:
+			entityStore.unsubscribe(self.parent().parent().module, self.subscribedKey, self.showIntPrev)
+			self.subscribedKey = None
+
 	def onSelectionChanged(self, table, selection, *args,**kwargs):
 		# Disallow internal preview in selector mode
 		if self.parent().parent().selectionCallback:
@@ -467,15 +494,30 @@ class ListPreviewInlineAction(Button):
 		intPrevActive = self.intPrevActive
 		selection = self.parent().parent().getCurrentSelection()
 		if len(selection) == 1 and intPrevActive == True:
-			preview = InternalPreview(self.parent().parent().module, self.parent().parent()._structure, selection[0])
-			self.parent().parent().sideBar.sidebarHeadline.element.innerHTML = translate("vi.sidebar.internalpreview")
-
-			self.parent().parent().sideBar.sidebarIcon.prependChild(SvgIcon("icon-list-item"))
-			self.parent().parent().sideBar.setWidget(preview)
+			self.parent().parent().requestFullEntry(selection[0], self.showIntPrev)
 		else:
+			self.unsubscribe()
+
 			if isinstance(self.parent().parent().sideBar.getWidget(), InternalPreview):
 				self.parent().parent().sideBar.setWidget(None)
 
+	def showIntPrev(self, entry):
+		# Selection may have changed while the entire entry was fetched
+		selection = self.parent().parent().getCurrentSelection()
+		if not self.intPrevActive or [x.get("key") for x in selection] != [entry.get("key")]:
+			return
+
+		# Show the entry again whenever another widget loads or saves it
+		self.unsubscribe()
+		self.subscribedKey = entry["key"]
+		entityStore.subscribe(self.parent().parent().module, self.subscribedKey, self.showIntPrev)
+
+		preview = InternalPreview(self.parent().parent().module, self.parent().parent()._structure, entry)
+		self.parent().parent().sideBar.sidebarHeadline.element.innerHTML = translate("vi.sidebar.internalpreview")
+
+		self.parent().parent().sideBar.sidebarIcon.prependChild(SvgIcon("icon-list-item"))
+		self.parent().parent().sideBar.setWidget(preview)
+
 	@staticmethod
 	def isSuitableFor(module, handler, actionName):
 		if module is None or module not in conf["modules"].keys():
@@ -696,7 +738,7 @@ class ReloadAction(Button):
 		event.stopPropagation()
 		event.preventDefault()
 		self.addClass("is-loading")
-		NetworkService.notifyChange(self.parent().parent().module)
+		NetworkService.notifyChange(self.parent().parent().module, broadcast=False)
 
 	def resetLoadingState(self):
 		if self.hasClass("is-loading"):
@@ -837,7 +879,7 @@ class SetPageRowAmountAction(html5.Div):
 
 		amount = int(self.pages["options"].item(self.pages["selectedIndex"]).value)
 		currentModule.setAmount(amount)
-		NetworkService.notifyChange(currentModule.module)
+		NetworkService.notifyChange(currentModule.module, broadcast=False)
 
 	@staticmethod
 	def isSuitableFor(module, handler, actionName):
@@ -923,32 +965,65 @@ actionDelegateSelector.insert(1, LoadNextBatchAction.isSuitableFor, LoadNextBatc
 
 class LoadAllAction(Button):
 	"""
-		Allows Loading all Entries in a list
+		Allows Loading all Entries in a list.
+		While loading, the button shows the progress and cancels the loading when clicked again.
 	"""
 
 	def __init__(self, *args, **kwargs):
 		super(LoadAllAction, self).__init__(translate("Load all"), icon="icon-table")
 		self["class"] = "bar-item btn btn--small btn--loadall"
+		self.isLoading = False
 
 	@staticmethod
 	def isSuitableFor(module, handler, actionName):
 		correctAction = actionName == "loadall"
 		correctHandler = handler == "list" or handler.startswith("list.")
-		return correctAction and correctHandler
+		isViewport = handler == "list.viewport" or handler.startswith("list.viewport.")  # keeps a window of pages
+		return correctAction and correctHandler and not isViewport
+
+	def onAttach(self):
+		super(LoadAllAction, self).onAttach()
+		self.parent().parent().loadAllEvent.register(self)
+
+	def onDetach(self):
+		self.parent().parent().loadAllEvent.unregister(self)
+		super(LoadAllAction, self).onDetach()
 
 	def onClick(self, sender=None):
-		self.addClass("is-loading")
 		currentModule = self.parent().parent()
 
-		if currentModule:
-			currentModule.table._loadOnDisplay = True  # mark to force load whole Dataset
-			html5.window.setTimeout(pyodide.create_once_callable(self.loadAllRows), 500)
+		if not currentModule:
+			return
 
-	def loadAllRows(self):
-		NetworkService.notifyChange(self.parent().parent().module)
+		if self.isLoading:
+			currentModule.cancelLoadAll()
+			return
+
+		self.isLoading = True
+		self.addClass("is-loading")
+		self["text"] = translate("Cancel")
+		currentModule.loadAll()
+
+	def onLoadAllProgress(self, widget, rowCount, rowsPerSecond, stopReason):
+		if stopReason is None:
+			self["text"] = translate(
+				"Cancel ({{rows}} entries, {{rate}}/s)", rows=rowCount, rate=int(rowsPerSecond)
+			)
+			return
+
+		self.isLoading = False
+		self.removeClass("is-loading")
+		self["text"] = translate("Load all")
+
+		if stopReason in ["maxRows", "maxBytes"]:
+			conf["mainWindow"].log(
+				"info",
+				translate("Loading stopped after {{rows}} entries to preserve memory.", rows=rowCount)
+			)
 
 	def resetLoadingState(self):
-		if self.hasClass("is-loading"):
+		# The list resets all actions after each batch; keep the state while loading continues
+		if not self.isLoading and self.hasClass("is-loading"):
 			self.removeClass("is-loading")
 
 
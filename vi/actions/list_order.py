@@ -4,6 +4,7 @@ from flare.button import Button
 from flare.popup import Confirm
 from flare.network import NetworkService
 from vi.priorityqueue import actionDelegateSelector
+from vi.services.skeys import skeyPool
 from vi.config import conf
 from flare.i18n import translate
 
@@ -44,10 +45,10 @@ class ShopMarkAction( Button ):
 				self.isDisabled = True
 
 	def setPayed(self, order ):
-		NetworkService.request( self.parent().parent().module, self.action,
-		                            { "key": order[ "key" ] }, secure=True,
-									successHandler=self.setPayedSucceeded,
-									failureHandler=self.setPayedFailed )
+		skeyPool.request( self.parent().parent().module, self.action,
+		                  { "key": order[ "key" ] },
+		                  successHandler=self.setPayedSucceeded,
+		                  failureHandler=self.setPayedFailed )
 
 	def setPayedSucceeded(self, response):
 		self.done += 1
@@ -2,8 +2,10 @@ from flare import html5
 from flare.popup import Confirm
 from vi.config import conf
 from flare.i18n import translate
-from flare.network import NetworkService,requestGroup,DeferredCall
+from flare.network import NetworkService,DeferredCall
 from vi.priorityqueue import actionDelegateSelector
+from vi.services.skeys import skeyPool
+from vi.services.treecache import treeCache
 from flare.button import Button
 from vi.widgets.edit import EditWidget
 
@@ -295,12 +297,12 @@ class DeleteAction(Button):
 
 	def doDelete(self, dialog):
 		deleteList = dialog.deleteList
-		agroup = requestGroup( self.allDeletedSuccess )
+		agroup = skeyPool.group( self.allDeletedSuccess )
 		for x in deleteList:
 			if isinstance(x,self.parent().parent().nodeWidget ):
-				NetworkService.request( self.parent().parent().module, "delete/node", {"key": x.data["key"]}, secure=True, group=agroup )
+				skeyPool.request( self.parent().parent().module, "delete/node", {"key": x.data["key"]}, group=agroup )
 			elif isinstance(x,self.parent().parent().leafWidget ):
-				NetworkService.request( self.parent().parent().module, "delete/leaf", {"key": x.data["key"]}, secure=True, group=agroup )
+				skeyPool.request( self.parent().parent().module, "delete/leaf", {"key": x.data["key"]}, group=agroup )
 
 		agroup.call()
 		self.deleteProgressMessage = conf["mainWindow"].log("progress", translate("Einträge werden gelöscht... bitte warten"), modul=self.parent().parent().module,
@@ -338,7 +340,7 @@ class ReloadAction(Button):
 
 	def onClick(self, sender=None):
 		self.addClass("is-loading")
-		NetworkService.notifyChange( self.parent().parent().module )
+		NetworkService.notifyChange( self.parent().parent().module, broadcast = False )
 
 	def resetLoadingState(self):
 		if self.hasClass("is-loading"):
@@ -372,9 +374,9 @@ class SelectRootNode(html5.Select):
 			return
 
 		self.removeAllChildren()
-		NetworkService.request(
+		treeCache.requestRootNodes(
 			self.parent().parent().module,
-			"listRootNodes",
+			{},
 			successHandler=self.onRootNodesAvailable
 		)
 
@@ -384,9 +386,8 @@ class SelectRootNode(html5.Select):
 				option["selected"] = True
 				return
 
-	def onRootNodesAvailable(self, req):
+	def onRootNodesAvailable(self, res):
 		self.removeAllChildren()
-		res = NetworkService.decode(req)
 
 		for node in res:
 			option = html5.Option()
@@ -16,6 +16,8 @@ from flare.popup import Popup
 
 from flare.views.helpers import registerViews, generateView, addView, updateDefaultView
 from vi.widgets.appnavigation import AppNavigation
+from vi.services.prefetch import prefetcher
+from vi.services.scheduler import scheduler
 from flare.i18n import translate
 
 # BELOW IMPORTS MUST REMAIN AND ARE QUEUED!!
@@ -67,6 +69,7 @@ class AdminScreen(Screen):
 		self.mainFrame.appendChild(self.viewport)
 
 		self.logWdg = None
+		self.userLoggedOutMsg = None
 
 	def onClick(self, event):
 		if utils.doesEventHitWidgetOrChildren(event, self.modulePipe) and conf["modulepipe"]:
@@ -75,6 +78,9 @@ class AdminScreen(Screen):
 	def reset(self):
 		self.navWrapper.removeAllChildren()
 		self.viewport.removeAllChildren()
+		if self.userLoggedOutMsg:
+			self.userLoggedOutMsg.close()
+			self.userLoggedOutMsg = None
 		if self.logWdg:
 			self.logWdg.reset()
 
@@ -102,9 +108,10 @@ class AdminScreen(Screen):
 		conf["theApp"].login()
 
 	def refresh(self):
-		NetworkService.request(None, "/vi/config",
-									   successHandler=self.refreshConfig,
-									   failureHandler=self.getCurrentUserFailure)
+		scheduler.request(None, "/vi/config",
+						  successHandler=self.refreshConfig,
+						  failureHandler=self.getCurrentUserFailure,
+						  priority="interactive", conditional=True)
 
 	def refreshConfig(self,req):
 		conf["mainConfig"] = NetworkService.decode(req)
@@ -129,6 +136,7 @@ class AdminScreen(Screen):
 		self.initializeViews()
 		self.initializeConfig()
 		DeferredCall(self.checkInitialHash)
+		DeferredCall(prefetcher.prefetchFrequent, _delay=conf["prefetch.historyDelay"])
 		self.unlock()
 
 	def initializeViews(self):
@@ -63,6 +63,114 @@ vi_conf = {
 	# Number of rows to fetch in list widgets
 	"batchSize": 30,
 
+	# Adapt the number of rows per batch to the measured request duration, response size and render time.
+	# A batch is kept within each budget (seconds, bytes, seconds) and the given bounds.
+	"batchSize.adaptive": True,
+	"batchSize.min": 10,
+	"batchSize.max": 99,
+	"batchSize.latencyBudget": 1.0,
+	"batchSize.byteBudget": 256 * 1024,
+	"batchSize.renderBudget": 0.05,
+
+	# Amount of pages a viewport list keeps in memory; others are fetched again by their cursor
+	"viewport.pageWindow": 10,
+
+	# Revalidate reads (lists, tree nodes, structures, config) to the Vi's origin by ETag/Last-Modified of their
+	# previous response; these are sent by GET, as only GET can be answered by 304 Not Modified
+	"revalidate": True,
+	"revalidate.maxEntries": 200,  # responses kept for revalidation
+	"revalidate.maxBytes": 4 * 1024 * 1024,  # total size of the bodies kept
+
+	# Fetch security keys for secure requests in bulk (/vi/skey?amount=n)
+	"skeyPool": True,
+	"skeyPool.maxAmount": 100,  # keys fetched at once
+	"skeyPool.reserve": 5,  # keys fetched in addition to the ones currently needed
+	"skeyPool.maxAge": 600,  # seconds a key is used after it was fetched
+
+	# Concurrent requests issued by the request scheduler, in total and per priority class
+	"scheduler.maxConcurrent": 6,
+	"scheduler.slots": {
+		"interactive": 6,
+		"visible": 4,
+		"prefetch": 1,
+		"background": 1
+	},
+	"scheduler.timeout": 60,  # seconds after which a request not reporting back no longer occupies its slot
+
+	# Prefetch structure and first batch of modules on navigation hover/focus and for the most opened modules
+	"prefetch": True,
+	"prefetch.maxConcurrent": 2,  # simultaneous prefetch requests
+	"prefetch.maxBytes": 2 * 1024 * 1024,  # total amount of prefetched data per session
+	"prefetch.maxAge": 30,  # seconds a prefetched response may be used
+	"prefetch.hoverDelay": 150,  # milliseconds a navigation entry must be hovered
+	"prefetch.historyModules": 3,  # amount of most opened modules prefetched after the start
+	"prefetch.historyDelay": 3000,  # milliseconds after the start
+
+	# Ceilings for loading all entries of a list (amount of rows, approximate response size in bytes)
+	"loadAll.maxRows": 50000,
+	"loadAll.maxBytes": 64 * 1024 * 1024,
+
+	# Collapse view requests for several entries of a module into list requests filtered by a list of keys,
+	# by the given filter parameter. ViUR's KeyBone filters by a list of keys given as "key"; modules
+	# override it by "batchedView" in their adminInfo, False disables it. None disables it for all modules.
+	"entityLoader.filter": "key",
+	"entityLoader.batchSize": 30,  # keys per list request
+
+	# Decode list responses of at least the given size (bytes) in a web worker
+	"ingest.worker": True,
+	"ingest.minBytes": 32 * 1024,
+
+	# Entities kept in the client-side entity store, optionally persisted to the IndexedDB
+	"entityStore.maxEntries": 2000,
+	"entityStore.maxAge": 60,  # seconds until a stored entity is fetched again when read
+	"entityStore.persist": False,
+
+	# Coordinate the Vi tabs of a browser: session polling by one tab, shared structures and config, changes
+	"tabs": True,
+	"tabs.channel": "vi",
+	"tabs.heartbeat": 5,  # seconds between announcements of a tab
+	"tabs.askTimeout": 150,  # milliseconds to wait for another tab to answer a shared read
+	"tabs.sharedMaxAge": 60,  # seconds a response is handed out to other tabs
+	"tabs.sharedMaxEntries": 50,
+
+	# Restore the expanded nodes of trees, also across sessions (localStorage).
+	# The children of several nodes are fetched at once by the filter parameter given here, or by
+	# "batchedChildren" in the adminInfo of a module; None or False loads them node by node. ViUR's
+	# parententry is a KeyBone, filtering by a list of keys; nodes a server leaves empty are loaded once more.
+	"tree.restore.persist": True,
+	"tree.restore.maxPersisted": 500,  # expanded nodes kept per module
+	"tree.restore.batchFilter": "parententry",
+	"tree.restore.batchSize": 30,  # nodes per request
+
+	# Keep the children and root nodes of trees across navigation, revalidated when shown again
+	"treeCache.maxPages": 500,  # pages of children kept over all modules
+	"treeCache.rootNodesMaxAge": 300,  # seconds until cached root nodes are fetched again
+	"treeCache.maxNodes": 5000,  # nodes kept to build breadcrumb paths
+
+	# Uploads of several files at once
+	"upload.concurrency": 4,  # files uploaded in parallel
+	"upload.retries": 2,  # further attempts for a failed file
+	"upload.chunkSize": 8 * 1024 * 1024,  # larger files are uploaded in chunks of this size (multiple of 256 KiB)
+	"upload.sessionMaxAge": 6 * 24 * 60 * 60,  # seconds an interrupted chunked upload can be continued
+	"upload.dedup": True,  # don't upload files again which were uploaded into the same node before
+	"upload.dedup.maxBytes": 256 * 1024 * 1024,  # larger files aren't hashed
+	"upload.dedup.maxHashes": 2000,  # hashes of uploaded files kept per module
+
+	# Scale previews of images without an image serving url down in a web worker, kept in the Cache API
+	"thumbnails.worker": True,
+	"thumbnails.cacheName": "vi-thumbnails",
+	"thumbnails.maxEntries": 1000,  # thumbnails kept as object urls
+	"thumbnails.maxCached": 5000,  # thumbnails kept in the Cache API, the oldest are deleted first
+
+	# Load image previews only once they are scrolled into view
+	"images.lazy": True,
+	"images.rootMargin": "200px",  # distance to the viewport at which loading starts
+	"images.maxLoading": 6,  # images loaded and decoded at a time
+	"images.timeout": 15,  # seconds after which an image still loading frees its slot
+
+	# Only keep the fields of list entries which are shown or referenced by the module configuration
+	"listProjection": True,
+
 	# Show bone names instead of description
 	"showBoneNames": False,
 
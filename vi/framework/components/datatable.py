@@ -644,6 +644,38 @@ class DataTable( html5.Div ):
 		else:
 			raise TypeError("Expected int or dict, got %s" % str(type(objOrIndex)))
 
+	def replace(self, index, obj):
+		"""
+			Replaces the row at 'index' by 'obj' and renders it again.
+		"""
+		obj["_uniqeIndex"] = self._model[index].get("_uniqeIndex")
+		self._model[index] = obj
+		self._renderObject(obj, tableIsPrepared=True, recalculate=True)
+
+	def insert(self, index, obj):
+		"""
+			Inserts 'obj' as row at 'index'. Other rows keep their rendered cells.
+		"""
+		obj["_uniqeIndex"] = self._modelIdx
+		self._modelIdx += 1
+		self._model.insert(index, obj)
+		self._renderedModel.insert(index, {})
+
+		self.rebuildTable(recalculate=False)
+		self.table.tableChangedEvent.fire(self, self.getRowCount())
+
+	def pop(self, index):
+		"""
+			Removes and returns the row at 'index'. Other rows keep their rendered cells.
+		"""
+		obj = self._model.pop(index)
+		if index < len(self._renderedModel):
+			self._renderedModel.pop(index)
+
+		self.rebuildTable(recalculate=False)
+		self.table.tableChangedEvent.fire(self, self.getRowCount())
+		return obj
+
 	def clear(self, keepModel=False):
 		"""
 			Flushes the whole table.
@@ -10,6 +10,7 @@ from flare.i18n import translate
 from flare.popup import Confirm
 
 from vi.config import conf
+from vi.services.scheduler import scheduler
 
 
 class ServerSideActionWdg(Button):
@@ -134,13 +135,16 @@ class ServerSideActionWdg(Button):
 					self.fetchNext()
 
 	def fetchNext(self):
+		# The fetches are the action's own urls, not entity views the entityLoader could batch;
+		# they run one after another so the first failure stops the rest.
 		if not self.pendingFetches:
 			return
 		url = self.pendingFetches.pop()
-		NetworkService.request(
+		scheduler.request(
 			None, url, secure=True,
 			successHandler=self.fetchSucceeded,
-			failureHandler=self.fetchFailed
+			failureHandler=self.fetchFailed,
+			priority="interactive"
 		)
 
 	def fetchSucceeded(self, req):
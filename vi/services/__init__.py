@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from . import abort
+from . import batchsize
+from . import changes
+from . import entities
+from . import filehash
+from . import http
+from . import images
+from . import ingest
+from . import prefetch
+from . import projection
+from . import revalidate
+from . import scheduler
+from . import skeys
+from . import store
+from . import tabs
+from . import thumbnails
+from . import treecache
+from . import upload
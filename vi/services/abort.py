@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from vi.services.scheduler import scheduler
+
+
+def ignore(*args, **kwargs):
+	pass
+
+
+def abortRequest(req):
+	"""
+		Cancels a pending NetworkService request.
+
+		The handlers are detached first, so the request settles silently: an answer which
+		is already on its way is neither decoded nor passed to any widget. Requests waiting
+		for a scheduler slot or an skey are never sent.
+
+		The NetworkService doesn't expose its XMLHttpRequest, so only reads issued as
+		ConditionalRequest (scheduler.request(..., conditional=True)) stop transferring;
+		for these, the remaining download is saved. Handlers in the request's
+		`abortHandler` list, e.g. of the prefetcher, are called before.
+	"""
+	if req is None or getattr(req, "status", None) in ["succeeded", "failed"]:
+		return
+
+	for handler in getattr(req, "abortHandler", []):
+		handler(req)
+
+	req.isAborted = True
+	req.successHandler = []
+	req.failureHandler = [ignore]  # keep the default error message away
+	req.finishedHandler = []
+	req.kickoff = ignore
+
+	xhr = getattr(getattr(req, "request", None), "req", None)
+	if xhr is not None:
+		try:
+			xhr.abort()
+		except:  # not sent yet or already done
+			pass
+
+	abortRequest(getattr(req, "fallback", None))  # a ConditionalRequest issued again
+	scheduler.release(req)
+
+
+def abortRequests(reqs):
+	"""
+		Cancels all pending requests of the given list and empties it.
+	"""
+	for req in reqs:
+		abortRequest(req)
+
+	del reqs[:]
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import time
+
+from flare import html5
+from vi.config import conf
+
+
+class BatchSizeController(object):
+	"""
+		Learns the amount of rows to request per batch for a module.
+
+		For every batch, the duration of the request, the size of the response and the
+		time needed to render the rows are measured. The size and the render time are
+		averaged per row. The duration is split into a fixed cost per request, the
+		latency, and a transfer time per row, by a least-squares fit over the recent
+		batches of different sizes. The batch size is the largest amount which keeps
+		each of these within its budget, bounded by conf["batchSize.min"] and
+		conf["batchSize.max"]; a latency exceeding its budget alone doesn't shrink the
+		batches, as fewer rows per request wouldn't lower it. Narrow, fast modules end up
+		with large batches, heavy ones with small batches. The learned size is stored in
+		the localStorage, so it is reused in later sessions.
+	"""
+
+	storagePrefix = "vi.batchSize."
+	smoothing = 0.3  # Weight of a new measurement in the moving averages
+	maxSamples = 10  # Batches the request durations are fitted over
+
+	def __init__(self, module, batchSize):
+		super(BatchSizeController, self).__init__()
+		self.module = module
+		self.batchSize = self.restore() or batchSize
+		self.latency = None
+		self.transferPerRow = None
+		self.bytesPerRow = None
+		self.renderPerRow = None
+		self.samples = []  # (rows, seconds) of the recent requests
+
+	def restore(self):
+		try:
+			batchSize = int(html5.window.localStorage.getItem(self.storagePrefix + self.module) or 0)
+		except:
+			return None
+
+		if not batchSize:
+			return None
+
+		return self.clamp(batchSize)
+
+	def store(self):
+		try:
+			html5.window.localStorage.setItem(self.storagePrefix + self.module, str(self.batchSize))
+		except:  # Storage may be disabled or full; the size is learned again then
+			pass
+
+	@staticmethod
+	def clamp(batchSize):
+		return max(conf["batchSize.min"], min(conf["batchSize.max"], int(batchSize)))
+
+	def requestStarted(self, req):
+		"""
+			Marks 'req' as a batch request to be measured, sent now.
+		"""
+		req.batchSizeStart = time.time()
+
+	def measure(self, req, rows, bytes, renderTime):
+		"""
+			Records the costs of a received batch and recalculates the batch size.
+			:param req: The request, if passed to requestStarted() before.
+			:param rows: Amount of rows in the batch.
+			:param bytes: Size of the response.
+			:param renderTime: Seconds it took to add the rows to the table.
+		"""
+		start = getattr(req, "batchSizeStart", None)
+		if not rows or start is None:
+			return
+
+		req.batchSizeStart = None
+
+		self.samples.append((rows, time.time() - start - renderTime))
+		del self.samples[:-self.maxSamples]
+		self.fitDuration()
+
+		self.bytesPerRow = self.average(self.bytesPerRow, bytes / rows)
+		self.renderPerRow = self.average(self.renderPerRow, renderTime / rows)
+
+		candidates = [conf["batchSize.max"]]
+
+		# Time left for the transfer of rows, once the fixed cost of the request is paid
+		if self.transferPerRow and self.latency < conf["batchSize.latencyBudget"]:
+			candidates.append((conf["batchSize.latencyBudget"] - self.latency) / self.transferPerRow)
+
+		for perRow, budget in [(self.bytesPerRow, conf["batchSize.byteBudget"]),
+								(self.renderPerRow, conf["batchSize.renderBudget"])]:
+			if perRow > 0:
+				candidates.append(budget / perRow)
+
+		batchSize = self.clamp(min(candidates))
+		if batchSize != self.batchSize:
+			self.batchSize = batchSize
+			self.store()
+
+	def fitDuration(self):
+		"""
+			Fits the durations of the recent requests as latency + rows * transferPerRow.
+
+			As long as all of them had the same size, the transfer time can't be told apart,
+			and the durations are taken as latency entirely.
+		"""
+		count = len(self.samples)
+		meanRows = sum(rows for rows, duration in self.samples) / count
+		meanDuration = sum(duration for rows, duration in self.samples) / count
+		variance = sum((rows - meanRows) ** 2 for rows, duration in self.samples)
+
+		if not variance:
+			self.latency, self.transferPerRow = meanDuration, None
+			return
+
+		slope = sum((rows - meanRows) * (duration - meanDuration) for rows, duration in self.samples) / variance
+		self.transferPerRow = max(slope, 0) or None
+		self.latency = max(meanDuration - (self.transferPerRow or 0) * meanRows, 0)
+
+	def average(self, current, value):
+		if current is None:
+			return value
+
+		return current + self.smoothing * (value - current)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import pyodide
+
+from flare import html5
+from flare.network import NetworkService
+
+
+class ChangeDispatcher(object):
+	"""
+		Single change listener registered on the NetworkService, which fans out
+		notifyChange events to the widgets interested in a module.
+
+		Widgets register on attach and unregister on detach, so closed views are
+		never referenced from here. Notifications for the same module are collected
+		and delivered once per animation frame. Every notification increments a
+		per-module generation counter, which allows a detached widget to detect
+		on re-attach that it missed changes while it was hidden.
+	"""
+
+	def __init__(self):
+		super(ChangeDispatcher, self).__init__()
+		self.listeners = []  # (listener, modules) tuples; modules is None for all modules
+		self.generations = {}  # module -> amount of notifications received
+		self.pending = {}  # module -> list of kwargs collected for the next frame
+		self.isScheduled = False
+		self.isRegistered = False
+
+	def register(self, listener, modules=None):
+		"""
+			Registers 'listener' for changes of the given modules.
+			:param modules: List of module names, or None to receive changes of any module.
+		"""
+		if not self.isRegistered:
+			NetworkService.registerChangeListener(self)
+			self.isRegistered = True
+
+		self.unregister(listener)
+		self.listeners.append((listener, tuple(modules) if modules is not None else None))
+
+	def unregister(self, listener):
+		self.listeners = [entry for entry in self.listeners if entry[0] is not listener]
+
+	def generation(self, *modules):
+		"""
+			Returns a value that changes whenever one of the given modules received a notification.
+		"""
+		return sum(self.generations.get(module, 0) for module in modules)
+
+	def onDataChanged(self, module, *args, **kwargs):
+		if not module:
+			return
+
+		self.generations[module] = self.generations.get(module, 0) + 1
+		self.pending.setdefault(module, []).append(kwargs)
+
+		if not self.isScheduled:
+			self.isScheduled = True
+			html5.window.requestAnimationFrame(pyodide.create_once_callable(self.flush))
+
+	def flush(self, *args, **kwargs):
+		"""
+			Delivers all notifications collected since the last frame.
+
+			A module with a single notification passes its original keyword arguments,
+			several notifications for a module are merged into one call receiving them as `events`.
+		"""
+		self.isScheduled = False
+		pending = self.pending
+		self.pending = {}
+
+		for module, events in pending.items():
+			if len(events) == 1:
+				kwargs = events[0]
+			else:
+				kwargs = {"events": events}
+
+			for entry in self.listeners[:]:
+				if entry not in self.listeners:  # unregistered by a previous listener
+					continue
+
+				listener, modules = entry
+				if modules is None or module in modules:
+					listener.onDataChanged(module, **kwargs)
+
+
+changeDispatcher = ChangeDispatcher()
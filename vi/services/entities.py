@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from flare.network import NetworkService, DeferredCall
+from vi.config import conf
+from vi.services.scheduler import scheduler
+from vi.services.store import entityStore
+
+
+class EntityLoader(object):
+	"""
+		Fetches single entities, collapsing the view requests issued for the same module
+		within one tick into key-filtered list requests.
+
+		The filter parameter is taken from the module's adminInfo "batchedView" setting or
+		conf["entityLoader.filter"], which is "key" by default, the list of keys ViUR's KeyBone
+		filters by; False disables batching for a module. Entities a list request doesn't return,
+		e.g. because the server ignores the filter, and failed list requests fall back to
+		individual view requests, so the result is always the same.
+	"""
+
+	def __init__(self):
+		super(EntityLoader, self).__init__()
+		self.pending = {}  # (module, skelType, priority) -> {key: [(successHandler, failureHandler)]}
+		self.isScheduled = False
+
+	def load(self, module, key, successHandler, failureHandler=None, skelType=None, priority="visible"):
+		"""
+			Calls 'successHandler' with the values of the entity 'key', or 'failureHandler' with the failed request.
+			:param skelType: "node" or "leaf" for tree modules.
+			:param priority: The scheduler priority of the request.
+		"""
+		keys = self.pending.setdefault((module, skelType, priority), {})
+		keys.setdefault(key, []).append((successHandler, failureHandler))
+
+		if not self.isScheduled:
+			self.isScheduled = True
+			DeferredCall(self.flush)
+
+	def getFilterParam(self, module):
+		moduleInfo = conf["modules"].get(module) or {}
+		return moduleInfo.get("batchedView", conf["entityLoader.filter"])
+
+	def flush(self, *args, **kwargs):
+		self.isScheduled = False
+		pending = self.pending
+		self.pending = {}
+
+		for (module, skelType, priority), keys in pending.items():
+			param = self.getFilterParam(module)
+
+			if not param or len(keys) == 1:
+				for key, handlers in keys.items():
+					self.fetchSingle(module, skelType, priority, key, handlers)
+
+				continue
+
+			keyList = list(keys.keys())
+			batchSize = conf["entityLoader.batchSize"]
+
+			for i in range(0, len(keyList), batchSize):
+				self.fetchBatch(module, skelType, priority, param, {key: keys[key] for key in keyList[i:i + batchSize]})
+
+	def fetchBatch(self, module, skelType, priority, param, keys):
+		def onSuccess(req):
+			skellist = NetworkService.decode(req).get("skellist") or []
+			received = {skel["key"]: skel for skel in skellist if skel.get("key") in keys}
+
+			for key, handlers in keys.items():
+				if key in received:
+					self.resolve(module, received[key], handlers)
+				else:
+					self.fetchSingle(module, skelType, priority, key, handlers)
+
+		def onFailure(req, *args, **kwargs):
+			for key, handlers in keys.items():
+				self.fetchSingle(module, skelType, priority, key, handlers)
+
+		scheduler.request(module, "list/%s" % skelType if skelType else "list",
+						  {param: list(keys.keys()), "limit": len(keys)},
+						  successHandler=onSuccess,
+						  failureHandler=onFailure,
+						  priority=priority)
+
+	def fetchSingle(self, module, skelType, priority, key, handlers):
+		def onSuccess(req):
+			self.resolve(module, NetworkService.decode(req)["values"], handlers)
+
+		def onFailure(req, *args, **kwargs):
+			for successHandler, failureHandler in handlers:
+				if failureHandler:
+					failureHandler(req, *args, **kwargs)
+
+		scheduler.request(module, "view/%s/%s" % (skelType, key) if skelType else "view/%s" % key,
+						  successHandler=onSuccess,
+						  failureHandler=onFailure,
+						  priority=priority)
+
+	@staticmethod
+	def resolve(module, skel, handlers):
+		entityStore.put(module, skel)
+
+		for successHandler, failureHandler in handlers:
+			successHandler(dict(skel))
+
+
+entityLoader = EntityLoader()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from collections import OrderedDict
+
+import pyodide
+from flare import html5
+from flare.network import DeferredCall
+from vi.config import conf
+from vi.services.entities import entityLoader
+
+
+workerSource = """
+self.onmessage = function(e) {
+	var id = e.data[0];
+
+	e.data[1].arrayBuffer().then(function(buffer) {
+		return crypto.subtle.digest("SHA-256", buffer);
+	}).then(function(digest) {
+		var hash = Array.prototype.map.call(new Uint8Array(digest), function(b) {
+			return ("0" + b.toString(16)).slice(-2);
+		}).join("");
+
+		self.postMessage({id: id, hash: hash});
+	}).catch(function(err) {
+		self.postMessage({id: id, error: String(err)});
+	});
+};
+"""
+
+
+class FileHashes(object):
+	"""
+		Recognizes files uploaded before, so that dropping them again doesn't upload them again.
+
+		Files are hashed (SHA-256) in a web worker. The hashes of the files uploaded from this
+		browser are kept with the key and node of the file entry they created, per module in
+		the localStorage and for at most conf["upload.dedup.maxHashes"] files. Only files with
+		the size of a file known in the target node are hashed before their upload; the others
+		start at once and are hashed for the index afterwards.
+
+		A known file counts as duplicate if its entry still exists in the same node.
+	"""
+
+	def __init__(self):
+		super(FileHashes, self).__init__()
+		self.worker = None
+		self.pending = {}  # id -> (file id, [callbacks])
+		self.nextId = 0
+		self.hashes = {}  # file id -> hash
+		self.indexes = {}  # module -> OrderedDict of hash -> {"key", "node", "size"}
+
+	def getWorker(self):
+		if (self.worker is None and conf["upload.dedup"]
+				and getattr(html5.window, "Worker", None) and getattr(html5.window, "crypto", None)):
+			try:
+				blob = html5.window.Blob.new(pyodide.to_js([workerSource]), type="application/javascript")
+				self.worker = html5.window.Worker.new(html5.window.URL.createObjectURL(blob))
+			except:  # e.g. blob workers disallowed by the content security policy
+				logging.exception("Unable to start the hash worker")
+				conf["upload.dedup"] = False
+				return None
+
+			self.worker.addEventListener("message", pyodide.create_proxy(self.onWorkerMessage))
+			self.worker.addEventListener("error", pyodide.create_proxy(self.onWorkerError))
+
+		return self.worker
+
+	@staticmethod
+	def getFileId(file):
+		return "%s/%s/%s" % (file.name, file.size, file.lastModified)
+
+	def hash(self, file, callback):
+		"""
+			Calls 'callback' with the hash of 'file', or with None if it can't be hashed.
+		"""
+		fileId = self.getFileId(file)
+
+		if fileId in self.hashes:
+			DeferredCall(callback, self.hashes[fileId])
+			return
+
+		if file.size > conf["upload.dedup.maxBytes"] or not self.getWorker():
+			DeferredCall(callback, None)
+			return
+
+		for pendingId, callbacks in self.pending.values():
+			if pendingId == fileId:
+				callbacks.append(callback)
+				return
+
+		self.nextId += 1
+		self.pending[self.nextId] = (fileId, [callback])
+		self.worker.postMessage(pyodide.to_js([self.nextId, file]))
+
+	def onWorkerMessage(self, event):
+		msg = event.data.to_py()
+		fileId, callbacks = self.pending.pop(msg["id"], (None, []))
+
+		if "error" in msg:
+			logging.error("Unable to hash %s: %s", fileId, msg["error"])
+			hash = None
+		else:
+			hash = self.hashes[fileId] = msg["hash"]
+
+		for callback in callbacks:
+			callback(hash)
+
+	def onWorkerError(self, event):
+		"""
+			Disables the deduplication if the worker fails, e.g. without crypto.subtle in an insecure context.
+			The files waiting for their hash are uploaded.
+		"""
+		logging.error("The hash worker failed: %s", getattr(event, "message", event))
+		conf["upload.dedup"] = False
+
+		self.worker.terminate()
+		self.worker = None
+
+		pending = self.pending
+		self.pending = {}
+
+		for fileId, callbacks in pending.values():
+			for callback in callbacks:
+				callback(None)
+
+	def getIndex(self, module):
+		if module not in self.indexes:
+			try:
+				entries = json.loads(html5.window.localStorage.getItem("vi.upload.hashes.%s" % module) or "[]")
+			except:
+				entries = []
+
+			self.indexes[module] = OrderedDict(entries)
+
+		return self.indexes[module]
+
+	def saveIndex(self, module):
+		index = self.getIndex(module)
+
+		while len(index) > conf["upload.dedup.maxHashes"]:
+			index.popitem(last=False)
+
+		try:
+			html5.window.localStorage.setItem("vi.upload.hashes.%s" % module, json.dumps(list(index.items())))
+		except:  # Storage may be disabled or full
+			pass
+
+	def check(self, module, node, file, onDuplicate, onUnique):
+		"""
+			Calls 'onDuplicate' with the values of the file entry in 'node' holding the same contents
+			as 'file', or 'onUnique' if there is none.
+		"""
+		if not conf["upload.dedup"]:
+			DeferredCall(onUnique)
+			return
+
+		index = self.getIndex(module)
+
+		if not any(entry["node"] == node and entry["size"] == file.size for entry in index.values()):
+			DeferredCall(onUnique)
+			return
+
+		def onHash(hash):
+			entry = index.get(hash) if hash else None
+
+			if not entry or entry["node"] != node:
+				onUnique()
+				return
+
+			def onEntry(skel):
+				if skel.get("parententry") == node or not skel.get("parententry"):
+					onDuplicate(skel)
+				else:  # moved elsewhere meanwhile
+					onUnique()
+
+			def onMissing(*args, **kwargs):
+				index.pop(hash, None)
+				self.saveIndex(module)
+				onUnique()
+
+			entityLoader.load(module, entry["key"], onEntry, onMissing, skelType="leaf", priority="interactive")
+
+		self.hash(file, onHash)
+
+	def record(self, module, node, file, skel):
+		"""
+			Remembers 'file' as uploaded into the file entry 'skel'.
+		"""
+		if not conf["upload.dedup"] or not skel.get("key"):
+			return
+
+		def onHash(hash):
+			if not hash:
+				return
+
+			index = self.getIndex(module)
+			index.pop(hash, None)
+			index[hash] = {"key": skel["key"], "node": node, "size": file.size}
+			self.saveIndex(module)
+
+		self.hash(file, onHash)
+
+
+fileHashes = FileHashes()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import pyodide
+from urllib.parse import urlencode
+
+from flare import html5
+from flare.network import NetworkService
+
+
+def buildUrl(module, url, params=None):
+	"""
+		Builds the absolute url for a request like NetworkService.request() does,
+		with the given parameters as query string.
+	"""
+	if module:
+		url = "%s/%s/%s" % (getattr(NetworkService, "prefix", "/vi"), module, url)
+
+	if not url.startswith("http"):
+		url = (getattr(NetworkService, "host", "") or "") + url
+
+	if params:
+		url += ("&" if "?" in url else "?") + urlencode(expandParams(params))
+
+	return url
+
+
+def expandParams(params):
+	"""
+		Returns the parameters as (name, value) pairs, expanded like the NetworkService sends them:
+		lists as repeated fields, dicts and lists of dicts by dotted names.
+	"""
+	fields = []
+
+	def expand(key, value):
+		if isinstance(value, list):
+			if any(isinstance(entry, dict) for entry in value):
+				for idx, entry in enumerate(value):
+					expand("%s.%d" % (key, idx), entry)
+			else:
+				for entry in value:
+					expand(key, entry)
+
+		elif isinstance(value, dict):
+			for subKey, entry in value.items():
+				expand("%s.%s" % (key, subKey) if key else subKey, entry)
+
+		else:
+			fields.append((key, str(value) if value is not None else ""))
+
+	for key, value in params.items():
+		expand(key, value)
+
+	return fields
+
+
+def buildFormData(params):
+	"""
+		Returns the parameters as FormData, see expandParams().
+	"""
+	formData = html5.window.FormData.new()
+
+	for key, value in expandParams(params):
+		formData.append(key, value)
+
+	return formData
+
+
+def isCrossOrigin(url):
+	"""
+		Returns True if requests to 'url' leave the origin of the Vi, so non-safelisted headers need a preflight.
+	"""
+	return url.startswith("http") and not url.startswith(html5.window.location.origin + "/")
+
+
+class HTTPRequest(object):
+	"""
+		Wrapper around XMLHttpRequest, which unlike the one used by the NetworkService
+		allows to set request headers, read response headers, abort the request and
+		observe the upload progress.
+	"""
+
+	def __init__(self, method, url, callbackSuccess=None, callbackFailure=None, payload=None, headers=None,
+				 callbackProgress=None, withCredentials=None):
+		super(HTTPRequest, self).__init__()
+
+		self.method = method.upper()
+		self.callbackSuccess = callbackSuccess
+		self.callbackFailure = callbackFailure
+		self.callbackProgress = callbackProgress
+
+		self.req = html5.window.XMLHttpRequest.new()
+		self.req.open(self.method, url, True)
+
+		if withCredentials is None:  # send the cookies to a separate host running the server
+			withCredentials = bool(getattr(NetworkService, "host", None))
+
+		if withCredentials:
+			self.req.withCredentials = True
+
+		for name, value in (headers or {}).items():
+			self.req.setRequestHeader(name, value)
+
+		self.proxies = [pyodide.create_proxy(self.onLoadEnd)]
+		self.req.addEventListener("loadend", self.proxies[0])
+
+		if callbackProgress:
+			self.proxies.append(pyodide.create_proxy(self.onProgress))
+			self.req.upload.addEventListener("progress", self.proxies[-1])
+
+		self.req.send(payload)
+
+	def onProgress(self, event):
+		if event.lengthComputable:
+			self.callbackProgress(event.loaded, event.total)
+
+	def onLoadEnd(self, *args, **kwargs):
+		"""
+			Internal callback, called once the request succeeded, failed or was aborted.
+		"""
+		for proxy in self.proxies:
+			proxy.destroy()
+
+		self.proxies = []
+
+		if 200 <= self.req.status < 300 or self.req.status == 304:
+			if self.callbackSuccess:
+				self.callbackSuccess(self.req.responseText, self)
+		elif self.callbackFailure:
+			self.callbackFailure(self.req.responseText, self.req.status, self)
+
+	def getResponseHeader(self, name):
+		return self.req.getResponseHeader(name)
+
+	def abort(self):
+		self.req.abort()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import pyodide
+from flare import html5
+from flare.network import DeferredCall
+from vi.config import conf
+
+
+class ImageLoader(object):
+	"""
+		Starts loading images only once their widgets scroll into view.
+
+		Widgets register a task, which is called with a 'done' function once the widget is within
+		conf["images.rootMargin"] of the viewport. At most conf["images.maxLoading"] tasks run at
+		a time; queued tasks whose widgets scrolled out of view again wait for the next time they
+		are shown. Without IntersectionObserver support, all tasks are run through the queue.
+
+		A task which didn't call 'done' within conf["images.timeout"] seconds is considered done,
+		so a lost callback never keeps its slot.
+	"""
+
+	def __init__(self):
+		super(ImageLoader, self).__init__()
+		self.observer = None
+		self.tasks = {}  # id -> (element, task)
+		self.queue = []  # ids of the tasks of visible widgets
+		self.running = 0
+		self.nextId = 0
+
+	def getObserver(self):
+		if self.observer is None and getattr(html5.window, "IntersectionObserver", None):
+			self.observer = html5.window.IntersectionObserver.new(
+				pyodide.create_proxy(self.onIntersection),
+				pyodide.to_js({"rootMargin": conf["images.rootMargin"]}, dict_converter=html5.window.Object.fromEntries)
+			)
+
+		return self.observer
+
+	def observe(self, widget, task):
+		"""
+			Calls 'task' with a 'done' function once 'widget' is shown and a loading slot is free.
+		"""
+		self.unobserve(widget)
+
+		self.nextId += 1
+		self.tasks[self.nextId] = (widget.element, task)
+		widget.element.setAttribute("data-vi-lazy", str(self.nextId))
+
+		if self.getObserver():
+			self.observer.observe(widget.element)
+		else:
+			self.queue.append(self.nextId)
+			DeferredCall(self.runQueued)
+
+	def unobserve(self, widget):
+		lazyId = widget.element.getAttribute("data-vi-lazy")
+		if not lazyId:
+			return
+
+		widget.element.removeAttribute("data-vi-lazy")
+		self.tasks.pop(int(lazyId), None)
+
+		if int(lazyId) in self.queue:
+			self.queue.remove(int(lazyId))
+
+		if self.observer:
+			self.observer.unobserve(widget.element)
+
+	def onIntersection(self, entries, *args):
+		for entry in entries:
+			lazyId = entry.target.getAttribute("data-vi-lazy")
+			if not lazyId:
+				continue
+
+			lazyId = int(lazyId)
+
+			if entry.isIntersecting:
+				if lazyId not in self.queue:
+					self.queue.append(lazyId)
+			elif lazyId in self.queue:
+				self.queue.remove(lazyId)
+
+		self.runQueued()
+
+	def runQueued(self, *args, **kwargs):
+		while self.queue and self.running < conf["images.maxLoading"]:
+			lazyId = self.queue.pop(0)
+			element, task = self.tasks.pop(lazyId, (None, None))
+			if not task:
+				continue
+
+			element.removeAttribute("data-vi-lazy")
+			if self.observer:
+				self.observer.unobserve(element)
+
+			self.running += 1
+			task(self.makeDone())
+
+	def makeDone(self):
+		state = {"done": False}
+
+		def done(*args, **kwargs):
+			if not state["done"]:
+				state["done"] = True
+				self.running -= 1
+				self.runQueued()
+
+		DeferredCall(done, _delay=conf["images.timeout"] * 1000)
+		return done
+
+	@staticmethod
+	def preload(url, callback):
+		"""
+			Loads and decodes the image at 'url', then calls 'callback', also if loading failed.
+		"""
+		img = html5.window.Image.new()
+		img.src = url
+
+		def onDecoded(*args):
+			proxy.destroy()
+			callback()
+
+		proxy = pyodide.create_proxy(onDecoded)
+		img.decode().then(proxy, proxy)
+
+
+imageLoader = ImageLoader()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from collections.abc import MutableSequence, Sequence
+
+import pyodide
+from flare import html5
+from flare.network import NetworkService
+from vi.config import conf
+
+
+workerSource = """
+self.onmessage = function(e) {
+	var id = e.data[0], data, fields = e.data[2];
+
+	try {
+		data = JSON.parse(e.data[1]);
+	} catch (err) {
+		self.postMessage({id: id, error: String(err)});
+		return;
+	}
+
+	var skellist = data && data.skellist, rows = null, missing = {};
+
+	if (Array.isArray(skellist)) {
+		rows = [];
+
+		if (!fields) {
+			var seen = {};
+			fields = [];
+
+			skellist.forEach(function(skel) {
+				for (var name in skel) {
+					if (!seen[name]) {
+						seen[name] = true;
+						fields.push(name);
+					}
+				}
+			});
+		}
+
+		skellist.forEach(function(skel, i) {
+			rows.push(fields.map(function(name, j) {
+				if (!(name in skel)) {
+					(missing[i] = missing[i] || []).push(j);
+					return null;
+				}
+
+				return skel[name];
+			}));
+		});
+
+		delete data.skellist;
+	}
+
+	self.postMessage({id: id, data: data, fields: fields, rows: rows, missing: missing});
+};
+"""
+
+
+class LazySkellist(MutableSequence):
+	"""
+		The skeletons of a list response decoded by the ingest worker.
+
+		The rows of values stay JavaScript arrays as posted by the worker. A skeleton is
+		converted into a dict once it is accessed first, and kept, so changes to it persist.
+		The callbacks in `onConvert` are called with every skeleton converted, so stores and
+		caches can take the rows a widget actually uses instead of walking all of them.
+		Otherwise it behaves like the list of skeletons, including changes to it.
+	"""
+
+	def __init__(self, fields, rows, missing):
+		super(LazySkellist, self).__init__()
+		self.fields = fields
+		self.rows = rows
+		self.missing = missing  # row index -> indexes of the fields the skeleton doesn't have
+		self.items = list(range(len(rows)))  # a converted skeleton, or the index of its row
+		self.onConvert = []
+		self.converted = 0
+
+	def convert(self, idx):
+		item = self.items[idx]
+		if not isinstance(item, int):
+			return item
+
+		skel = self.items[idx] = dict(zip(self.fields, self.rows[item].to_py()))
+
+		for j in self.missing.get(item, ()):
+			del skel[self.fields[j]]
+
+		self.converted += 1
+
+		for callback in self.onConvert:
+			callback(skel)
+
+		return skel
+
+	def __len__(self):
+		return len(self.items)
+
+	def __getitem__(self, idx):
+		if isinstance(idx, slice):
+			return [self.convert(i) for i in range(*idx.indices(len(self)))]
+
+		return self.convert(idx)
+
+	def __setitem__(self, idx, value):
+		self.items[idx] = list(value) if isinstance(idx, slice) else value
+
+	def __delitem__(self, idx):
+		del self.items[idx]
+
+	def insert(self, idx, value):
+		self.items.insert(idx, value)
+
+	def index(self, value, start=0, stop=None):
+		# Tables look up their own rows, which are found without converting the others
+		for idx, item in enumerate(self.items[start:stop], start):
+			if item is value:
+				return idx
+
+		return super(LazySkellist, self).index(value, start, stop)
+
+	def __eq__(self, other):
+		return isinstance(other, Sequence) and list(self) == list(other)
+
+	def __ne__(self, other):
+		return not self == other
+
+
+class SkelIngest(object):
+	"""
+		Decodes large list responses in a web worker.
+
+		The worker parses the JSON, strips the fields not covered by the widget's projection
+		and sends the skeletons back as rows of values with a shared field list. The main
+		thread converts only the envelope of the response; the skeletons are handed out as
+		LazySkellist, which converts each of them when it is used.
+
+		Responses smaller than conf["ingest.minBytes"], or all if no worker is available,
+		are decoded on the main thread as before. The main thread time spent per batch is
+		kept in `stats` and logged at debug level.
+	"""
+
+	def __init__(self):
+		super(SkelIngest, self).__init__()
+		self.worker = None
+		self.workerProxy = None
+		self.pending = {}  # id -> (req, handler)
+		self.nextId = 0
+		self.stats = {"worker": [], "main": []}  # main thread milliseconds per batch
+
+	def isEnabled(self):
+		return conf["ingest.worker"] and self.getWorker() is not None
+
+	def getWorker(self):
+		if self.worker is None and getattr(html5.window, "Worker", None):
+			try:
+				blob = html5.window.Blob.new(pyodide.to_js([workerSource]), type="application/javascript")
+				self.worker = html5.window.Worker.new(html5.window.URL.createObjectURL(blob))
+			except:  # e.g. blob workers disallowed by the content security policy
+				logging.exception("Unable to start the ingest worker")
+				conf["ingest.worker"] = False
+				return None
+
+			self.workerProxy = pyodide.create_proxy(self.onWorkerMessage)
+			self.worker.addEventListener("message", self.workerProxy)
+
+		return self.worker
+
+	def wrap(self, handler, projection=None):
+		"""
+			Returns a success handler which calls 'handler' with the request once its response was ingested.
+			:param projection: The FieldProjection applied to the skeletons.
+		"""
+		def onSuccess(req, *args, **kwargs):
+			if len(req.result or "") < conf["ingest.minBytes"] or not self.isEnabled():
+				handler(req, *args, **kwargs)
+				return
+
+			self.nextId += 1
+			self.pending[self.nextId] = (req, lambda: handler(req, *args, **kwargs))
+
+			fields = sorted(projection.fields) if projection and projection.fields is not None else None
+			self.worker.postMessage(pyodide.to_js([self.nextId, req.result, fields]))
+
+		return onSuccess
+
+	def onWorkerMessage(self, event):
+		start = time.time()
+		msg = event.data
+
+		req, handler = self.pending.pop(msg.id, (None, None))
+		if not req:
+			return
+
+		error = getattr(msg, "error", None)
+		if error:
+			logging.error("Ingest worker failed to decode: %s", error)
+			handler()  # the widget decodes the response itself
+			return
+
+		data = msg.data.to_py() if getattr(msg, "data", None) is not None else None
+
+		if isinstance(data, dict) and msg.rows is not None:
+			missing = {int(i): indexes for i, indexes in msg.missing.to_py().items()}
+			data["skellist"] = LazySkellist(msg.fields.to_py(), msg.rows, missing)
+
+		req.ingested = data
+		self.record("worker", start, req)
+		handler()
+
+	def decode(self, req):
+		"""
+			Returns the decoded response of a request passed through wrap().
+		"""
+		data = getattr(req, "ingested", None)
+		if data is not None:
+			req.ingested = None  # a request is decoded once, its data belongs to the caller
+			return data
+
+		start = time.time()
+		data = NetworkService.decode(req)
+		self.record("main", start, req)
+		return data
+
+	def record(self, path, start, req):
+		duration = (time.time() - start) * 1000
+
+		stats = self.stats[path]
+		stats.append(duration)
+		del stats[:-100]
+
+		logging.debug("Ingested %d bytes on the %s path, main thread blocked %.1f ms",
+					  len(req.result or ""), path, duration)
+
+
+skelIngest = SkelIngest()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+from flare import html5
+from flare.network import DeferredCall
+from vi.config import conf
+from vi.services.abort import abortRequest
+from vi.services.batchsize import BatchSizeController
+from vi.services.scheduler import scheduler
+
+
+class Prefetcher(object):
+	"""
+		Warms the structure and the first list batch of a module before its view is opened.
+
+		Prefetches are triggered by hovering or focusing a navigation entry, and after the
+		start for the modules opened most often according to the navigation history recorded
+		in the localStorage. At most conf["prefetch.maxConcurrent"] prefetches run at once,
+		and prefetching stops once conf["prefetch.maxBytes"] were transferred in this session.
+
+		Widgets take prefetched responses by their url and parameters; a response is handed
+		out once and only within conf["prefetch.maxAge"] seconds. Responses not taken within
+		that time are dropped. A taken prefetch aborted by its widget frees its slot.
+	"""
+
+	historyKey = "vi.navigationHistory"
+
+	def __init__(self):
+		super(Prefetcher, self).__init__()
+		self.entries = {}  # key -> dict of the request, its start time and the callbacks waiting for it
+		self.queue = []  # (key, url, params) waiting for a free slot
+		self.running = 0
+		self.transferred = 0
+
+	@staticmethod
+	def makeKey(url, params=None):
+		return "%s?%s" % (url, json.dumps(params or {}, sort_keys=True))
+
+	def isEnabled(self):
+		return conf["prefetch"] and self.transferred < conf["prefetch.maxBytes"]
+
+	def prefetch(self, url, params=None):
+		"""
+			Queues a prefetch of 'url', unless a fresh response is already available or pending.
+		"""
+		self.expire()
+
+		key = self.makeKey(url, params)
+		entry = self.entries.get(key)
+
+		if not self.isEnabled() or entry:
+			return
+
+		if any(queued[0] == key for queued in self.queue):
+			return
+
+		self.queue.append((key, url, params))
+		self.pump()
+
+	def pump(self):
+		while self.queue and self.running < conf["prefetch.maxConcurrent"] and self.isEnabled():
+			key, url, params = self.queue.pop(0)
+			self.running += 1
+
+			req = scheduler.request(None, url, params,
+									successHandler=self.onPrefetchDone,
+									failureHandler=self.onPrefetchFailed,
+									priority="prefetch", conditional=True)
+			req.prefetchKey = key
+			req.prefetchEntry = {"req": req, "time": time.time(), "done": False, "running": True, "callbacks": []}
+			req.abortHandler = [self.onPrefetchAborted]
+			self.entries[key] = req.prefetchEntry
+
+	def release(self, entry):
+		"""
+			Frees the slot of a prefetch, once.
+		"""
+		if entry["running"]:
+			entry["running"] = False
+			self.running -= 1
+			self.pump()
+
+	def drop(self, entry):
+		if self.entries.get(entry["req"].prefetchKey) is entry:
+			del self.entries[entry["req"].prefetchKey]
+
+	def onPrefetchDone(self, req):
+		entry = req.prefetchEntry
+		self.transferred += len(req.result or "")
+
+		entry["done"] = True
+		entry["time"] = time.time()
+
+		for successHandler, failureHandler in entry["callbacks"]:
+			successHandler(req)
+
+		self.release(entry)
+
+	def onPrefetchFailed(self, req, code=None, *args, **kwargs):
+		entry = req.prefetchEntry
+		self.drop(entry)
+
+		for successHandler, failureHandler in entry["callbacks"]:
+			failureHandler(req, code)
+
+		self.release(entry)
+
+	def onPrefetchAborted(self, req):
+		self.drop(req.prefetchEntry)
+		self.release(req.prefetchEntry)
+
+	def expire(self):
+		"""
+			Drops the prefetched responses nobody took in time, and aborts prefetches running for too long.
+		"""
+		now = time.time()
+
+		for key, entry in list(self.entries.items()):
+			if now - entry["time"] > conf["prefetch.maxAge"]:
+				self.discard(key)
+
+	def take(self, url, params, successHandler, failureHandler):
+		"""
+			Hands out a prefetched response for 'url' with exactly the given parameters.
+
+			Returns the request object the handlers are called with, or None if nothing usable
+			was prefetched and the caller has to issue the request itself. The handlers are
+			always called asynchronously, so the caller can register the request first.
+		"""
+		self.expire()
+
+		entry = self.entries.pop(self.makeKey(url, params), None)
+		if not entry:
+			return None
+
+		if entry["done"]:
+			DeferredCall(successHandler, entry["req"])
+		else:
+			entry["callbacks"].append((successHandler, failureHandler))
+
+		return entry["req"]
+
+	def discard(self, key):
+		entry = self.entries.pop(key, None)
+		if entry and not entry["done"]:
+			abortRequest(entry["req"])  # frees its slot, see onPrefetchAborted()
+
+	def prefetchModule(self, moduleName):
+		"""
+			Prefetches what the default view of a module requests first.
+		"""
+		moduleInfo = conf["modules"].get(moduleName)
+		if not moduleInfo or not self.isEnabled():
+			return
+
+		handler = moduleInfo.get("handler") or ""
+		if handler.split(".")[0] not in ["list", "tree"]:
+			return
+
+		self.prefetch("/vi/getStructure/%s" % moduleName)
+
+		# The first batch is built like in ListWidget.reloadData()
+		if not handler.split(".")[0] == "list" or handler.startswith("list.viewport"):
+			return
+
+		if isinstance(moduleInfo.get("projection"), str):  # depends on the columns chosen by the widget
+			return
+
+		params = {}
+		params.update(moduleInfo.get("context") or {})
+		params.update(moduleInfo.get("filter") or {})
+
+		batchSize = moduleInfo.get("batchSize")
+		if not batchSize:
+			batchSize = conf["batchSize"]
+
+			if conf["batchSize.adaptive"]:
+				batchSize = BatchSizeController(moduleName, batchSize).batchSize
+
+		params["limit"] = batchSize
+
+		if handler == "list.grouped":
+			url = "/vi/%s/list/%s" % (moduleName, moduleInfo.get("group") or "all")
+		else:
+			url = "/vi/%s/list" % moduleName
+
+		self.prefetch(url, params)
+
+	def getHistory(self):
+		try:
+			return json.loads(html5.window.localStorage.getItem(self.historyKey) or "{}")
+		except:
+			return {}
+
+	def recordVisit(self, moduleName):
+		"""
+			Counts a module as opened in the navigation history.
+		"""
+		history = self.getHistory()
+		history[moduleName] = history.get(moduleName, 0) + 1
+
+		try:
+			html5.window.localStorage.setItem(self.historyKey, json.dumps(history))
+		except:  # Storage may be disabled or full
+			pass
+
+	def prefetchFrequent(self):
+		"""
+			Prefetches the modules opened most often.
+		"""
+		history = self.getHistory()
+		modules = sorted(history.keys(), key=lambda moduleName: history[moduleName], reverse=True)
+
+		for moduleName in modules[:conf["prefetch.historyModules"]]:
+			self.prefetchModule(moduleName)
+
+
+prefetcher = Prefetcher()
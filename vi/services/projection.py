@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import re
+
+from vi.config import conf
+from vi.services.ingest import LazySkellist
+
+
+class FieldProjection(object):
+	"""
+		Determines which fields of a module's skeletons a list widget needs to keep.
+
+		The projection is built from the shown columns and the fields referenced by the
+		module configuration (filter, context actions and server-side action conditions).
+		If the module declares a "projection" parameter in its adminInfo, the field list
+		is sent to the server, otherwise all other fields are stripped on ingest.
+	"""
+
+	def __init__(self, module):
+		super(FieldProjection, self).__init__()
+		self.module = module
+		self.fields = None  # Set of kept fields, None if projection is inactive
+
+	def isEnabled(self):
+		moduleInfo = conf["modules"].get(self.module) or {}
+		return bool(conf["listProjection"] and moduleInfo.get("projection", True))
+
+	def getReferencedFields(self):
+		"""
+			Collects the fields referenced by the module's configuration.
+		"""
+		moduleInfo = conf["modules"].get(self.module) or {}
+		fields = {"key"}
+		fields.update(conf["vi.context.title.bones"])
+
+		filter = moduleInfo.get("filter") or {}
+		for name, value in filter.items():
+			if name == "orderby":
+				fields.add(value)
+			else:
+				fields.add(re.split(r"[$.]", name, 1)[0])
+
+		for action in moduleInfo.get("actions") or []:
+			if action.startswith("context."):
+				for var in action.split(".", 3)[2].split(","):
+					if "=$" in var:
+						fields.add(var.split("=$", 1)[1])
+
+		for action in (moduleInfo.get("customActions") or {}).values():
+			fields.update(re.findall(r"skel(?:\[|\.get\()[\"'](\w+)[\"']", action.get("enabled") or ""))
+
+		return fields
+
+	def setFields(self, columns):
+		"""
+			Sets the projection to the given columns.
+			Returns True if the projection grew, so that already ingested rows lack some of the fields now required.
+		"""
+		if not self.isEnabled():
+			self.fields = None
+			return False
+
+		fields = self.getReferencedFields()
+		fields.update(columns)
+
+		grew = self.fields is not None and not fields.issubset(self.fields)
+		self.fields = fields
+		return grew
+
+	def getParams(self):
+		"""
+			Returns request parameters asking the server for the projected fields only, if supported.
+		"""
+		param = (conf["modules"].get(self.module) or {}).get("projection")
+		if self.fields is None or not isinstance(param, str):
+			return {}
+
+		return {param: sorted(self.fields)}
+
+	def apply(self, skellist):
+		"""
+			Strips all fields not covered by the projection from the given skeletons, in place.
+		"""
+		if self.fields is None or isinstance(skellist, LazySkellist):  # projected by the ingest worker
+			return skellist
+
+		for skel in skellist:
+			for name in [name for name in skel.keys() if name not in self.fields]:
+				del skel[name]
+
+		return skellist
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+from flare.network import NetworkService
+from vi.config import conf
+from vi.services.http import HTTPRequest, buildFormData, buildUrl, isCrossOrigin
+
+
+class ValidatorCache(object):
+	"""
+		Keeps the validators (ETag and Last-Modified) and bodies of the latest responses per url,
+		for at most conf["revalidate.maxEntries"] urls and conf["revalidate.maxBytes"] in total.
+	"""
+
+	def __init__(self):
+		super(ValidatorCache, self).__init__()
+		self.entries = OrderedDict()  # url -> dict of etag, lastModified and result
+		self.size = 0  # bytes of all bodies kept
+		self.hits = 0
+		self.misses = 0
+		self.bytesSaved = 0
+
+	def getHeaders(self, url):
+		entry = self.entries.get(url)
+		if not entry:
+			return {}
+
+		headers = {}
+		if entry["etag"]:
+			headers["If-None-Match"] = entry["etag"]
+		if entry["lastModified"]:
+			headers["If-Modified-Since"] = entry["lastModified"]
+
+		return headers
+
+	def store(self, url, request, result):
+		etag = request.getResponseHeader("ETag")
+		lastModified = request.getResponseHeader("Last-Modified")
+
+		self.drop(url)
+
+		if (etag or lastModified) and len(result) <= conf["revalidate.maxBytes"]:
+			self.entries[url] = {"etag": etag, "lastModified": lastModified, "result": result}
+			self.size += len(result)
+
+			while len(self.entries) > conf["revalidate.maxEntries"] or self.size > conf["revalidate.maxBytes"]:
+				self.drop(next(iter(self.entries)))
+
+	def drop(self, url):
+		entry = self.entries.pop(url, None)
+		if entry:
+			self.size -= len(entry["result"])
+
+	def lookup(self, url):
+		"""
+			Returns the body stored for 'url' after the server answered 304.
+		"""
+		entry = self.entries.get(url)
+		if not entry:
+			return None
+
+		self.entries.move_to_end(url)
+		self.hits += 1
+		self.bytesSaved += len(entry["result"])
+		return entry["result"]
+
+
+validatorCache = ValidatorCache()
+
+
+class ConditionalRequest(object):
+	"""
+		A read request which revalidates the previous response of the same url and parameters.
+
+		It is a drop-in for the request objects of the NetworkService. The handlers receive the
+		request with its body in `result`, which NetworkService.decode() decodes as usual.
+
+		Servers answer 304 Not Modified to GET only, and a conditional POST with 412, so a read
+		to be revalidated is sent by GET with its parameters in the query string and with the
+		validators of the previous response. If the server answers 304, `result` is the body
+		received before, so nothing but the headers is transferred. Reads to another origin
+		aren't revalidated, as the validators would cost a CORS preflight per request. Other
+		reads are sent like the NetworkService does: by POST with the parameters as form data,
+		or by GET without parameters, and unconditionally.
+
+		A failed request is issued again through the NetworkService (kept in `fallback`), so its
+		retries, its default failure handler and the session handling apply as to any request.
+
+		Unlike a NetworkService request, it exposes its XMLHttpRequest, so abortRequest() stops
+		its transfer. With revalidate=False, it is sent without validators and nothing is stored.
+	"""
+
+	def __init__(self, module, url, params=None, successHandler=None, failureHandler=None,
+				 finishedHandler=None, kickoff=True, revalidate=True):
+		super(ConditionalRequest, self).__init__()
+		self.module = module
+		self.url = url
+		self.params = params
+		self.successHandler = [successHandler] if successHandler else []
+		self.failureHandler = [failureHandler] if failureHandler else []
+		self.finishedHandler = [finishedHandler] if finishedHandler else []
+		self.status = "running"
+		self.result = None
+		self.request = None
+		self.fallback = None
+		self.revalidate = revalidate
+		self.isConditional = False
+		self.isCacheHit = False
+
+		if kickoff:
+			self.kickoff()
+
+	def kickoff(self):
+		self.fullUrl = buildUrl(self.module, self.url, self.params)  # identifies the response in the validatorCache
+		self.isConditional = self.revalidate and not isCrossOrigin(self.fullUrl)
+
+		if self.isConditional:
+			method, url, payload = "GET", self.fullUrl, None
+		elif self.params:
+			method, url, payload = "POST", buildUrl(self.module, self.url), buildFormData(self.params)
+		else:
+			method, url, payload = "GET", self.fullUrl, None
+
+		self.request = HTTPRequest(method, url,
+								   callbackSuccess=self.onCompletion,
+								   callbackFailure=self.onError,
+								   payload=payload,
+								   headers=validatorCache.getHeaders(self.fullUrl) if self.isConditional else None)
+
+	def onCompletion(self, text, request):
+		if request.req.status == 304 and self.isConditional:
+			text = validatorCache.lookup(self.fullUrl)
+
+			if text is None:  # evicted meanwhile, so fetch it entirely
+				self.kickoff()
+				return
+
+			self.isCacheHit = True
+		elif self.isConditional:
+			validatorCache.misses += 1
+			validatorCache.store(self.fullUrl, request, text)
+
+		self.result = text
+		self.status = "succeeded"
+
+		for s in self.successHandler:
+			s(self)
+
+		for s in self.finishedHandler:
+			s(self)
+
+	def onError(self, text, code, request):
+		if getattr(self, "isAborted", False):
+			return
+
+		self.fallback = NetworkService.request(self.module, self.url, self.params,
+											   successHandler=self.onFallbackSuccess,
+											   failureHandler=self.onFallbackFailure if self.failureHandler else None,
+											   finishedHandler=self.onFallbackFinished)
+
+	def onFallbackSuccess(self, req):
+		self.result = req.result
+		self.status = "succeeded"
+
+		for s in self.successHandler:
+			s(self)
+
+	def onFallbackFailure(self, req, code=None, *args, **kwargs):
+		self.result = req.result
+		self.status = "failed"
+
+		for s in self.failureHandler:
+			s(self, code)
+
+	def onFallbackFinished(self, req):
+		if self.status == "running":  # failed without a failure handler
+			self.status = "failed"
+
+		for s in self.finishedHandler:
+			s(self)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import time
+
+from flare.network import NetworkService
+from vi.config import conf
+from vi.services.http import buildUrl
+from vi.services.revalidate import ConditionalRequest
+from vi.services.skeys import skeyPool
+from vi.services.tabs import tabBus
+
+
+class RequestScheduler(object):
+	"""
+		Issues NetworkService requests by priority class, with a limited amount of concurrent
+		requests per class and in total.
+
+		The classes are, in order of precedence:
+
+		- "interactive": direct results of a user action, e.g. fetching a server-side action
+		- "visible": data for what is currently shown, e.g. list batches, tree nodes and breadcrumbs
+		- "prefetch": data the user will probably need soon
+		- "background": polling and housekeeping
+
+		Whenever a slot becomes free, the queued request of the highest class which is below its
+		own limit is sent. With conf["scheduler.slots"] keeping prefetch and background requests
+		to few slots, foreground loads never wait behind a burst of them.
+
+		Requests are created with kickoff=False, so callers receive the request object at once
+		and can keep or abort it like any other request. Secure requests take their skey from
+		the skey pool before they are queued. Shared reads are answered by another Vi tab if
+		it holds a fresh response, see TabBus.
+	"""
+
+	priorities = ["interactive", "visible", "prefetch", "background"]
+
+	def __init__(self):
+		super(RequestScheduler, self).__init__()
+		self.queues = {priority: [] for priority in self.priorities}
+		self.running = {}  # id(req) -> (priority, start time)
+
+	def request(self, module, url, params=None, successHandler=None, failureHandler=None,
+				finishedHandler=None, modifies=False, secure=False, priority="visible", conditional=False, shared=False):
+		"""
+			Like NetworkService.request(), but sends the request once a slot of its priority class is free.
+			:param conditional: Issue a read as ConditionalRequest, which abortRequest() can stop on the wire,
+				and which revalidates the previous response if conf["revalidate"] is set.
+			:param shared: Take the response of a read from another tab, and hand it out to other tabs.
+			:returns: The request object.
+		"""
+		assert priority in self.priorities, "Unknown priority %r" % priority
+
+		# The slot is freed even if a handler raises, which skips the finished handlers
+		def onSuccess(req, *args, **kwargs):
+			try:
+				successHandler(req, *args, **kwargs)
+			finally:
+				self.release(req)
+
+		def onFailure(req, *args, **kwargs):
+			try:
+				failureHandler(req, *args, **kwargs)
+			finally:
+				self.release(req)
+
+		def onFinished(req, *args, **kwargs):
+			self.release(req)
+
+			if finishedHandler:
+				finishedHandler(req, *args, **kwargs)
+
+		if secure and conf["skeyPool"]:
+			params = dict(params or {})
+
+		if conditional:
+			assert not (secure or modifies), "Only reads can be revalidated"
+			req = ConditionalRequest(module, url, params,
+									 successHandler=onSuccess if successHandler else None,
+									 failureHandler=onFailure if failureHandler else None,
+									 finishedHandler=onFinished,
+									 kickoff=False, revalidate=conf["revalidate"])
+		else:
+			req = NetworkService.request(module, url, params,
+										 successHandler=onSuccess if successHandler else None,
+										 failureHandler=onFailure if failureHandler else None,
+										 finishedHandler=onFinished,
+										 modifies=modifies, secure=secure and not conf["skeyPool"], kickoff=False)
+
+		req.priority = priority
+
+		if secure and conf["skeyPool"]:
+			skeyPool.attach(req, lambda: self.enqueue(req))
+		elif shared:
+			assert not (secure or modifies), "Only reads can be shared"
+			self.enqueueShared(req, buildUrl(module, url, params))
+		else:
+			self.enqueue(req)
+
+		return req
+
+	def enqueueShared(self, req, url):
+		def onAnswer(result):
+			if getattr(req, "isAborted", False):
+				return
+
+			if result is None:
+				req.successHandler.append(lambda req: tabBus.store(url, req.result))
+				self.enqueue(req)
+				return
+
+			req.result = result
+			req.status = "succeeded"
+
+			for handler in req.successHandler + req.finishedHandler:
+				handler(req)
+
+		tabBus.ask(url, onAnswer)
+
+	def enqueue(self, req):
+		self.queues[req.priority].append(req)
+		self.pump()
+
+	def release(self, req):
+		"""
+			Frees the slot of a finished or aborted request, or removes it from its queue.
+		"""
+		if self.running.pop(id(req), None) is None:
+			queue = self.queues.get(getattr(req, "priority", None))
+			if queue and req in queue:
+				queue.remove(req)
+
+			return
+
+		self.pump()
+
+	def getRunning(self, priority=None):
+		# Requests which never reported back don't occupy their slot forever
+		now = time.time()
+		for key, (reqPriority, start) in list(self.running.items()):
+			if now - start > conf["scheduler.timeout"]:
+				del self.running[key]
+
+		return len([True for reqPriority, start in self.running.values() if priority in [None, reqPriority]])
+
+	def pump(self):
+		while self.getRunning() < conf["scheduler.maxConcurrent"]:
+			for priority in self.priorities:
+				if self.queues[priority] and self.getRunning(priority) < conf["scheduler.slots"][priority]:
+					req = self.queues[priority].pop(0)
+					break
+			else:
+				return
+
+			if getattr(req, "isAborted", False):
+				continue
+
+			self.running[id(req)] = (priority, time.time())
+			req.kickoff()
+
+
+scheduler = RequestScheduler()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import time
+
+from flare.network import NetworkService
+from vi.config import conf
+
+
+class SkeyPool(object):
+	"""
+		Supplies security keys for secure requests ahead of time.
+
+		A secure NetworkService request fetches a fresh skey before it is sent, which doubles
+		the round trips of bulk operations. The pool fetches the keys needed by all waiting
+		requests with a single request of /vi/skey?amount=n instead, plus conf["skeyPool.reserve"]
+		keys for the next secure requests. Keys are single-use and only handed out within
+		conf["skeyPool.maxAge"] seconds after they were issued.
+	"""
+
+	def __init__(self):
+		super(SkeyPool, self).__init__()
+		self.keys = []  # (skey, time fetched)
+		self.waiting = []  # callbacks waiting for a key
+		self.isFetching = False
+
+	def acquire(self, callback):
+		"""
+			Calls 'callback' with an unused skey, or with None if no key could be fetched.
+		"""
+		self.waiting.append(callback)
+		self.dispatch()
+
+	def dispatch(self):
+		now = time.time()
+		self.keys = [(skey, fetched) for skey, fetched in self.keys if now - fetched < conf["skeyPool.maxAge"]]
+
+		while self.waiting and self.keys:
+			skey, fetched = self.keys.pop(0)
+			self.waiting.pop(0)(skey)
+
+		if self.waiting and not self.isFetching:
+			self.isFetching = True
+			amount = max(1, min(len(self.waiting) + conf["skeyPool.reserve"], conf["skeyPool.maxAmount"]))
+
+			NetworkService.request(None, "/vi/skey?amount=%d" % amount,
+								   successHandler=self.onSkeysAvailable,
+								   failureHandler=self.onSkeysFailed)
+
+	def onSkeysAvailable(self, req):
+		self.isFetching = False
+
+		skeys = NetworkService.decode(req)
+		if not isinstance(skeys, list):  # servers not supporting amount return a single key
+			skeys = [skeys]
+
+		now = time.time()
+		self.keys.extend([(skey, now) for skey in skeys])
+		self.dispatch()
+
+	def onSkeysFailed(self, req, *args, **kwargs):
+		self.isFetching = False
+
+		waiting = self.waiting
+		self.waiting = []
+
+		for callback in waiting:
+			callback(None)
+
+	def request(self, module, url, params=None, successHandler=None, failureHandler=None,
+				finishedHandler=None, modifies=False, group=None):
+		"""
+			Like NetworkService.request() with secure=True, but takes the skey from the pool.
+			:param group: A SkeyGroup tracking the completion of several requests. Flare's requestGroup
+				can't be used, as it sends its requests on its own, before their keys are attached.
+			:returns: The request object, which is sent once its skey is available.
+		"""
+		kickoff = group.kickoff if group else (lambda req: req.kickoff())
+
+		if not conf["skeyPool"]:
+			req = NetworkService.request(module, url, params,
+										 successHandler=successHandler,
+										 failureHandler=failureHandler,
+										 finishedHandler=finishedHandler,
+										 modifies=modifies, secure=True, kickoff=False)
+		else:
+			params = dict(params or {})
+
+			req = NetworkService.request(module, url, params,
+										 successHandler=successHandler,
+										 failureHandler=failureHandler,
+										 finishedHandler=finishedHandler,
+										 modifies=modifies, secure=False, kickoff=False)
+
+		if group:
+			group.add(req)
+
+		if conf["skeyPool"]:
+			self.attach(req, lambda: kickoff(req))
+		else:
+			kickoff(req)
+
+		return req
+
+	def group(self, callback):
+		"""
+			Returns a SkeyGroup, which calls 'callback' once all of its requests finished.
+		"""
+		return SkeyGroup(callback)
+
+	def attach(self, req, callback):
+		"""
+			Acquires a key for a request created with secure=False and kickoff=False, then calls 'callback'.
+		"""
+		def onSkey(skey):
+			if getattr(req, "isAborted", False):  # aborted while waiting, see abortRequest()
+				return
+
+			if skey:
+				req.params["skey"] = skey
+			else:
+				req.secure = True  # let the request fetch its own key
+
+			callback()
+
+		self.acquire(onSkey)
+
+
+class SkeyGroup(object):
+	"""
+		Tracks a group of requests issued by skeyPool.request(), like flare's requestGroup.
+
+		Requests are sent once the group was called and their key is attached, all at once.
+		When all of them finished, 'callback' is called with True if all of them succeeded.
+	"""
+
+	def __init__(self, callback):
+		super(SkeyGroup, self).__init__()
+		self.callback = callback
+		self.pending = 0  # requests not finished yet
+		self.ready = []  # requests with their key attached, waiting for call()
+		self.success = True
+		self.isCalled = False
+
+	def add(self, req):
+		self.pending += 1
+		req.successHandler.append(lambda *args, **kwargs: self.onFinished(True))
+		req.failureHandler.append(lambda *args, **kwargs: self.onFinished(False))
+
+	def kickoff(self, req):
+		if self.isCalled:
+			req.kickoff()
+		else:
+			self.ready.append(req)
+
+	def call(self):
+		self.isCalled = True
+
+		ready = self.ready
+		self.ready = []
+
+		for req in ready:
+			req.kickoff()
+
+		if not self.pending:
+			self.callback(self.success)
+
+	def onFinished(self, success):
+		self.success = self.success and success
+		self.pending -= 1
+
+		if not self.pending and self.isCalled:
+			self.callback(self.success)
+
+
+skeyPool = SkeyPool()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import OrderedDict
+
+import pyodide
+from vi.config import conf
+from vi.services.ingest import LazySkellist
+
+
+storeName = "entities"
+
+
+class EntityStore(object):
+	"""
+		Holds the entities loaded by any widget, keyed by module and key.
+
+		Lists and trees put the rows they receive, the entity loader and the edit widget the
+		entire entities. An entry is "complete" if it holds all fields of the entity; rows
+		stripped by a field projection only update the fields they carry. Widgets can subscribe
+		to an entity and are called with its values whenever it is put again.
+
+		Edit structures are kept per module and skeleton type, so that an editor can be rendered
+		from a complete entry at once while the server is asked for the current state.
+
+		Entries older than conf["entityStore.maxAge"] seconds are expired: readers may still show
+		them, but fetch the entity again, which puts it anew (stale-while-revalidate).
+
+		With conf["entityStore.persist"], complete entries are also written to the IndexedDB and
+		restored as stale entries on the next start, which are only used until revalidated.
+	"""
+
+	def __init__(self):
+		super(EntityStore, self).__init__()
+		self.entries = OrderedDict()  # (module, key) -> dict of values, complete, stale and time
+		self.structures = {}  # (module, skelType) -> edit structure
+		self.subscribers = {}  # (module, key) -> [callbacks]
+
+	def get(self, module, key, complete=True, stale=False):
+		"""
+			Returns a copy of the stored values of an entity, or None.
+			:param complete: Only return the entity if it holds all of its fields.
+			:param stale: Also return entities restored from the IndexedDB and not revalidated since.
+		"""
+		entry = self.entries.get((module, key))
+		if not entry or (complete and not entry["complete"]) or (entry["stale"] and not stale):
+			return None
+
+		self.entries.move_to_end((module, key))
+		return dict(entry["values"])
+
+	def isExpired(self, module, key):
+		"""
+			Returns True if the entity isn't stored or should be fetched again.
+		"""
+		entry = self.entries.get((module, key))
+		return not entry or entry["stale"] or time.time() - entry["time"] > conf["entityStore.maxAge"]
+
+	def put(self, module, skel, complete=True, notify=True):
+		"""
+			Stores an entity received from the server.
+			:param complete: The skel holds all fields of the entity, e.g. it isn't a projected list row.
+		"""
+		key = skel.get("key")
+		if not key:
+			return
+
+		entry = self.entries.pop((module, key), None)
+
+		if entry and not complete and not entry["stale"]:
+			entry["values"].update(skel)
+		else:
+			entry = {"values": dict(skel), "complete": complete, "stale": False}
+
+		entry["time"] = time.time()
+		self.entries[(module, key)] = entry
+
+		while len(self.entries) > conf["entityStore.maxEntries"]:
+			self.entries.popitem(last=False)
+
+		if complete:
+			self.persist(module, key, entry["values"])
+
+		if notify:
+			for callback in self.subscribers.get((module, key), [])[:]:
+				callback(dict(entry["values"]))
+
+	def putList(self, module, skellist, complete=True):
+		"""
+			Stores the rows of a list. Rows not yet converted from the ingest worker's response are
+			stored once they are used, see LazySkellist.
+		"""
+		if isinstance(skellist, LazySkellist):
+			skellist.onConvert.append(lambda skel: self.put(module, skel, complete))
+			skellist = [item for item in skellist.items if not isinstance(item, int)]
+
+		for skel in skellist:
+			self.put(module, skel, complete)
+
+	def invalidate(self, module, key=None):
+		"""
+			Removes an entity, or all entities of a module.
+		"""
+		for entryKey in [entryKey for entryKey in self.entries.keys()
+						 if entryKey[0] == module and key in [None, entryKey[1]]]:
+			del self.entries[entryKey]
+			self.persist(*entryKey, values=None)
+
+	def subscribe(self, module, key, callback):
+		self.subscribers.setdefault((module, key), []).append(callback)
+
+	def unsubscribe(self, module, key, callback):
+		callbacks = self.subscribers.get((module, key)) or []
+		if callback in callbacks:
+			callbacks.remove(callback)
+
+		if not callbacks:
+			self.subscribers.pop((module, key), None)
+
+	def getStructure(self, module, skelType=None):
+		return self.structures.get((module, skelType))
+
+	def putStructure(self, module, skelType, structure):
+		self.structures[(module, skelType)] = structure
+
+	def persist(self, module, key, values):
+		idb = conf["indexeddb"]
+		if not conf["entityStore.persist"] or not idb:
+			return
+
+		dbKey = "%s/%s" % (module, key)
+		idb.dbAction("delete", storeName, dbKey)
+
+		if values is not None:
+			idb.dbAction("add", storeName, dbKey, {"module": module, "values": values})
+
+	def restore(self):
+		"""
+			Loads the entities persisted in the IndexedDB as stale entries.
+		"""
+		idb = conf["indexeddb"]
+		if not conf["entityStore.persist"] or not idb:
+			return
+
+		if storeName not in idb.objectStoreNames:
+			idb.dbAction("createStore", storeName)
+			return
+
+		idb.getList(storeName).addEventListener("dataready", pyodide.create_proxy(self.onRestored))
+
+	def onRestored(self, event):
+		for item in list(event.detail["data"])[-conf["entityStore.maxEntries"]:]:
+			item = item.to_py()
+			key = (item["module"], item["values"].get("key"))
+
+			if key not in self.entries:
+				self.entries[key] = {"values": item["values"], "complete": True, "stale": True, "time": 0}
+				self.entries.move_to_end(key, last=False)  # fresh entries are kept longer
+
+
+entityStore = EntityStore()
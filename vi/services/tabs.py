@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+import time
+from collections import OrderedDict
+
+import pyodide
+from flare import html5
+from flare.network import NetworkService, DeferredCall
+from vi.config import conf
+from vi.services.store import entityStore
+
+
+class TabBus(object):
+	"""
+		Coordinates the Vi tabs of a browser over a BroadcastChannel.
+
+		- Leader election: every tab announces itself by a heartbeat; the longest running tab
+		  is the leader, which alone polls the session and posts the result to the others.
+		- Shared responses: structures and the config fetched by one tab are handed to the
+		  other tabs on request within conf["tabs.sharedMaxAge"] seconds, instead of being
+		  fetched once per tab.
+		- Changes: notifyChange events are replayed in the other tabs, after the changed
+		  entities were dropped from their entity stores. Events passing broadcast=False,
+		  which only change the view of a tab, stay in their tab.
+
+		Without BroadcastChannel support, every tab behaves as the only one.
+	"""
+
+	def __init__(self):
+		super(TabBus, self).__init__()
+		self.tabId = "%012x" % random.getrandbits(48)
+		self.started = time.time()
+		self.channel = None
+		self.peers = {}  # tabId -> (started, last seen)
+		self.handlers = {}  # message type -> [callbacks]
+		self.shared = OrderedDict()  # url -> (result, time fetched)
+		self.questions = {}  # url -> [callbacks waiting for an answer]
+
+	def start(self):
+		if self.channel or not conf["tabs"] or not getattr(html5.window, "BroadcastChannel", None):
+			return
+
+		self.channel = html5.window.BroadcastChannel.new(conf["tabs.channel"])
+		self.channel.addEventListener("message", pyodide.create_proxy(self.onMessage))
+		html5.window.addEventListener("pagehide", pyodide.create_proxy(lambda *args: self.post("bye")))
+		html5.window.setInterval(pyodide.create_proxy(self.heartbeat), conf["tabs.heartbeat"] * 1000)
+
+		NetworkService.registerChangeListener(self)
+
+		self.on("heartbeat", self.onHeartbeat)
+		self.on("bye", lambda msg: self.peers.pop(msg["from"], None))
+		self.on("ask", self.onAsk)
+		self.on("answer", self.onAnswer)
+		self.on("change", self.onChange)
+
+		self.heartbeat()
+
+	def post(self, type, **kwargs):
+		if not self.channel:
+			return
+
+		kwargs.update({"type": type, "from": self.tabId})
+		self.channel.postMessage(json.dumps(kwargs))
+
+	def on(self, type, callback):
+		"""
+			Calls 'callback' with every message of 'type' posted by another tab.
+		"""
+		self.handlers.setdefault(type, []).append(callback)
+
+	def off(self, type, callback):
+		"""
+			Stops calling 'callback' with the messages of 'type'.
+		"""
+		if callback in self.handlers.get(type, []):
+			self.handlers[type].remove(callback)
+
+	def onMessage(self, event):
+		try:
+			msg = json.loads(event.data)
+		except:
+			return
+
+		for callback in self.handlers.get(msg.get("type"), [])[:]:
+			callback(msg)
+
+	# Leader election
+
+	def heartbeat(self, *args, **kwargs):
+		self.post("heartbeat", started=self.started)
+
+	def onHeartbeat(self, msg):
+		isNew = msg["from"] not in self.peers
+		self.peers[msg["from"]] = (msg["started"], time.time())
+
+		if isNew:  # let a new tab know about this one at once
+			self.heartbeat()
+
+	def getPeers(self):
+		now = time.time()
+		return {tabId: started for tabId, (started, seen) in self.peers.items()
+				if now - seen < 3 * conf["tabs.heartbeat"]}
+
+	def isLeader(self):
+		peers = self.getPeers()
+		return not peers or (self.started, self.tabId) <= min((started, tabId) for tabId, started in peers.items())
+
+	# Shared responses
+
+	def store(self, url, result, fetched=None):
+		self.shared.pop(url, None)
+		self.shared[url] = (result, fetched or time.time())
+
+		while len(self.shared) > conf["tabs.sharedMaxEntries"]:
+			self.shared.popitem(last=False)
+
+	def lookup(self, url):
+		entry = self.shared.get(url)
+		if entry and time.time() - entry[1] < conf["tabs.sharedMaxAge"]:
+			return entry[0]
+
+		return None
+
+	def ask(self, url, callback):
+		"""
+			Calls 'callback' with a fresh response for 'url' held by this or another tab,
+			or with None if no tab answered within conf["tabs.askTimeout"] milliseconds.
+		"""
+		result = self.lookup(url)
+		if result is not None or not self.getPeers():
+			DeferredCall(callback, result)
+			return
+
+		if url not in self.questions:
+			self.questions[url] = []
+			self.post("ask", url=url)
+			DeferredCall(self.resolve, url, None, _delay=conf["tabs.askTimeout"])
+
+		self.questions[url].append(callback)
+
+	def resolve(self, url, result):
+		for callback in self.questions.pop(url, []):
+			callback(result)
+
+	def onAsk(self, msg):
+		result = self.lookup(msg["url"])
+		if result is not None:
+			self.post("answer", url=msg["url"], result=result, age=time.time() - self.shared[msg["url"]][1])
+
+	def onAnswer(self, msg):
+		if msg["url"] in self.questions:
+			self.store(msg["url"], msg["result"], fetched=time.time() - msg["age"])
+			self.resolve(msg["url"], msg["result"])
+
+	# Changes
+
+	def onDataChanged(self, module, *args, **kwargs):
+		if kwargs.get("fromTab") or not module:  # replayed from another tab
+			return
+
+		events = [event for event in kwargs.get("events") or [kwargs] if event.get("broadcast", True)]
+		if not events:
+			return
+
+		self.post("change", module=module, events=[
+			{name: value for name, value in event.items() if isinstance(value, (str, int, float, bool, type(None)))}
+			for event in events
+		])
+
+	def onChange(self, msg):
+		module = msg["module"]
+
+		for event in msg["events"]:
+			entityStore.invalidate(module, event.get("key"))
+
+		for event in msg["events"]:
+			event["fromTab"] = msg["from"]
+			NetworkService.notifyChange(module, **event)
+
+
+tabBus = TabBus()
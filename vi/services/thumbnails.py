@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import OrderedDict
+
+import pyodide
+from flare import html5
+from flare.network import DeferredCall
+from vi.config import conf
+from vi.services.http import buildUrl
+
+
+workerSource = """
+function makeThumbnail(url, size, cropped) {
+	return fetch(url, {credentials: "include"}).then(function(response) {
+		if (!response.ok) {
+			throw new Error("HTTP " + response.status);
+		}
+
+		return response.blob();
+	}).then(function(blob) {
+		return createImageBitmap(blob);
+	}).then(function(bitmap) {
+		var scale = cropped ? Math.max(size / bitmap.width, size / bitmap.height)
+			: Math.min(size / bitmap.width, size / bitmap.height);
+		scale = Math.min(scale, 1);
+
+		var width = Math.round(bitmap.width * scale), height = Math.round(bitmap.height * scale);
+		var canvas = new OffscreenCanvas(cropped ? Math.min(width, size) : width, cropped ? Math.min(height, size) : height);
+
+		canvas.getContext("2d").drawImage(bitmap, (canvas.width - width) / 2, (canvas.height - height) / 2, width, height);
+		bitmap.close();
+
+		return canvas.convertToBlob({type: "image/webp", quality: 0.8});
+	});
+}
+
+function trim(cache, maxEntries) {
+	return cache.keys().then(function(keys) {
+		return Promise.all(keys.slice(0, Math.max(keys.length - maxEntries, 0)).map(function(request) {
+			return cache.delete(request);
+		}));
+	});
+}
+
+self.onmessage = function(e) {
+	var id = e.data[0], url = e.data[1], key = e.data[2], size = e.data[3], cropped = e.data[4], cacheName = e.data[5];
+	var maxCached = e.data[6];
+	var cache = null;
+
+	(self.caches ? caches.open(cacheName) : Promise.resolve(null)).then(function(c) {
+		cache = c;
+		return cache ? cache.match(key) : null;
+	}).catch(function() {
+		return null;
+	}).then(function(hit) {
+		if (hit) {
+			return hit.blob();
+		}
+
+		return makeThumbnail(url, size, cropped).then(function(thumbnail) {
+			if (cache) {
+				cache.put(key, new Response(thumbnail)).then(function() {
+					return trim(cache, maxCached);
+				}).catch(function() {});
+			}
+
+			return thumbnail;
+		});
+	}).then(function(thumbnail) {
+		self.postMessage({id: id, blob: thumbnail});
+	}).catch(function(err) {
+		self.postMessage({id: id, error: String(err)});
+	});
+};
+"""
+
+
+class ThumbnailCache(object):
+	"""
+		Provides small previews of image files which have no image serving url.
+
+		A web worker fetches the original, scales it down to the requested size and keeps the
+		result in the Cache API (cache conf["thumbnails.cacheName"]), keyed by the dlkey of the
+		file and the size; later requests, also after a reload, are answered from there. The
+		cache keeps the conf["thumbnails.maxCached"] thumbnails stored last, and the object urls
+		handed out are kept for the conf["thumbnails.maxEntries"] recent thumbnails.
+
+		If the worker fails, e.g. as OffscreenCanvas can't be used, pending requests are answered
+		with None and no worker is started again.
+	"""
+
+	def __init__(self):
+		super(ThumbnailCache, self).__init__()
+		self.worker = None
+		self.pending = {}  # id -> (key, [callbacks])
+		self.nextId = 0
+		self.urls = OrderedDict()  # key -> object url
+
+	def getWorker(self):
+		if self.worker is None and conf["thumbnails.worker"]:
+			try:
+				blob = html5.window.Blob.new(pyodide.to_js([workerSource]), type="application/javascript")
+				self.worker = html5.window.Worker.new(html5.window.URL.createObjectURL(blob))
+			except:  # e.g. blob workers disallowed by the content security policy
+				logging.exception("Unable to start the thumbnail worker")
+				conf["thumbnails.worker"] = False
+				return None
+
+			self.worker.addEventListener("message", pyodide.create_proxy(self.onWorkerMessage))
+			self.worker.addEventListener("error", pyodide.create_proxy(self.onWorkerError))
+
+		return self.worker
+
+	def isSupported(self, file):
+		"""
+			Returns True if a thumbnail can be made for 'file'.
+		"""
+		mimetype = file.get("mimetype") or ""
+
+		return (conf["thumbnails.worker"] and file.get("dlkey") and file.get("downloadUrl")
+				and mimetype.startswith("image/") and mimetype != "image/svg+xml"
+				and getattr(html5.window, "Worker", None) and getattr(html5.window, "OffscreenCanvas", None))
+
+	@staticmethod
+	def getKey(file, size, cropped):
+		return "%s/vi/thumbnails/%s/%d%s" % (html5.window.location.origin, file["dlkey"], size, "c" if cropped else "")
+
+	def load(self, file, size, cropped, callback):
+		"""
+			Calls 'callback' with the url of a thumbnail of 'file', or with None if it can't be made.
+		"""
+		key = self.getKey(file, size, cropped)
+
+		if key in self.urls:
+			self.urls.move_to_end(key)
+			DeferredCall(callback, self.urls[key])
+			return
+
+		if not self.getWorker():
+			DeferredCall(callback, None)
+			return
+
+		for pendingKey, callbacks in self.pending.values():
+			if pendingKey == key:
+				callbacks.append(callback)
+				return
+
+		url = buildUrl(None, file["downloadUrl"])
+		if not url.startswith("http"):
+			url = html5.window.location.origin + url
+
+		self.nextId += 1
+		self.pending[self.nextId] = (key, [callback])
+		self.worker.postMessage(pyodide.to_js([self.nextId, url, key, size, cropped,
+												conf["thumbnails.cacheName"], conf["thumbnails.maxCached"]]))
+
+	def onWorkerMessage(self, event):
+		msg = event.data.to_py()
+		key, callbacks = self.pending.pop(msg["id"], (None, []))
+
+		if "error" in msg:
+			logging.debug("Unable to make thumbnail %s: %s", key, msg["error"])
+			url = None
+		else:
+			url = self.urls[key] = html5.window.URL.createObjectURL(msg["blob"])
+
+			while len(self.urls) > conf["thumbnails.maxEntries"]:
+				html5.window.URL.revokeObjectURL(self.urls.popitem(last=False)[1])
+
+		for callback in callbacks:
+			callback(url)
+
+	def onWorkerError(self, event):
+		logging.error("The thumbnail worker failed: %s", getattr(event, "message", event))
+		conf["thumbnails.worker"] = False
+
+		self.worker.terminate()
+		self.worker = None
+
+		pending = self.pending
+		self.pending = {}
+
+		for key, callbacks in pending.values():
+			for callback in callbacks:
+				callback(None)
+
+
+thumbnailCache = ThumbnailCache()
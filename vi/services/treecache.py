@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+from collections import OrderedDict
+
+from flare.network import NetworkService, DeferredCall
+from vi.config import conf
+from vi.services.changes import changeDispatcher
+from vi.services.ingest import LazySkellist
+from vi.services.scheduler import scheduler
+
+
+class TreeCache(object):
+	"""
+		Keeps the children of tree nodes and the root nodes of tree modules across navigation.
+
+		Children are kept as the pages received, by module, node, skeleton type and cursor, for
+		at most conf["treeCache.maxPages"] pages. Tree widgets render the cached pages of a node
+		at once and revalidate them by the usual requests (stale-while-revalidate).
+
+		Root nodes are handed out from the cache and fetched again in the background once they
+		are older than conf["treeCache.rootNodesMaxAge"] seconds; concurrent requests for the
+		same root nodes share one request.
+
+		Nodes seen while browsing are kept by key, at most conf["treeCache.maxNodes"], so that
+		the path from a node up to its root node can be built without a request per ancestor.
+
+		Any change notified for a module drops its pages and root nodes, and the changed node,
+		or all nodes of the module for changes without a key.
+	"""
+
+	def __init__(self):
+		super(TreeCache, self).__init__()
+		self.pages = OrderedDict()  # (module, node, skelType, cursor) -> (skellist, next cursor)
+		self.rootNodes = {}  # (module, params) -> (root nodes, time fetched)
+		self.rootNodesWaiting = {}  # (module, params) -> [(successHandler, failureHandler)]
+		self.nodes = OrderedDict()  # (module, key) -> node skel
+		self.isRegistered = False
+
+	def register(self):
+		if not self.isRegistered:
+			changeDispatcher.register(self)
+			self.isRegistered = True
+
+	def getPages(self, module, node, skelType):
+		"""
+			Returns the cached pages of children of a node as (cursor, skellist, next cursor),
+			following the cursors from the first page as far as they are cached.
+		"""
+		pages = []
+		cursor = None
+
+		while len(pages) < conf["treeCache.maxPages"]:
+			entry = self.pages.get((module, node, skelType, cursor))
+			if entry is None:
+				break
+
+			self.pages.move_to_end((module, node, skelType, cursor))
+			pages.append((cursor, [dict(skel) for skel in entry[0]], entry[1]))
+
+			if not entry[0] or not entry[1]:
+				break
+
+			cursor = entry[1]
+
+		return pages
+
+	def putPage(self, module, node, skelType, cursor, skellist, nextCursor):
+		self.register()
+
+		key = (module, node, skelType, cursor)
+		self.pages.pop(key, None)
+		self.pages[key] = ([dict(skel) for skel in skellist], nextCursor)
+
+		while len(self.pages) > conf["treeCache.maxPages"]:
+			self.pages.popitem(last=False)
+
+	def putNodes(self, module, skellist):
+		"""
+			Keeps the nodes of a list, those of a LazySkellist once they are used.
+		"""
+		self.register()
+
+		if isinstance(skellist, LazySkellist):
+			skellist.onConvert.append(lambda skel: self.putNodes(module, [skel]))
+			skellist = [item for item in skellist.items if not isinstance(item, int)]
+
+		for skel in skellist:
+			if not skel.get("key"):
+				continue
+
+			self.nodes.pop((module, skel["key"]), None)
+			self.nodes[(module, skel["key"])] = dict(skel)
+
+		while len(self.nodes) > conf["treeCache.maxNodes"]:
+			self.nodes.popitem(last=False)
+
+	def getPath(self, module, key):
+		"""
+			Returns the known nodes from 'key' up to, but not including, the root node, and the key of
+			the first ancestor which isn't known, or None if the path reaches the root node.
+		"""
+		path = []
+
+		while key and len(path) < conf["treeCache.maxNodes"]:
+			skel = self.nodes.get((module, key))
+			if skel is None:
+				return path, key
+
+			if not skel.get("parententry") or skel["parententry"] == skel["key"]:
+				break
+
+			path.append(dict(skel))
+			key = skel["parententry"]
+
+		return path, None
+
+	def requestRootNodes(self, module, params, successHandler, failureHandler=None):
+		"""
+			Calls 'successHandler' with the root nodes of a module, from the cache if available.
+		"""
+		key = (module, json.dumps(params or {}, sort_keys=True))
+		entry = self.rootNodes.get(key)
+
+		if entry:
+			DeferredCall(successHandler, entry[0])
+
+			if time.time() - entry[1] < conf["treeCache.rootNodesMaxAge"]:
+				return
+
+			successHandler = failureHandler = None  # revalidate in the background
+
+		if key in self.rootNodesWaiting:
+			if successHandler:
+				self.rootNodesWaiting[key].append((successHandler, failureHandler))
+
+			return
+
+		self.rootNodesWaiting[key] = [(successHandler, failureHandler)] if successHandler else []
+
+		def onSuccess(req):
+			self.register()
+			rootNodes = NetworkService.decode(req)
+			self.rootNodes[key] = (rootNodes, time.time())
+
+			for successHandler, failureHandler in self.rootNodesWaiting.pop(key, []):
+				successHandler(rootNodes)
+
+		def onFailure(req, *args, **kwargs):
+			for successHandler, failureHandler in self.rootNodesWaiting.pop(key, []):
+				if failureHandler:
+					failureHandler(req, *args, **kwargs)
+
+		scheduler.request(module, "listRootNodes", params,
+						  successHandler=onSuccess,
+						  failureHandler=onFailure,
+						  priority="visible")
+
+	def invalidate(self, module):
+		for key in [key for key in self.pages.keys() if key[0] == module]:
+			del self.pages[key]
+
+		for key in [key for key in self.rootNodes.keys() if key[0] == module]:
+			del self.rootNodes[key]
+
+	def onDataChanged(self, module, *args, **kwargs):
+		self.invalidate(module)
+
+		for event in kwargs.get("events") or [kwargs]:
+			for key in [key for key in self.nodes.keys()
+						if key[0] == module and event.get("key") in [None, key[1]]]:
+				del self.nodes[key]
+
+
+treeCache = TreeCache()
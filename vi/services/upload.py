@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+import pyodide
+from flare import html5
+from flare.network import NetworkService, DeferredCall
+from vi.config import conf
+from vi.services.http import HTTPRequest
+
+
+def postUpload(url, body, successHandler, failureHandler, progressHandler=None):
+	"""
+		Posts 'body' to the upload url. Calls 'successHandler' once the upload url accepted it,
+		'failureHandler' with the status code otherwise, and 'progressHandler' with the bytes sent.
+
+		The request is preflighted, as it observes its upload progress. If it fails without any
+		progress, the upload url probably doesn't allow cross-origin requests: the body is posted
+		once more without CORS then. The result of such a request can't be read, so the "add"
+		request, which fails for an incomplete upload, verifies it.
+	"""
+	state = {"progress": False}
+
+	def onProgress(loaded, total):
+		state["progress"] = True
+
+		if progressHandler:
+			progressHandler(loaded, total)
+
+	def onFailure(text, status, req):
+		if status != 0 or state["progress"]:
+			failureHandler(status)
+			return
+
+		options = pyodide.to_js({"method": "POST", "body": body, "mode": "no-cors"},
+								dict_converter=html5.window.Object.fromEntries)
+
+		html5.window.fetch(url, options).then(
+			pyodide.create_once_callable(lambda *args: successHandler())
+		).catch(
+			pyodide.create_once_callable(lambda error: failureHandler(0))
+		)
+
+	HTTPRequest("POST", url, lambda text, req: successHandler(), onFailure,
+				payload=body, callbackProgress=onProgress, withCredentials=False)
+
+
+class FileUpload(object):
+	"""
+		Transfers a file to the server: requests an upload url and sends the file to it.
+
+		Files larger than conf["upload.chunkSize"] are put to a resumable upload url in chunks,
+		with the progress reported per chunk. After an interruption, the upload url is asked
+		for the bytes it received and the upload continues from there; the upload url is kept
+		in the localStorage for conf["upload.sessionMaxAge"] seconds, so a file dropped again
+		after a reload also continues where it stopped.
+
+		Failed transfers are retried up to conf["upload.retries"] times, here only; callers don't
+		retry on their own. Calls 'successHandler' with the key to add the file by, 'failureHandler'
+		with the status code once giving up, and 'progressHandler' with the bytes transferred and
+		the size of the file.
+	"""
+
+	def __init__(self, module, node, file, successHandler, failureHandler, progressHandler=None):
+		super(FileUpload, self).__init__()
+		self.module = module
+		self.node = node
+		self.file = file
+		self.successHandler = successHandler
+		self.failureHandler = failureHandler
+		self.progressHandler = progressHandler
+		self.targetKey = None
+		self.url = None
+		self.body = None  # what is posted for uploads in one piece
+		self.offset = 0  # bytes confirmed by the upload url
+		self.chunkEnd = 0
+		self.attempts = 0
+		self.isRestored = False  # continuing an upload url from the localStorage
+		self.hasProgress = False  # the upload url received chunk data, so it allows cross-origin chunks
+		self.isFirstChunkRetried = False
+
+		session = self.loadSession()
+		if session:
+			self.targetKey = session["uploadKey"]
+			self.url = session["uploadUrl"]
+			self.isRestored = True
+			self.resume()
+		else:
+			self.requestUploadUrl()
+
+	def requestUploadUrl(self):
+		params = {"fileName": self.file.name, "mimeType": (self.file.type or "application/octet-stream")}
+		if self.node:
+			params["node"] = self.node
+
+		NetworkService.request(self.module, "getUploadURL",
+							   params=params,
+							   successHandler=self.onUploadUrlAvailable,
+							   failureHandler=lambda req, code=None, *args, **kwargs: self.failureHandler(code),
+							   secure=True)
+
+	def onUploadUrlAvailable(self, req):
+		"""
+			Internal callback - the actual upload url (retrieved by calling /file/getUploadURL) is known.
+		"""
+		params = NetworkService.decode(req)["values"]
+
+		if "uploadKey" in params:  # New Resumeable upload format
+			self.targetKey = params["uploadKey"]
+			self.url = params["uploadUrl"]
+
+			if conf["upload.chunkSize"] and self.file.size > conf["upload.chunkSize"]:
+				self.saveSession()
+				self.sendChunk()
+				return
+
+			self.body = self.file
+		else:
+			formData = html5.jseval("new FormData();")
+
+			for key, value in params["params"].items():
+				if key == "key":
+					self.targetKey = value[:-16]  # Truncate source/file.dat
+					fileName = self.file.name
+					value = value.replace("file.dat", fileName)
+
+				formData.append(key, value)
+			formData.append("file", self.file)
+
+			self.url = params["url"]
+			self.body = formData
+
+		self.sendFile()
+
+	def onTransferred(self, *args, **kwargs):
+		self.dropSession()
+
+		if self.progressHandler:
+			self.progressHandler(self.file.size, self.file.size)
+
+		self.successHandler(self.targetKey)
+
+	def sendFile(self, *args, **kwargs):
+		"""
+			Posts the file in one piece.
+		"""
+		postUpload(self.url, self.body, self.onTransferred, lambda status: self.retry(status, self.sendFile),
+				   self.onFileProgress)
+
+	def onFileProgress(self, loaded, total):
+		if self.progressHandler:
+			self.progressHandler(min(loaded, self.file.size), self.file.size)
+
+	# Chunked uploads
+
+	def sendChunk(self):
+		self.chunkEnd = min(self.offset + conf["upload.chunkSize"], self.file.size)
+
+		HTTPRequest("PUT", self.url, self.onTransferred, self.onChunkFailed,
+					payload=self.file.slice(self.offset, self.chunkEnd),
+					headers={"Content-Range": "bytes %d-%d/%d" % (self.offset, self.chunkEnd - 1, self.file.size)},
+					callbackProgress=self.onChunkProgress,
+					withCredentials=False)
+
+	def onChunkProgress(self, loaded, total):
+		self.hasProgress = True
+
+		if self.progressHandler:
+			self.progressHandler(self.offset + loaded, self.file.size)
+
+	def onChunkFailed(self, text, status, req):
+		if status == 308:  # chunk received, more to come
+			self.offset = self.getConfirmedOffset(req, self.chunkEnd)
+			self.hasProgress = True
+			self.attempts = 0
+			self.sendChunk()
+
+		elif status == 0 and self.offset == 0 and not self.hasProgress and not self.isRestored:
+			# Nothing was sent: the upload url refused the preflight of the chunk, or the network failed.
+			# Try once more, then assume it doesn't allow cross-origin chunks and post the file as a whole.
+			if not self.isFirstChunkRetried:
+				self.isFirstChunkRetried = True
+				DeferredCall(self.sendChunk, _delay=1000)
+				return
+
+			self.dropSession()
+			self.body = self.file
+			self.sendFile()
+
+		else:
+			self.retry(status)
+
+	def resume(self, *args, **kwargs):
+		"""
+			Asks the upload url for the bytes it received, and continues from there.
+		"""
+		HTTPRequest("PUT", self.url, self.onTransferred, self.onResumeFailed,
+					headers={"Content-Range": "bytes */%d" % self.file.size},
+					withCredentials=False)
+
+	def onResumeFailed(self, text, status, req):
+		if status == 308:
+			self.offset = self.getConfirmedOffset(req, 0)
+			self.hasProgress = self.hasProgress or self.offset > 0
+			self.attempts = 0
+			self.sendChunk()
+
+		elif self.isRestored:  # the upload url expired, start over
+			self.isRestored = False
+			self.dropSession()
+			self.requestUploadUrl()
+
+		else:
+			self.retry(status)
+
+	def retry(self, status, resend=None):
+		"""
+			Calls 'resend', by default resume(), after a growing delay, or gives up.
+		"""
+		if self.attempts >= conf["upload.retries"]:
+			self.failureHandler(status)
+			return
+
+		self.attempts += 1
+		DeferredCall(resend or self.resume, _delay=1000 * 2 ** self.attempts)
+
+	@staticmethod
+	def getConfirmedOffset(req, default):
+		"""
+			Returns the amount of bytes the upload url confirmed by its Range header ("bytes=0-1234").
+		"""
+		received = req.getResponseHeader("Range")
+		if not received:
+			return default
+
+		return int(received.rsplit("-", 1)[1]) + 1
+
+	# Upload urls kept across reloads
+
+	def getSessionKey(self):
+		return "vi.upload.%s" % "/".join(
+			str(part) for part in [self.module, self.node or "", self.file.name, self.file.size, self.file.lastModified]
+		)
+
+	def loadSession(self):
+		try:
+			session = json.loads(html5.window.localStorage.getItem(self.getSessionKey()) or "null")
+		except:
+			return None
+
+		if not session or time.time() - session["time"] > conf["upload.sessionMaxAge"]:
+			return None
+
+		return session
+
+	def saveSession(self):
+		try:
+			html5.window.localStorage.setItem(self.getSessionKey(), json.dumps(
+				{"uploadKey": self.targetKey, "uploadUrl": self.url, "time": time.time()}
+			))
+		except:  # Storage may be disabled or full
+			pass
+
+	def dropSession(self):
+		try:
+			html5.window.localStorage.removeItem(self.getSessionKey())
+		except:
+			pass
@@ -14,6 +14,15 @@ def formatString(format, data, structure = None, language = None):
 	return fl_formatString(format,data,structure,language)
 
 def getImagePreview(data, cropped = False, size = 150):
+	"""
+	Returns the url of a preview of the file given by data, scaled to size pixels by the image
+	serving url of the file if it has one, otherwise the url of the original.
+	"""
+	servingUrl = data.get("serving_url") or data.get("servingurl")  # ViUR 3, ViUR 2
+
+	if size and servingUrl:
+		return "%s=s%d%s" % (servingUrl, size, "-c" if cropped else "")
+
 	return data["downloadUrl"]
 
 def setPreventUnloading(mode = True):
@@ -1,7 +1,10 @@
 from flare import html5
+from flare.network import DeferredCall
 from flare.observable import StateHandler
 from flare.views.helpers import removeView
 from vi.config import conf
+from vi.services.prefetch import prefetcher
+import pyodide
 
 class NavigationElement(html5.Div):
 	# language=HTML
@@ -54,6 +57,35 @@ class NavigationElement(html5.Div):
 		if opened:
 			self.ArrowAction(None)
 
+		# Prefetch the module when the user is about to open it
+		self.isHovered = False
+		self.item.element.addEventListener("mouseenter", pyodide.create_proxy(self.onItemHover))
+		self.item.element.addEventListener("mouseleave", pyodide.create_proxy(self.onItemLeave))
+		self.item.element.addEventListener("focusin", pyodide.create_proxy(self.onItemFocus))
+
+	def getModuleName(self):
+		view = conf["views_registered"].get(self.view) if self.view else None
+		if view is None or not getattr(view, "params", None):
+			return None
+
+		return view.params.get("moduleName")
+
+	def onItemHover(self, event):
+		self.isHovered = True
+		DeferredCall(self.prefetchModule, _delay=conf["prefetch.hoverDelay"])
+
+	def onItemLeave(self, event):
+		self.isHovered = False
+
+	def onItemFocus(self, event):
+		self.isHovered = True
+		self.prefetchModule()
+
+	def prefetchModule(self):
+		moduleName = self.getModuleName()
+		if self.isHovered and moduleName:
+			prefetcher.prefetchModule(moduleName)
+
 	def onActiveViewChanged( self,e,wdg, *args,**kwargs ):
 		if wdg == self.view:
 			self.item.addClass( "is-active" )
@@ -71,6 +103,10 @@ class NavigationElement(html5.Div):
 		else:
 			#if we have a linked view, update the view State
 			if self.view:
+				moduleName = self.getModuleName()
+				if moduleName:
+					prefetcher.recordVisit(moduleName)
+
 				conf["views_state"].updateState("activeView", self.view)
 
 			#if this element is part of a Navigation, update active State
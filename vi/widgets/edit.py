@@ -11,6 +11,7 @@ from vi import utils
 from vi.config import conf
 from vi.framework.components.actionbar import ActionBar
 from vi.widgets.list import ListWidget
+from vi.services.store import entityStore
 from vi.widgets.accordion import Accordion
 
 
@@ -166,6 +167,9 @@ class EditWidget(html5.Div):
 
 		self.editTaskID = None
 		self.wasInitialRequest = True  # Wherever the last request attempted to save data or just fetched the form
+		self.isProvisional = False  # Whether the form was rendered from the entity store and awaits the server's data
+		self.provisionalValues = None  # The values the provisional form was rendered with
+		self.changedBones = set()  # Names of the bones the user changed
 
 		# Widgets
 		self.form = None
@@ -212,11 +216,21 @@ class EditWidget(html5.Div):
 	def onChange(self, event):
 		assert self.form
 		self.modified = True
+
+		for name, bone in self.form.bones.items():
+			if bone.element.contains(event.target):
+				self.changedBones.add(name)
+
 		DeferredCall(self.form.update)
 
 	def onBoneChange(self, bone):
 		assert self.form
 		self.modified = True
+
+		for name, widget in self.form.bones.items():
+			if widget is bone:
+				self.changedBones.add(name)
+
 		DeferredCall(self.form.update)
 
 	def showErrorMsg(self, req=None, code=None):
@@ -271,6 +285,9 @@ class EditWidget(html5.Div):
 			)
 
 		elif self.applicationType == EditWidget.appList:  ## Application: List
+			if self.key and not self.clone and self.wasInitialRequest:
+				self.renderFromStore()
+
 			if self.key and (not self.clone or self.wasInitialRequest):
 				NetworkService.request(
 					self.module, "edit/%s" % self.key, data,
@@ -288,6 +305,9 @@ class EditWidget(html5.Div):
 
 		elif self.applicationType == EditWidget.appTree or self.applicationType == EditWidget.appHierarchy:  ## Application: Tree
 			if self.key and not self.clone:
+				if self.wasInitialRequest:
+					self.renderFromStore()
+
 				NetworkService.request(
 					self.module, "edit/%s/%s" % (self.skelType, self.key), data,
 					secure=not self.wasInitialRequest,
@@ -312,6 +332,40 @@ class EditWidget(html5.Div):
 		else:
 			raise NotImplementedError()  # Should never reach this
 
+	def renderFromStore(self):
+		"""
+			Renders the form from the entity store while the server is asked for the entry,
+			if the entry and the edit structure of the module were loaded before.
+		"""
+		if self.form or self._hashArgs:
+			return
+
+		values = entityStore.get(self.module, self.key, stale=True)
+		structure = entityStore.getStructure(self.module, self.skelType)
+
+		if values and structure:
+			self.setData(data={"values": values, "structure": structure})
+			self.isProvisional = True
+			self.provisionalValues = values
+
+	def mergeProvisional(self, values):
+		"""
+			Takes the server's values into the provisional form the user already changed: bones the user
+			didn't touch get the current values, and a warning tells if touched bones changed on the server.
+		"""
+		untouched = {name: value for name, value in values.items()
+					 if name in self.form.bones and name not in self.changedBones}
+		conflicts = [name for name in self.changedBones
+					 if values.get(name) != (self.provisionalValues or {}).get(name)]
+
+		self.form.unserialize(untouched)
+
+		if conflicts:
+			conf["mainWindow"].log(
+				"warning", translate("This entry was changed meanwhile, please check your changes."),
+				modul=self.module, key=self.key, action=self.mode, data={name: values.get(name) for name in conflicts}
+			)
+
 	def clear(self):
 		"""
 			Removes all visible bones/forms/fieldsets.
@@ -322,7 +376,8 @@ class EditWidget(html5.Div):
 
 	def closeOrContinue(self, sender=None):
 		self.modified = False
-		NetworkService.notifyChange(self.module, key=self.key, action=self.mode)
+		self.changedBones = set()
+		NetworkService.notifyChange(self.module, key=self.key, action=self.mode, skelType=self.skelType)
 
 		if self.closeOnSuccess:
 			if self.module == "_tasks":
@@ -381,6 +436,21 @@ class EditWidget(html5.Div):
 		if request:
 			data = NetworkService.decode(request)
 
+			if self.isProvisional:
+				self.isProvisional = False
+
+				# Replace the provisional form by the server's data, or merge them once the user edits it
+				if not self.modified:
+					self.form = None
+				elif "values" in data:
+					self.mergeProvisional(data["values"])
+
+			if "values" in data and (self.wasInitialRequest or data.get("action") in ["addSuccess", "editSuccess"]):
+				entityStore.put(self.module, data["values"])
+
+			if self.mode == "edit" and "structure" in data and self.module != "_tasks":
+				entityStore.putStructure(self.module, self.skelType, data["structure"])
+
 		if not self.wasInitialRequest:
 			self.addClass("form-group--validation")
 
@@ -1,10 +1,14 @@
-from flare import html5, network
+from flare import html5
 from flare.button import Button
 from flare.icons import SvgIcon
 from flare.popup import Popup
 from flare.i18n import translate
 import vi.utils as utils
 from vi.config import conf
+from vi.services.filehash import fileHashes
+from vi.services.images import imageLoader
+from vi.services.thumbnails import thumbnailCache
+from vi.services.upload import FileUpload
 
 from vi.widgets.tree import TreeLeafWidget, TreeNodeWidget, TreeBrowserWidget
 from vi.widgets.search import Search
@@ -54,12 +58,27 @@ class FilePreviewImage(html5.Div):
 		self.downloadOnly = False
 		self.currentFile = None
 		self.previewIcon = None
+		self.previewTask = None  # loads the preview once shown, see imageLoader
 		self.setFile(file)
 		self.imageDownload = False
 
+	def onAttach(self):
+		super(FilePreviewImage, self).onAttach()
+
+		if self.previewTask:
+			imageLoader.observe(self, self.previewTask)
+
+	def onDetach(self):
+		imageLoader.unobserve(self)
+		super(FilePreviewImage, self).onDetach()
+
 	def setFile(self, file):
+		imageLoader.unobserve(self)
+		self.previewTask = None
+
 		if self.previewIcon:
 			self.removeChild(self.previewIcon)
+			self.previewIcon = None
 
 		if not file:
 			self.addClass("is-hidden")
@@ -97,7 +116,16 @@ class FilePreviewImage(html5.Div):
 		if preview:
 			self.removeClass("no-preview")
 
-		self.previewIcon = Icon( preview or svg, title = self.currentFile.get("name"))
+		if preview and conf["images.lazy"] and (file.get("mimetype") or "").startswith("image/"):
+			self.previewIcon = Icon("icon-image-file", title = self.currentFile.get("name"))
+			self.previewTask = lambda done: self.loadPreview(file, preview, done)
+			imageLoader.observe(self, self.previewTask)
+		elif preview and preview == file.get("downloadUrl") and thumbnailCache.isSupported(file):
+			self.previewIcon = Icon("icon-image-file", title = self.currentFile.get("name"))
+			self.loadPreview(file, preview)
+		else:
+			self.previewIcon = Icon( preview or svg, title = self.currentFile.get("name"))
+
 		self.appendChild(self.previewIcon)
 
 		if self.currentFile:
@@ -105,6 +133,35 @@ class FilePreviewImage(html5.Div):
 		else:
 			self.removeClass("is-clickable")
 
+	def loadPreview(self, file, preview, done=None):
+		"""
+			Shows the preview of 'file' once it is loaded. If the original would be loaded,
+			a thumbnail made of it is shown instead.
+		"""
+		self.previewTask = None
+
+		def show(url):
+			def onLoaded():
+				self.setPreview(file, url)
+
+				if done:
+					done()
+
+			imageLoader.preload(url, onLoaded)
+
+		if preview == file.get("downloadUrl") and thumbnailCache.isSupported(file):
+			thumbnailCache.load(file, self.size, True, lambda url: show(url or preview))
+		else:
+			show(preview)
+
+	def setPreview(self, file, url):
+		if file is not self.currentFile:  # another file was set meanwhile
+			return
+
+		self.removeChild(self.previewIcon)
+		self.previewIcon = Icon(url, title = file.get("name"))
+		self.appendChild(self.previewIcon)
+
 	def download(self):
 		if not self.currentFile:
 			return
@@ -149,56 +206,26 @@ class Uploader(html5.Div):
 		self.targetKey = None
 		self.addClass("is-loading")
 		self.appendChild(SvgIcon("icon-loader", title = "uploading..."))
+		self.progress = html5.Progress()
+		self.progress["max"] = 100
+		self.progress["value"] = 0
+		self.appendChild(self.progress)
 		self.context = context
-		params = {"fileName": file.name, "mimeType": (file.type or "application/octet-stream")}
-		if node:
-			params["node"] = node
-
-		r = NetworkService.request(module, "getUploadURL",
-			params=params,
-			successHandler=self.onUploadUrlAvailable,
-			failureHandler=self.onFailed,
-			secure=True
-		)
-		r.file = file
-		r.node = node
 		self.node = node
+		self.file = file
+
+		fileHashes.check(module, node, file, self.onDuplicate,
+						 lambda: FileUpload(module, node, file, self.onLoad, self.onFailed, self.onProgress))
 
 		conf["mainWindow"].log("progress", self)
 		self.parent().addClass("is-uploading")
 
-	def onUploadUrlAvailable(self, req):
+	def onLoad(self, targetKey):
 		"""
-			Internal callback - the actual upload url (retrieved by calling /file/getUploadURL) is known.
+			Internal callback - The file was transferred.
 		"""
-		params = NetworkService.decode(req)["values"]
-
-		if "uploadKey" in params:  # New Resumeable upload format
-			self.targetKey = params["uploadKey"]
-			url = params["uploadUrl"]
-			body = req.file
-		else:
-			formData = html5.jseval("new FormData()")
-
-			for key, value in params[ "params" ].items():
-				if key == "key":
-					self.targetKey = value[ :-16 ]  # Truncate source/file.dat
-					fileName = req.file.name
-					value = value.replace( "file.dat", fileName )
-
-				formData.append( key, value )
-
-			formData.append( "file", req.file )
+		self.targetKey = targetKey
 
-			url = params["url"]
-			body = formData
-
-		network.fetch_json(url, self.onLoad, method="POST", body=body, mode="no-cors")
-
-	def onLoad(self, *args, **kwargs):
-		"""
-			Internal callback - The state of our upload changed.
-		"""
 		NetworkService.request(
 			self.module, "add", {
 				"key": self.targetKey,
@@ -212,16 +239,25 @@ class Uploader(html5.Div):
 
 	def onUploadAdded(self, req):
 		self.responseValue = NetworkService.decode(req)
+
+		if isinstance(self.responseValue["values"], dict):
+			fileHashes.record(self.module, self.node, self.file, self.responseValue["values"])
+
 		DeferredCall(self.onSuccess, _delay=1000)
 
-	def onProgress(self, event):
+	def onDuplicate(self, skel):
+		"""
+			Internal callback - The file was uploaded into this node before.
+		"""
+		self.uploadSuccess.fire(self, skel)
+		self.replaceWithMessage("%s was already uploaded" % self.file.name, isSuccess=True)
+
+	def onProgress(self, loaded, total):
 		"""
 			Internal callback - further bytes have been transmitted
 		"""
-		if event.lengthComputable:
-			complete = int(event.loaded / event.total * 100)
-			self["value"] = complete
-			self["max"] = 100
+		if total:
+			self.progress["value"] = int(loaded / total * 100)
 
 	def onSuccess(self, *args, **kwargs):
 		"""
@@ -253,10 +289,18 @@ class Uploader(html5.Div):
 		self.parent().removeChild(self)
 
 class MultiUploader(html5.Div):
+	"""
+		Uploads several files to the server, at most conf["upload.concurrency"] at a time.
+
+		Failed transfers are retried by FileUpload, so a file failing here is given up on. The
+		progress over all files is shown in one log message, the tree is refreshed once all
+		files were handled.
+	"""
+
 	def __init__(self, files, node, context=None, module="file", *args, **kwargs):
 		"""
-			:param file: The file to upload
-			:type file: A javascript "File" Object
+			:param files: The files to upload
+			:type files: list of javascript "File" Objects
 			:param node: Key of the desired node of our parents tree application or None for an anonymous upload.
 			:type node: str or None
 		"""
@@ -264,75 +308,54 @@ class MultiUploader(html5.Div):
 		self.uploadSuccess = EventDispatcher("uploadSuccess")
 		self.module = module
 		self.node = node
-		self.responseValue = None
-		self.targetKey = None
-		#self.addClass("is-loading")
-		#self.appendChild(SvgIcon("icon-loader", title="uploading..."))
 		self.msg = html5.Span(html5.TextNode("uploading..."))
 		self.appendChild(self.msg )
 		self.context = context
 		self.files = files
-		self.filesToUpload = files[:]
-		self.handleFile(self.filesToUpload.pop(0))
+		self.entries = [{"file": file, "loaded": 0} for file in files]
+		self.filesToUpload = self.entries[:]
+		self.totalBytes = sum(file.size for file in files) or 1
+		self.percent = None
+		self.active = 0
+		self.uploaded = 0
+		self.duplicates = 0  # files uploaded before, see fileHashes
+		self.failed = []  # (file, error) of the files given up on
 
 		self.logMessage = conf["mainWindow"].log("progress", self)
 		self.parent().addClass("is-uploading")
 
-	def handleFile(self, file):
-		print("uploading %s/%s" % (len(self.files) - len(self.filesToUpload), len(self.files)))
-
-		params = {"fileName": file.name, "mimeType": (file.type or "application/octet-stream")}
-		if self.node:
-			params["node"] = self.node
-
+		self.startUploads()
 
-		## request uploadurl with skey
-		r = NetworkService.request(self.module, "getUploadURL",
-								   params=params,
-								   successHandler=self.onUploadUrlAvailable,
-								   failureHandler=self.onFailed,
-								   secure=True,
-								   )
-		r.file = file
-		r.node = self.node
-		self.replaceWithMessage("Uploading %s/%s" % (len(self.files) - len(self.filesToUpload), len(self.files)),
-								isSuccess="progress")
-
-	def onUploadUrlAvailable(self, req):
-		"""
-			Internal callback - the actual upload url (retrieved by calling /file/getUploadURL) is known.
-		"""
-		params = NetworkService.decode(req)["values"]
-
-		if "uploadKey" in params:  # New Resumeable upload format
-			self.targetKey = params["uploadKey"]
-
-			url = params["uploadUrl"]
-			body = req.file
-		else:
-			formData = html5.jseval("new FormData();")
+	def startUploads(self):
+		while self.filesToUpload and self.active < conf["upload.concurrency"]:
+			self.active += 1
+			self.handleFile(self.filesToUpload.pop(0))
 
-			for key, value in params["params"].items():
-				if key == "key":
-					self.targetKey = value[:-16]  # Truncate source/file.dat
-					fileName = req.file.name
-					value = value.replace("file.dat", fileName)
+		self.updateProgress()
 
-				formData.append(key, value)
-			formData.append("file", req.file)
+	def updateProgress(self):
+		percent = sum(entry["loaded"] for entry in self.entries) * 100 // self.totalBytes
 
-			url = params["url"]
-			body = formData
+		if percent != self.percent:
+			self.percent = percent
+			self.replaceWithMessage("Uploading %s/%s (%d%%)" % (self.uploaded, len(self.files), percent),
+									isSuccess="progress")
 
-		network.fetch_json(url, self.onLoad, method="POST", body=body, mode="no-cors")
+	def handleFile(self, entry):
+		fileHashes.check(self.module, self.node, entry["file"],
+						 lambda skel: self.onDuplicate(entry, skel),
+						 lambda: FileUpload(self.module, self.node, entry["file"],
+											lambda targetKey: self.onLoad(entry, targetKey),
+											lambda error: self.onFileFailed(entry, error),
+											lambda loaded, total: self.onFileProgress(entry, loaded)))
 
-	def onLoad(self, *args, **kwargs):
+	def onLoad(self, entry, targetKey):
 		"""
-			Internal callback - The state of our upload changed.
+			Internal callback - The file was transferred.
 		"""
-		NetworkService.request(
+		r = NetworkService.request(
 			self.module, "add", {
-				"key": self.targetKey,
+				"key": targetKey,
 				"node": self.node,
 				"skelType": "leaf"
 			},
@@ -340,34 +363,81 @@ class MultiUploader(html5.Div):
 			failureHandler=self.onFailed,
 			secure=True
 		)
+		r.entry = entry
+
+	def onFileProgress(self, entry, loaded):
+		entry["loaded"] = loaded
+		self.updateProgress()
 
 	def onUploadAdded(self, req):
-		self.responseValue = NetworkService.decode(req)
-		DeferredCall(self.onSuccess, _delay=1000)
+		responseValue = NetworkService.decode(req)
+
+		if isinstance(responseValue["values"], list):
+			for v in responseValue["values"]:
+				self.uploadSuccess.fire(self, v)
+
+		else:
+			self.uploadSuccess.fire(self, responseValue["values"])
+			fileHashes.record(self.module, self.node, req.entry["file"], responseValue["values"])
+
+		self.active -= 1
+		self.uploaded += 1
+		self.percent = None  # show the files uploaded
+		self.onFileFinished()
+
+	def onDuplicate(self, entry, skel):
+		"""
+			Internal callback - The file was uploaded into this node before, use the existing entry.
+		"""
+		self.uploadSuccess.fire(self, skel)
+
+		self.active -= 1
+		self.uploaded += 1
+		self.duplicates += 1
+		entry["loaded"] = entry["file"].size
+		self.percent = None
+		self.onFileFinished()
+
+	def onFailed(self, req, code=None, *args, **kwargs):
+		self.onFileFailed(req.entry, code)
+
+	def onFileFailed(self, entry, error):
+		self.active -= 1
+		entry["loaded"] = 0
+		self.failed.append((entry["file"], error))
+		self.onFileFinished()
+
+	def onFileFinished(self):
+		self.startUploads()
+
+		if not self.active and not self.filesToUpload:
+			DeferredCall(self.onSuccess, _delay=1000)
 
 	def onSuccess(self, *args, **kwargs):
 		"""
-			Internal callback - The upload succeeded.
+			Internal callback - All files were handled.
 		"""
-		if isinstance(self.responseValue["values"], list):
-			for v in self.responseValue["values"]:
-				self.uploadSuccess.fire(self, v)
+		NetworkService.notifyChange(self.module)
+		self.parent().removeClass("is-uploading")
+		self.parent().removeClass("log-progress")
 
-		else:
-			self.uploadSuccess.fire(self, self.responseValue["values"])
+		if self.failed:
+			self.replaceWithMessage(
+				"%s of %s uploads failed: %s" % (
+					len(self.failed), len(self.files),
+					", ".join("%s (%s)" % (file.name, error) for file, error in self.failed)
+				),
+				isSuccess=False
+			)
+			return
 
-		if len(self.filesToUpload) == 0:
-			NetworkService.notifyChange("file")
-			self.replaceWithMessage("Upload complete", isSuccess="finished")
-			self.parent().removeClass("is-uploading")
-			self.parent().removeClass("log-progress")
-			DeferredCall(self.closeMessage,_delay=2500)
+		if self.duplicates:
+			self.replaceWithMessage("Upload complete, %s of %s files were already uploaded" % (
+				self.duplicates, len(self.files)), isSuccess="finished")
 		else:
-			self.handleFile(self.filesToUpload.pop(0))
+			self.replaceWithMessage("Upload complete", isSuccess="finished")
 
-
-	def onFailed(self, errorCode, *args, **kwargs):
-		self.replaceWithMessage("Upload failed with status code %s" % errorCode, isSuccess=False)
+		DeferredCall(self.closeMessage,_delay=2500)
 
 	def replaceWithMessage(self, message, isSuccess):
 		if isSuccess == "finished":
@@ -427,6 +497,8 @@ class FileWidget(TreeBrowserWidget):
 		if not searchStr:
 			self.setRootNode(self.rootNode)
 		else:
+			self.abortRequests()
+
 			for c in self.entryFrame._children[ : ]:
 				self.entryFrame.removeChild( c )
 
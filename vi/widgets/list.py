@@ -3,17 +3,27 @@ from collections import defaultdict
 
 from vi.config import conf
 from flare.i18n import translate
-from flare.network import NetworkService
+from flare.network import NetworkService, DeferredCall
 from vi.priorityqueue import ModuleWidgetSelector
 from flare.viur import BoneSelector
 from vi.widgets.sidebar import SideBar
 from vi.framework.components.datatable import DataTable, ViewportDataTable
 from vi.framework.components.actionbar import ActionBar
+from vi.services.abort import abortRequests
+from vi.services.batchsize import BatchSizeController
+from vi.services.changes import changeDispatcher
+from vi.services.entities import entityLoader
+from vi.services.ingest import skelIngest
+from vi.services.prefetch import prefetcher
+from vi.services.scheduler import scheduler
+from vi.services.store import entityStore
+from vi.services.projection import FieldProjection
 from flare.event import EventDispatcher
 from flare.icons import SvgIcon
 from collections import OrderedDict
 
 import logging
+import time
 
 
 class ListWidget(html5.Div):
@@ -23,6 +33,8 @@ class ListWidget(html5.Div):
 		to this table.
 	"""
 
+	adaptiveBatchSize = True  # Learn the batch size from the measured costs, see BatchSizeController
+
 	def __init__(self, module, filter=None, columns=None, filterID=None, filterDescr=None,
 				 batchSize=None, context=None, autoload=True, *args, **kwargs):
 		"""
@@ -36,6 +48,12 @@ class ListWidget(html5.Div):
 		self.addClass("vi-widget vi-widget--list")
 		self["style"]["height"] = "100%"
 		self._batchSize = batchSize or conf["batchSize"]  # How many rows do we fetch at once?
+		self._batchSizeController = None
+
+		if self.adaptiveBatchSize and conf["batchSize.adaptive"] and not batchSize:
+			self._batchSizeController = BatchSizeController(module, self._batchSize)
+			self._batchSize = self._batchSizeController.batchSize
+
 		self.isDetaching = False  # If set, this widget is beeing about to be removed - dont issue nextBatchNeeded requests
 		self.module = module
 		self.context = context
@@ -83,6 +101,10 @@ class ListWidget(html5.Div):
 		self._currentCursor = None
 		self._structure = None
 		self._currentRequests = []
+		self._changeGeneration = None  # generation of changes seen when this widget was detached
+		self._reloadOnAttach = False  # set if requests were aborted on detach
+		self._loadedBytes = 0  # Approximate size of the responses the current rows were loaded from
+		self._loadAll = None  # State of a running loadAll(), None if not running
 		self.columns = []
 
 		self.selectionMulti = True
@@ -94,10 +116,12 @@ class ListWidget(html5.Div):
 		self.filterID = filterID  # Hint for the sidebarwidgets which predefined filter is currently active
 		self.filterDescr = filterDescr  # Human-readable description of the current filter
 		self._tableHeaderIsValid = False
+		self.projection = FieldProjection(module)  # Fields of the entries kept in the model
 
 		# build Table
 		self.tableInitialization(*args, **kwargs)
 		self.selectionActivatedEvent = EventDispatcher("selectionActivated")
+		self.loadAllEvent = EventDispatcher("loadAllProgress")
 
 		# build actions
 		self.actions = []
@@ -182,6 +206,7 @@ class ListWidget(html5.Div):
 
 	def setAmount(self, amount):
 		self._batchSize = amount
+		self._batchSizeController = None  # explicitly chosen by the user
 
 	def setPage(self, page=0):
 		'''
@@ -305,25 +330,33 @@ class ListWidget(html5.Div):
 				filter.update(self.context)
 
 			filter.update(self.filter)
-			filter["limit"] = self._batchSize
+			filter.update(self.projection.getParams())
+			filter["limit"] = self.getBatchSize()
 			filter["cursor"] = self._currentCursor
 
 			if conf["modules"] and self.module in conf["modules"].keys():
 				if self.group:
-					self._currentRequests.append(NetworkService.request(self.module, "list/%s" % self.group, filter,
-																		successHandler=self.onCompletion,
-																		failureHandler=self.showErrorMsg))
+					self._currentRequests.append(scheduler.request(self.module, "list/%s" % self.group, filter,
+																		successHandler=skelIngest.wrap(self.onCompletion, self.projection),
+																		failureHandler=self.showErrorMsg,
+																		priority="visible", conditional=True))
 				else:
-					self._currentRequests.append(NetworkService.request(self.module, "list", filter,
-																		successHandler=self.onCompletion,
-																		failureHandler=self.showErrorMsg))
+					self._currentRequests.append(scheduler.request(self.module, "list", filter,
+																		successHandler=skelIngest.wrap(self.onCompletion, self.projection),
+																		failureHandler=self.showErrorMsg,
+																		priority="visible", conditional=True))
 
 
 			else:
 
-				self._currentRequests.append(NetworkService.request(self.module, "list", filter,
-																	successHandler=self.onCompletion,
-																	failureHandler=self.showErrorMsg))
+				self._currentRequests.append(scheduler.request(self.module, "list", filter,
+																	successHandler=skelIngest.wrap(self.onCompletion, self.projection),
+																	failureHandler=self.showErrorMsg,
+																	priority="visible", conditional=True))
+
+			if self._batchSizeController:
+				self._batchSizeController.requestStarted(self._currentRequests[-1])
+
 			self._currentCursor = None
 		else:
 			self.actionBar.resetLoadingState()
@@ -334,13 +367,36 @@ class ListWidget(html5.Div):
 	def onAttach(self):
 		self.isDetaching = False
 		super(ListWidget, self).onAttach()
-		NetworkService.registerChangeListener(self)
+		changeDispatcher.register(self, [self.module])
+
+		# Catch up with changes that happened while this widget was hidden,
+		# or reload the data that was aborted when it was hidden
+		if self._reloadOnAttach or (self._changeGeneration is not None
+				and self._changeGeneration != changeDispatcher.generation(self.module)):
+			self.onDataChanged(self.module)
+
+		elif self._loadAll and self._loadAll["paused"]:
+			self._loadAll["paused"] = False
+			self.loadNextOfAll()
+
+		self._changeGeneration = None
+		self._reloadOnAttach = False
 
 	def onDetach(self):
 		self.isDetaching = True
 		super(ListWidget, self).onDetach()
+		changeDispatcher.unregister(self)
+		self._changeGeneration = changeDispatcher.generation(self.module)
+
+		if self._currentRequests:
+			abortRequests(self._currentRequests)
+			self._reloadOnAttach = True
 
-	# NetworkService.removeChangeListener( self )
+	def abortRequests(self):
+		"""
+			Cancels all outstanding list requests, so superseded data is neither transferred nor decoded.
+		"""
+		abortRequests(self._currentRequests)
 
 	def onDataChanged(self, module,*args, **kwargs):
 		"""
@@ -351,14 +407,139 @@ class ListWidget(html5.Div):
 			return
 		if not self.viewStructure:
 			self.requestStructure()
-		else:
+		elif not self.refreshEntries(kwargs.get("events") or [kwargs]):
+			self.reloadData()
+
+	def refreshEntries(self, events):
+		"""
+			Fetches the entries added or edited according to the given change events, and patches their rows.
+			Returns False if the list has to be reloaded instead, e.g. for deletions or changes without a key.
+		"""
+		if self._loadAll or self._currentRequests or not self.table.getRowCount():
+			return False
+
+		if not all(event.get("key") and event.get("action") in ["add", "edit"] for event in events):
+			return False
+
+		for event in events:
+			values = entityStore.get(self.module, event["key"])  # the editor stored the saved entry
+
+			if values:
+				self.onEntryChanged(values, event["action"])
+			else:
+				entityLoader.load(self.module, event["key"],
+								  lambda values, action=event["action"]: self.onEntryChanged(values, action),
+								  failureHandler=lambda *args, **kwargs: self.reloadData(),
+								  priority="interactive")
+
+		return True
+
+	def getFilterParams(self, conditionsOnly=False):
+		params = {}
+		params.update(self.context or {})
+		params.update(self.filter or {})
+
+		if conditionsOnly:
+			for name in ["orderby", "orderdir", "limit", "cursor", "amount"]:
+				params.pop(name, None)
+
+		return params
+
+	def matchesFilter(self, skel):
+		"""
+			Checks if an entry matches the filter and context of this list.
+			Returns None if this can't be decided on the client, e.g. for range or relational filters.
+		"""
+		for name, value in self.getFilterParams(conditionsOnly=True).items():
+			if "$" in name or "." in name or name not in skel:
+				return None
+
+			current = skel[name]
+
+			if isinstance(current, bool):
+				if current != (str(value).lower() in ["1", "true", "yes"]):
+					return False
+
+			elif isinstance(current, (str, int, float)):
+				if str(current) != str(value):
+					return False
+
+			else:
+				return None
+
+		return True
+
+	def findPosition(self, skel):
+		"""
+			Returns the row index an entry belongs to by the sort order of this list,
+			-1 if it belongs to a batch not loaded yet, or None if the order isn't known.
+		"""
+		params = self.getFilterParams()
+		orderby = params.get("orderby")
+		if not orderby or orderby not in skel:
+			return None
+
+		descending = str(params.get("orderdir", "0")) in ["1", "desc"]
+		model = self.table._model
+
+		try:
+			for idx, row in enumerate(model):
+				if (skel[orderby] > row[orderby]) if descending else (skel[orderby] < row[orderby]):
+					return idx
+
+		except (KeyError, TypeError):  # rows lacking the field or values which can't be compared
+			return None
+
+		return -1 if self._currentCursor else len(model)
+
+	def onEntryChanged(self, skel, action):
+		"""
+			Patches, moves, inserts or removes the row of an entry after it was added or edited.
+		"""
+		if self._currentRequests:  # reloading anyway
+			return
+
+		self.projection.apply([skel])
+		model = self.table._model
+		idx = next((idx for idx, row in enumerate(model) if row.get("key") == skel["key"]), None)
+
+		match = self.matchesFilter(skel)
+		if match is None:
+			self.reloadData()
+			return
+
+		orderby = self.getFilterParams().get("orderby")
+
+		if idx is not None:
+			if not match:
+				self.table.pop(idx)
+				return
+
+			if not orderby or model[idx].get(orderby) == skel.get(orderby):
+				self.table.replace(idx, skel)
+				return
+
+			self.table.pop(idx)  # the sort position changed
+
+		elif not match or (action == "edit" and not self.getFilterParams(conditionsOnly=True)):
+			return  # not listed before and after the change, or listed on a batch not loaded yet
+
+		position = self.findPosition(skel)
+
+		if position is None:
 			self.reloadData()
+		elif position >= 0:
+			self.table.insert(position, skel)
 
-	def requestStructure(self):
-		NetworkService.request(None,
-							   "/vi/getStructure/%s" % self.module,
-							   successHandler=self.receivedStructure
-							   )
+	def requestStructure(self, usePrefetched=True):
+		if usePrefetched and prefetcher.take("/vi/getStructure/%s" % self.module, None, self.receivedStructure,
+												lambda *args, **kwargs: self.requestStructure(False)):
+			return
+
+		scheduler.request(None,
+						  "/vi/getStructure/%s" % self.module,
+						  successHandler=self.receivedStructure,
+						  priority="visible", conditional=True, shared=True)
 
 	def receivedStructure(self, resp):
 		data = NetworkService.decode(resp)
@@ -384,29 +565,45 @@ class ListWidget(html5.Div):
 		self.targetPage = 1
 		self.currentPage = 0
 		self._currentCursor = None
-		self._currentRequests = []
+		self.abortRequests()
+		self._loadedBytes = 0
+		self.cancelLoadAll()
+		self.updateProjection()
 
 		filter = {}
 		if self.context:
 			filter.update(self.context)
 
 		filter.update(self.filter)
-		filter["limit"] = self._batchSize
+		filter.update(self.projection.getParams())
+		filter["limit"] = self.getBatchSize()
+
+		req = prefetcher.take("/vi/%s/%s" % (self.module, "list/%s" % self.group if self.group else "list"), filter,
+							  skelIngest.wrap(self.onCompletion, self.projection), self.showErrorMsg)
+		if req:
+			self._currentRequests.append(req)
+			return
 
 		if conf["modules"] and self.module in conf["modules"].keys():
 			if self.group:
-				self._currentRequests.append(NetworkService.request(self.module, "list/%s" % self.group, filter,
-																	successHandler=self.onCompletion,
-																	failureHandler=self.showErrorMsg))
+				self._currentRequests.append(scheduler.request(self.module, "list/%s" % self.group, filter,
+																	successHandler=skelIngest.wrap(self.onCompletion, self.projection),
+																	failureHandler=self.showErrorMsg,
+																	priority="visible", conditional=True))
 			else:
-				self._currentRequests.append(NetworkService.request(self.module, "list", filter,
-																	successHandler=self.onCompletion,
-																	failureHandler=self.showErrorMsg))
+				self._currentRequests.append(scheduler.request(self.module, "list", filter,
+																	successHandler=skelIngest.wrap(self.onCompletion, self.projection),
+																	failureHandler=self.showErrorMsg,
+																	priority="visible", conditional=True))
 
 		else:
-			self._currentRequests.append(NetworkService.request(self.module, "list", filter,
-																successHandler=self.onCompletion,
-																failureHandler=self.showErrorMsg))
+			self._currentRequests.append(scheduler.request(self.module, "list", filter,
+																successHandler=skelIngest.wrap(self.onCompletion, self.projection),
+																failureHandler=self.showErrorMsg,
+																priority="visible", conditional=True))
+
+		if self._batchSizeController:
+			self._batchSizeController.requestStarted(self._currentRequests[-1])
 
 	def setFilter(self, filter, filterID=None, filterDescr=None):
 		"""
@@ -454,7 +651,9 @@ class ListWidget(html5.Div):
 		self.entryActionBar.resetLoadingState()
 		self.tableBottomActionBar.resetLoadingState()
 
-		data = NetworkService.decode(req)
+		data = skelIngest.decode(req)
+		responseSize = len(req.result or "")
+		self._loadedBytes += responseSize
 
 		if not data["skellist"]:
 			if self.table.getRowCount():
@@ -467,8 +666,40 @@ class ListWidget(html5.Div):
 				self.table["style"]["display"] = "none"
 				self.emptyNotificationDiv.addClass("is-active")
 				self.updateEmptyNotification()
+
+			if self._loadAll:
+				self.continueLoadAll(0)
+
 			return
 
+		self.prepareTable()
+		self.projection.apply(data["skellist"])
+		entityStore.putList(self.module, data["skellist"], complete=self.projection.fields is None)
+
+		if data["skellist"] and "cursor" in data.keys():
+			self._currentCursor = data["cursor"]
+			self.table.setDataProvider(self)
+		else:
+			self.requestingFinishedEvent.fire()
+			self.table.setDataProvider(None)
+
+		renderStart = time.time()
+		self.table.extend(data["skellist"], writeToModel=True)
+
+		if self._batchSizeController:
+			self._batchSizeController.measure(req, len(data["skellist"]), responseSize, time.time() - renderStart)
+
+		if self._loadAll:
+			self.continueLoadAll(time.time() - renderStart)
+
+		# if targetPage higher than loadedPage, request next Batch
+		elif self.targetPage > self.loadedPages:
+			self.onNextBatchNeeded()
+
+	def prepareTable(self):
+		"""
+			Shows the table and sets up its header when the first rows were received.
+		"""
 		self.table["style"]["display"] = ""
 		self.emptyNotificationDiv.removeClass("is-active")
 		self._structure = self.viewStructure
@@ -481,18 +712,78 @@ class ListWidget(html5.Div):
 						self.columns.append(boneName)
 			self.setFields(self.columns)
 
-		if data["skellist"] and "cursor" in data.keys():
-			self._currentCursor = data["cursor"]
-			self.table.setDataProvider(self)
-		else:
-			self.requestingFinishedEvent.fire()
-			self.table.setDataProvider(None)
+	def loadAll(self, maxRows=None, maxBytes=None):
+		"""
+			Continuously fetches all remaining batches of the list.
 
-		self.table.extend(data["skellist"], writeToModel=True)
+			The next batch is requested only after the previous one was rendered, and is delayed
+			by the time the rendering took, so the browser remains responsive on large modules.
+			Loading stops when all entries are loaded, on cancelLoadAll(), or when the amount of
+			rows or the approximate size of the loaded data reaches its ceiling.
 
-		# if targetPage higher than loadedPage, request next Batch
-		if self.targetPage > self.loadedPages:
-			self.onNextBatchNeeded()
+			Progress is reported by loadAllEvent as (widget, rowCount, rowsPerSecond, stopReason),
+			where stopReason is None while loading continues, otherwise one of "complete",
+			"cancelled", "maxRows" or "maxBytes".
+		"""
+		self._loadAll = {
+			"maxRows": maxRows or conf["loadAll.maxRows"],
+			"maxBytes": maxBytes or conf["loadAll.maxBytes"],
+			"startRows": self.table.getRowCount(),
+			"startTime": time.time(),
+			"paused": False
+		}
+
+		if not self._currentRequests:
+			if self._currentCursor:
+				self.loadNextOfAll()
+			else:
+				self.continueLoadAll(0)
+
+	def cancelLoadAll(self):
+		"""
+			Stops a running loadAll(). A batch already requested is still added to the table.
+		"""
+		if self._loadAll:
+			self.stopLoadAll("cancelled")
+
+	def stopLoadAll(self, reason):
+		state = self._loadAll
+		self._loadAll = None
+
+		rowCount = self.table.getRowCount()
+		self.loadAllEvent.fire(self, rowCount, self.getLoadAllRate(state, rowCount), reason)
+
+	def getLoadAllRate(self, state, rowCount):
+		return (rowCount - state["startRows"]) / max(time.time() - state["startTime"], 0.001)
+
+	def continueLoadAll(self, renderTime):
+		"""
+			Checks the ceilings after a batch was added and schedules the next one.
+			:param renderTime: Seconds it took to render the batch, used to delay the next request.
+		"""
+		state = self._loadAll
+		rowCount = self.table.getRowCount()
+
+		if not self._currentCursor:
+			return self.stopLoadAll("complete")
+		elif state["maxRows"] and rowCount >= state["maxRows"]:
+			return self.stopLoadAll("maxRows")
+		elif state["maxBytes"] and self._loadedBytes >= state["maxBytes"]:
+			return self.stopLoadAll("maxBytes")
+
+		self.loadAllEvent.fire(self, rowCount, self.getLoadAllRate(state, rowCount), None)
+		DeferredCall(self.loadNextOfAll, _delay=int(renderTime * 1000))
+
+	def loadNextOfAll(self):
+		if not self._loadAll or self._currentRequests:
+			return
+
+		# Don't load into a hidden view; continues on attach
+		if self.isDetaching:
+			self._loadAll["paused"] = True
+			return
+
+		self.onNextBatchNeeded()
 
 	def setFields(self, fields):
 		if not self._structure:
@@ -529,9 +820,64 @@ class ListWidget(html5.Div):
 		self.table.setCellRenders(rendersDict)
 		self._tableHeaderIsValid = True
 
+		# Rows loaded so far were stripped of the newly shown fields
+		if self.updateProjection() and self.table.getRowCount():
+			self.reloadData()
+
 	def getFields(self):
 		return self.columns[:]
 
+	def getBatchSize(self):
+		"""
+			Returns the amount of rows to request with the next batch.
+		"""
+		if self._batchSizeController:
+			self._batchSize = self._batchSizeController.batchSize
+
+		return self._batchSize
+
+	def updateProjection(self):
+		"""
+			Updates the field projection from the currently shown columns.
+			Returns True if already loaded rows lack fields which are required now.
+		"""
+		if self.isSelector:  # Selections are returned to relational bones, which need the entire entries
+			self.projection.fields = None
+			return False
+
+		columns = self.columns
+		if not columns and self.viewStructure:
+			columns = [boneName for boneName, boneInfo in self.viewStructure.items() if boneInfo["visible"]]
+
+		return self.projection.setFields(columns)
+
+	def requestFullEntry(self, entry, callback, fields=None):
+		"""
+			Calls 'callback' with the entire entry for a row of this list.
+
+			Rows are stripped by the field projection, so the entry is taken from the entity store
+			or fetched from the server, unless it is unprojected or already provides all of the given fields.
+			Stored entries older than conf["entityStore.maxAge"] are fetched again in the background,
+			which updates the widgets subscribed to them, e.g. the internal preview.
+		"""
+		if fields is None and self._structure:
+			fields = self._structure.keys()
+
+		if self.projection.fields is None or (fields is not None and all(field in entry for field in fields)):
+			callback(entry)
+			return
+
+		values = entityStore.get(self.module, entry["key"])
+		if values:
+			callback(values)
+
+			if entityStore.isExpired(self.module, entry["key"]):
+				entityLoader.load(self.module, entry["key"], lambda values: None, priority="background")
+
+			return
+
+		entityLoader.load(self.module, entry["key"], callback, priority="interactive")
+
 	def onSelectionActivated(self, table, selection):
 		self.activateSelection()
 
@@ -551,6 +897,7 @@ ModuleWidgetSelector.insert(1, ListWidget.canHandle, ListWidget)
 
 
 class ViewportListWidget(ListWidget):
+	adaptiveBatchSize = False  # Pages are sliced from the model by the batch size
 
 	def tableInitialization(self, *args, **kwargs):
 		'''
@@ -560,7 +907,12 @@ class ViewportListWidget(ListWidget):
 
 		Override explanation
 			- use ViewPort DataTable with rows parameter
+			- the page window starts empty, so it can be used before the first reloadData()
 		'''
+		self._pages = OrderedDict()  # page -> list of entries, for at most conf["viewport.pageWindow"] pages
+		self._pageCursors = {1: None}  # page -> cursor to fetch it, for every page boundary seen so far
+		self.lastPage = None  # known once the end of the list was reached
+
 		self.table = ViewportDataTable(rows=self._batchSize,
 									   checkboxes=self._checkboxes,
 									   indexes=self._indexes,
@@ -586,48 +938,195 @@ class ViewportListWidget(ListWidget):
 		self.table._rows = amount
 		self.table.rebuildTable()
 
+	def reloadData(self):
+		"""
+			Removes all pages and cursor checkpoints, and fetches the first page from the server.
+
+			Override explanation
+			- pages are kept in a bounded window, see requestPage() and onCompletion()
+		"""
+		self.table.clear()
+		self._pages = OrderedDict()
+		self._pageCursors = {1: None}
+		self.lastPage = None
+		self.loadedPages = 0
+		self.currentPage = 0
+		self.targetPage = 1
+		self.abortRequests()
+		self.cancelLoadAll()
+		self.updateProjection()
+
+		self.requestPage(1)
+
+	def requestPage(self, page):
+		"""
+			Requests a page by its cursor checkpoint.
+			If no checkpoint is known for that page, the nearest page before it is requested,
+			and onCompletion() continues until the target page is reached.
+		"""
+		if page not in self._pageCursors:
+			page = max(p for p in self._pageCursors.keys() if p < page)
+
+		if any(req.page == page for req in self._currentRequests):
+			return
+
+		filter = {}
+		if self.context:
+			filter.update(self.context)
+
+		filter.update(self.filter)
+		filter.update(self.projection.getParams())
+		filter["limit"] = self._batchSize
+
+		if self._pageCursors[page]:
+			filter["cursor"] = self._pageCursors[page]
+
+		req = scheduler.request(self.module, "list/%s" % self.group if self.group else "list", filter,
+								successHandler=skelIngest.wrap(self.onCompletion, self.projection),
+								failureHandler=self.showErrorMsg,
+								priority="visible", conditional=True)
+		req.page = page
+		self._currentRequests.append(req)
+
+	def onNextBatchNeeded(self):
+		"""
+			Override explanation
+			- requests the page following the current one
+		"""
+		if self.isDetaching or (self.lastPage and self.currentPage >= self.lastPage):
+			self.actionBar.resetLoadingState()
+			self.entryActionBar.resetLoadingState()
+			self.tableBottomActionBar.resetLoadingState()
+			return
+
+		self.setPage(1)
+
+	def onCompletion(self, req):
+		"""
+			Stores the received page in the window and shows it if it is the targeted page.
+
+			Override explanation
+			- entries are kept per page, and pages farthest from the target page are evicted
+		"""
+		if not req in self._currentRequests:
+			return
+
+		self._currentRequests.remove(req)
+		self.actionBar.resetLoadingState()
+		self.entryActionBar.resetLoadingState()
+		self.tableBottomActionBar.resetLoadingState()
+
+		data = skelIngest.decode(req)
+		page = req.page
+		skellist = data["skellist"]
+
+		if not skellist:
+			if page == 1:
+				self.table["style"]["display"] = "none"
+				self.emptyNotificationDiv.addClass("is-active")
+				self.updateEmptyNotification()
+			else:
+				# The previous page was the last one
+				self.lastPage = page - 1
+				self._pageCursors.pop(page, None)
+				self.setPage(self.lastPage - self.currentPage)
+
+			return
+
+		self.prepareTable()
+		self.projection.apply(skellist)
+		entityStore.putList(self.module, skellist, complete=self.projection.fields is None)
+
+		self._pages[page] = skellist
+		self.loadedPages = max(self.loadedPages, page)
+
+		if "cursor" in data.keys() and len(skellist) >= self._batchSize:
+			self._pageCursors[page + 1] = data["cursor"]
+		else:
+			self.lastPage = page
+
+		# Keep the window bounded
+		while len(self._pages) > conf["viewport.pageWindow"]:
+			del self._pages[max(self._pages.keys(), key=lambda p: abs(p - self.targetPage))]
+
+		if page < self.targetPage and (self.lastPage is None or page < self.lastPage):
+			self.requestPage(page + 1)  # walking towards a page without a checkpoint
+		else:
+			self.showPage(min(self.targetPage, page))
+
+	def onEntryChanged(self, skel, action):
+		"""
+			Patches the row of an edited entry.
+
+			Override explanation
+			- only pages kept in the window are patched
+			- added entries and entries changing their position shift the pages, so the list is reloaded
+		"""
+		if self._currentRequests:
+			return
+
+		self.projection.apply([skel])
+		orderby = self.getFilterParams().get("orderby")
+
+		for page, objs in self._pages.items():
+			for idx, row in enumerate(objs):
+				if row.get("key") != skel["key"]:
+					continue
+
+				if (action != "edit" or self.matchesFilter(skel) is not True
+						or (orderby and row.get(orderby) != skel.get(orderby))):
+					self.reloadData()
+				elif page == self.currentPage:
+					self.table.replace(idx, skel)  # the table's model is the shown page
+				else:
+					objs[idx] = skel
+
+				return
+
+		if action == "add" or (self.getFilterParams(conditionsOnly=True) and self.matchesFilter(skel) is not False):
+			self.reloadData()
+
 	def setPage(self, page=0):
 		'''
-		sets targetpage. if not enougth loadedpages this pages will be requested
-		else
+		sets targetpage. pages outside the window are fetched by their cursor checkpoint
 
-		:param page: sets targetpage
+		:param page: amount of pages to move from the current page
 		:return:
 		'''
+		self.targetPage = max(self.currentPage + page, 1)
+		if self.lastPage:
+			self.targetPage = min(self.targetPage, self.lastPage)
 
-		self.targetPage = self.currentPage + page
-		if self.targetPage < 0:
-			self.targetPage = 0
-
-		if self.targetPage > self.loadedPages:
-			self.onNextBatchNeeded()
-			return  # waiting till pages loaded
-
-		# if pages are existing load page
-		self._setPage(self.targetPage)
+		if self.targetPage in self._pages:
+			self.showPage(self.targetPage)
+		else:
+			self.requestPage(self.targetPage)
 
-	def _setPage(self, page=0):
+	def showPage(self, page):
 		'''
 		render page to table
 		:param page:
 		:return:
 		'''
-		if page > self.loadedPages:  # set page to Max possible
-			page = self.loadedPages
-		elif page < 0:
-			page = 0
-
-		start = page * self._batchSize
-		end = (page + 1) * self._batchSize
+		objs = self._pages[page]
+		self._pages.move_to_end(page)
+		self.currentPage = page
 
-		objs = self.table._model[start:end]
-		self.currentPage = max(page, 1)
+		# The table's model only holds the shown page, so row indexes map to its entries
+		self.table._model = objs
+		self.table._renderedModel = []
 		self.table.update(objs, writeToModel=False)
 
-	def onRequestingFinished(self, *args, **kwargs):
-		# after Page is loaded scroll to this Page, while targetPage is lower than loadedPages
-		if self.targetPage and self.targetPage < self.loadedPages:
-			self._setPage(self.targetPage)
+		for idx in range(len(objs), self.table._rows):
+			tr = self.table.table.getTrByIndex(idx)
+			if tr is not None:
+				tr.addClass("is-hidden")
+
+		if self.lastPage and page >= self.lastPage:
+			self.requestingFinishedEvent.fire()
+			self.table.setDataProvider(None)
+		else:
+			self.table.setDataProvider(self)
 
 	def setTableActionBar(self):
 		self.tableBottomActionBar = ActionBar(self.module, "list", currentAction="list")
@@ -1,8 +1,16 @@
 # -*- coding: utf-8 -*-
 from flare import html5, utils
 from flare.viur.formatString import formatString
-from flare.network import NetworkService
+from flare.network import NetworkService, DeferredCall
 from vi.framework.components.actionbar import ActionBar
+from vi.services.abort import abortRequests
+from vi.services.changes import changeDispatcher
+from vi.services.entities import entityLoader
+from vi.services.ingest import skelIngest
+from vi.services.prefetch import prefetcher
+from vi.services.scheduler import scheduler
+from vi.services.store import entityStore
+from vi.services.treecache import treeCache
 from flare.event import EventDispatcher
 from vi.priorityqueue import DisplayDelegateSelector, ModuleWidgetSelector
 from flare.viur import BoneSelector
@@ -11,6 +19,8 @@ from flare.i18n import translate
 from flare.icons import SvgIcon,Icon
 from time import time
 from collections import OrderedDict
+from bisect import bisect_right
+import json
 import logging
 
 
@@ -69,8 +79,17 @@ class TreeWidget(html5.Div):
 		self._isShiftPressed = False
 		self._ctlStartRow = None
 		self._currentRow = None
-		self._expandedNodes = []
+		self._expandedNodes = self.loadExpandedNodes()
+		self._restoreQueue = []  # expanded nodes whose children are loaded with the next restore requests
+		self._restoreScheduled = False
 		self._currentRequests = []
+		self._changeGeneration = None  # generation of changes seen when this widget was detached
+		self._reloadOnAttach = False  # set if requests were aborted on detach
+		self.entryFrameNode = None  # node whose children are shown in the entryFrame
+		self._itemsByKey = {}  # key -> item widget, see itemForKey()
+		self._parentKeys = {}  # key -> key of the node the item is shown in
+		self._positions = (None, {})  # list and the id() -> index of its children, see positionOf()
+		self._cachedPages = {}  # (node, skelType, cursor) -> (skellist, next cursor, items) rendered from the treeCache
 		self.path = []
 
 		# Selection
@@ -98,19 +117,25 @@ class TreeWidget(html5.Div):
 		if self.rootNode:
 			self.requestStructure()
 		else:
-			NetworkService.request(
+			treeCache.requestRootNodes(
 				self.module,
-				"listRootNodes",
 				self.context or {},
-				successHandler=self.onSetDefaultRootNode,
+				successHandler=self.onRootNodesAvailable,
 				failureHandler=self.showErrorMsg
 			)
 
-	def requestStructure( self ):
-		NetworkService.request( None,
-								"/vi/getStructure/%s" % self.module,
-								successHandler = self.receivedStructure
-								)
+	def requestStructure( self, usePrefetched=True ):
+		if usePrefetched and prefetcher.take("/vi/getStructure/%s" % self.module, None, self.receivedStructure,
+												lambda *args, **kwargs: self.requestStructure(False)):
+			return
+
+		scheduler.request( None,
+						   "/vi/getStructure/%s" % self.module,
+						   successHandler = self.receivedStructure,
+						   priority = "visible",
+						   conditional = True,
+						   shared = True
+						   )
 	def receivedStructure( self, resp ):
 		data = NetworkService.decode(resp)
 		for stype, structlist in data.items():
@@ -223,11 +248,15 @@ class TreeWidget(html5.Div):
 				self.selection.append(element)
 				element.addClass("is-focused")
 		elif self._isShiftPressed and self.selectionMulti:
-			self.selection =  self.entryFrame._children[min(self.entryFrame._children.index(element),self._currentRow): max(self.entryFrame._children.index(element),self._currentRow)+1]
+			ol = element.parent()
+			idx = self.positionOf(element)
+			start = idx if self._currentRow is None else min(self._currentRow, len(ol._children) - 1)
 
-			for x in self.entryFrame._children:
+			for x in self.selection:
 				x.removeClass("is-focused")
 
+			self.selection = ol._children[min(idx, start):max(idx, start) + 1]
+
 			for x in self.selection:
 				x.addClass("is-focused")
 
@@ -237,7 +266,7 @@ class TreeWidget(html5.Div):
 			element.addClass("is-focused")
 
 		if self.selectionMulti:
-			self._currentRow = self.entryFrame._children.index(element)
+			self._currentRow = self.positionOf(element)
 
 		self.selectionChangedEvent.fire(self, self.selection)
 
@@ -254,6 +283,24 @@ class TreeWidget(html5.Div):
 			else:
 				self.selectionActivatedEvent.fire(self, self.selection)
 
+	def positionOf(self, item):
+		"""
+			Returns the index of an item within the list it is shown in.
+
+			The positions of the last list asked for are kept and only computed again once
+			they don't match anymore, so selecting within a long list doesn't search it on each click.
+		"""
+		ol = item.parent()
+		cached, positions = self._positions
+		idx = positions.get(id(item)) if cached is ol else None
+
+		if idx is None or idx >= len(ol._children) or ol._children[idx] is not item:
+			positions = {id(child): i for i, child in enumerate(ol._children)}
+			self._positions = (ol, positions)
+			idx = positions[id(item)]
+
+		return idx
+
 	def requestChildren(self, element):
 		self.loadNode(element.data["key"])
 
@@ -276,42 +323,169 @@ class TreeWidget(html5.Div):
 		self.appendChild(errorDiv)
 
 	def onDataChanged(self, module,*args, **kwargs):
-		if module != self.module:
-			isRootNode = False
-			for k, v in conf["modules"].items():
-				if (k == module
-						and v.get("handler") == "list"
-						and self.module in v.get("changeInvalidates", [])):
-					isRootNode = True
-					break
-
-			if not isRootNode:
-				return
+		if module not in self.getChangeModules():
+			return
 
+		treeCache.onDataChanged(module, *args, **kwargs)
 		self.actionBar.widgets["selectrootnode"].update()
 
 		if not self.viewNodeStructure:
 			self.requestStructure()
-		else:
+		elif module != self.module or not self.refreshEntries(kwargs.get("events") or [kwargs]):
 			self.reloadData()
 
+	def refreshEntries(self, events):
+		"""
+			Fetches the nodes and leafs added or edited according to the given change events, and replaces their items.
+			Returns False if the tree has to be reloaded instead, e.g. for deletions or changes without a key.
+		"""
+		if self._currentRequests:
+			return False
+
+		if not all(event.get("key") and event.get("action") in ["add", "edit"]
+				   and event.get("skelType") in ["node", "leaf"] for event in events):
+			return False
+
+		for event in events:
+			callback = lambda values, skelType=event["skelType"], action=event["action"]: \
+				self.onEntryChanged(values, skelType, action)
+
+			values = entityStore.get(self.module, event["key"])  # the editor stored the saved entry
+
+			if values:
+				callback(values)
+			else:
+				entityLoader.load(self.module, event["key"], callback,
+								  failureHandler=lambda *args, **kwargs: self.reloadData(),
+								  skelType=event["skelType"], priority="interactive")
+
+		return True
+
+	def onEntryChanged(self, skel, skelType, action):
+		"""
+			Replaces the item of an edited entry, or adds the item of a new entry to its parent if it is shown.
+		"""
+		if self._currentRequests:  # reloading anyway
+			return
+
+		if skelType == "leaf" and not self.leafWidget:
+			return
+
+		item = self.itemForKey(skel["key"])
+
+		if item:
+			ol = item.parent()
+		elif action == "add":
+			ol = self.childListForKey(skel.get("parententry"))
+		else:
+			return
+
+		if ol is None:  # the parent isn't shown or its children weren't loaded yet
+			return
+
+		if skelType == "leaf":
+			widget = self.leafWidget(self.module, skel, self.viewLeafStructure, self)
+		else:
+			widget = self.nodeWidget(self.module, skel, self.viewNodeStructure, self)
+
+		if item:
+			ol.removeChild(item)
+			self.insertSorted(ol, [widget])
+			self.registerItem(widget, self._parentKeys.get(skel["key"]))
+
+			if item in self.selection:
+				self.selection[self.selection.index(item)] = widget
+				widget.addClass("is-focused")
+
+			if getattr(item, "isExpanded", False):
+				widget.toggleExpand()
+				widget.childrenLoaded = True
+				self.loadNode(skel["key"])
+		else:
+			self.insertSorted(ol, [widget])
+			self.registerItem(widget, skel.get("parententry"))
+
+			if ol != self.entryFrame:
+				ol.parent().removeClass("has-no-child")
+
+	def childListForKey(self, key):
+		"""
+			Returns the list showing the children of the given node, or None if they aren't shown.
+		"""
+		if key == self.entryFrameNode:
+			return self.entryFrame
+
+		item = self.itemForKey(key)
+		if item is None or not getattr(item, "childrenLoaded", False):
+			return None
+
+		return item.ol
+
+	def getChangeModules(self):
+		"""
+			Returns the modules which changes affect this tree.
+			These are the module itself, and list modules invalidating it by their "changeInvalidates" setting.
+		"""
+		modules = [self.module]
+
+		for k, v in conf["modules"].items():
+			if v.get("handler") == "list" and self.module in v.get("changeInvalidates", []):
+				modules.append(k)
+
+		return modules
+
 	def onAttach(self):
 		super(TreeWidget, self).onAttach()
-		NetworkService.registerChangeListener(self)
+		modules = self.getChangeModules()
+		changeDispatcher.register(self, modules)
+
+		# Catch up with changes that happened while this widget was hidden,
+		# or reload the data that was aborted when it was hidden
+		if self._reloadOnAttach or (self._changeGeneration is not None
+				and self._changeGeneration != changeDispatcher.generation(*modules)):
+			self.onDataChanged(self.module)
+
+		self._changeGeneration = None
+		self._reloadOnAttach = False
 
 	def onDetach(self):
 		super(TreeWidget, self).onDetach()
-		#NetworkService.removeChangeListener(self)
+		changeDispatcher.unregister(self)
+
+		if self.entryFrame._children:
+			self._expandedNodes = self.getExpandedNodes()
+			self.saveExpandedNodes()
+		self._changeGeneration = changeDispatcher.generation(*self.getChangeModules())
+
+		if self._currentRequests:
+			abortRequests(self._currentRequests)
+			self._reloadOnAttach = True
+
+	def abortRequests(self):
+		"""
+			Cancels all outstanding node and leaf requests, so superseded data is neither transferred nor decoded.
+		"""
+		abortRequests(self._currentRequests)
 
 	def itemForKey(self, key, elem=None):
 		"""
 			Returns the HierarchyWidget displaying the entry with the given key.
+
+			Items are looked up in an index maintained when they are inserted; an item removed
+			from the tree meanwhile is dropped from the index on lookup. If 'elem' is given,
+			its subtree is searched instead.
 			:param key: The key (id) of the item.
 			:type key: str
 			:returns: HierarchyItem
 		"""
 		if elem is None:
-			elem = self.entryFrame
+			item = self._itemsByKey.get(key)
+			if item is not None and not self.isShown(item):
+				self.unregisterItem(key)
+				item = None
+
+			return item
+
 		for child in elem._children:
 			if child.data["key"] == key:
 				return (child)
@@ -320,15 +494,49 @@ class TreeWidget(html5.Div):
 				return (tmp)
 		return (None)
 
+	def isShown(self, item):
+		"""
+			Checks if an item is still part of this tree.
+		"""
+		elem = item.parent()
+		while elem is not None and elem is not self.entryFrame:
+			elem = elem.parent()
+
+		return elem is self.entryFrame
+
+	def registerItem(self, item, parentKey):
+		self._itemsByKey[item.data["key"]] = item
+		self._parentKeys[item.data["key"]] = parentKey
+
+	def unregisterItem(self, key):
+		self._itemsByKey.pop(key, None)
+		self._parentKeys.pop(key, None)
+
+	def clearItems(self):
+		self._itemsByKey.clear()
+		self._parentKeys.clear()
+		self._positions = (None, {})
+
+	def parentKeyForKey(self, key):
+		"""
+			Returns the key of the node an item is shown in, or None if it isn't shown.
+		"""
+		if self.itemForKey(key) is None:
+			return None
+
+		return self._parentKeys.get(key)
+
 	def onSetDefaultRootNode(self, req):
 		"""
 			We requested the list of rootNodes for that module and that
 			request just finished. Parse the respone and set our rootNode
 			to the first rootNode received.
 		"""
-		data = NetworkService.decode(req)
-		if len(data) > 0:
-			self.setRootNode(data[0]["key"], self.node)
+		self.onRootNodesAvailable(NetworkService.decode(req))
+
+	def onRootNodesAvailable(self, rootNodes):
+		if len(rootNodes) > 0:
+			self.setRootNode(rootNodes[0]["key"], self.node)
 
 	def setRootNode(self, rootNode, node=None):
 		"""
@@ -352,7 +560,19 @@ class TreeWidget(html5.Div):
 		"""
 			Reload the data were displaying.
 		"""
+		if self.entryFrame._children:  # otherwise keep the expanded nodes restored from the localStorage
+			self._expandedNodes = self.getExpandedNodes()
+			self.saveExpandedNodes()
+
+		self.abortRequests()
+		self._restoreQueue = []
+		self.entryFrame.removeAllChildren()
+		self.clearItems()
+		self._cachedPages.clear()
+
+		self.loadNode(self.rootNode)
 
+	def getExpandedNodes(self):
 		def collectExpandedNodes(currNode):
 			res = []
 			for c in currNode.children():
@@ -364,11 +584,104 @@ class TreeWidget(html5.Div):
 
 			return res
 
-		self._expandedNodes = collectExpandedNodes(self.entryFrame)
-		self._currentRequests = []
-		self.entryFrame.removeAllChildren()
+		return set(collectExpandedNodes(self.entryFrame))
 
-		self.loadNode(self.rootNode)
+	def loadExpandedNodes(self):
+		if not conf["tree.restore.persist"]:
+			return set()
+
+		try:
+			return set(json.loads(html5.window.localStorage.getItem("vi.tree.expanded.%s" % self.module) or "[]"))
+		except:
+			return set()
+
+	def saveExpandedNodes(self):
+		if not conf["tree.restore.persist"]:
+			return
+
+		try:
+			html5.window.localStorage.setItem("vi.tree.expanded.%s" % self.module,
+											  json.dumps(list(self._expandedNodes)[:conf["tree.restore.maxPersisted"]]))
+		except:  # Storage may be disabled or full
+			pass
+
+	def getBatchFilter(self):
+		"""
+			Returns the parameter filtering children by several parent keys at once, or None if unsupported.
+		"""
+		moduleInfo = conf["modules"].get(self.module) or {}
+		return moduleInfo.get("batchedChildren", conf["tree.restore.batchFilter"])
+
+	def restoreNode(self, node):
+		"""
+			Queues loading the children of an expanded node. All nodes queued within one tick,
+			usually the expanded nodes of a level, share their requests.
+		"""
+		self._restoreQueue.append(node)
+
+		if not self._restoreScheduled:
+			self._restoreScheduled = True
+			DeferredCall(self.restoreQueued)
+
+	def restoreQueued(self, *args, **kwargs):
+		self._restoreScheduled = False
+		queue = self._restoreQueue
+		self._restoreQueue = []
+
+		if len(queue) == 1 or not self.getBatchFilter():
+			for node in queue:
+				self.loadNode(node)
+
+			return
+
+		batchSize = conf["tree.restore.batchSize"]
+		for i in range(0, len(queue), batchSize):
+			self.loadNodes(queue[i:i + batchSize])
+
+	def loadNodes(self, nodes, cursor=None, reqType=None, served=None):
+		"""
+			Fetches the children of several nodes with one request per type, filtering by all their keys.
+
+			Nodes which received no children by the end of the batch are loaded one by one once
+			more, as a server ignoring the batched filter can't be told apart from empty nodes.
+		"""
+		params = {
+			self.getBatchFilter(): nodes,
+			"orderby": "sortindex",
+			"amount": 99
+		}
+
+		if cursor:
+			params["cursor"] = cursor
+
+		if self.context:
+			params.update(self.context)
+
+		for skelType in [reqType] if reqType else ["node", "leaf"]:
+			if skelType == "leaf" and not self.leafWidget:
+				continue
+
+			r = scheduler.request(self.module, "list/%s" % skelType, dict(params),
+								  successHandler=skelIngest.wrap(self.onRequestSucceded),
+								  failureHandler=self.onLoadNodesFailed,
+								  priority="visible", conditional=True)
+			r.reqType = skelType
+			r.node = None
+			r.nodes = nodes
+			r.served = set(served or [])  # nodes which received children of this type
+			self._currentRequests.append(r)
+
+	def onLoadNodesFailed(self, req, *args, **kwargs):
+		"""
+			The server didn't accept the batched filter, so the nodes are loaded one by one.
+		"""
+		if req not in self._currentRequests:
+			return
+
+		self._currentRequests.remove(req)
+
+		for node in req.nodes:
+			self.loadNode(node, reqType=req.reqType)
 
 	def loadNode(self, node, cursor=None, reqType=None, overrideParams=None):
 		"""
@@ -376,8 +689,12 @@ class TreeWidget(html5.Div):
 			Once the list is received, append them to their parent node.
 			:param node: Key of the node to fetch
 			:type node: str
+
+			The first page of children is rendered from the treeCache if available; the
+			cached pages are replaced once the requests return something different.
 		"""
 		self.node = node
+		cacheKey = self.getCacheKey(node) if not overrideParams else None
 
 		params = {
 			"parententry": node,
@@ -395,12 +712,18 @@ class TreeWidget(html5.Div):
 			if self.context:
 				params.update(self.context)
 
-			r = NetworkService.request(self.module, "list/node",
-									   params,
-									   successHandler=self.onRequestSucceded,
-									   failureHandler=self.showErrorMsg)
+			if cacheKey is not None and not cursor:
+				self.renderCachedPages(node, cacheKey, "node")
+
+			r = scheduler.request(self.module, "list/node",
+								  params,
+								  successHandler=skelIngest.wrap(self.onRequestSucceded),
+								  failureHandler=self.showErrorMsg,
+								  priority="visible", conditional=True)
 			r.reqType = "node"
 			r.node = node
+			r.cursor = cursor
+			r.cacheKey = cacheKey
 			self._currentRequests.append(r)
 
 		def leafReq():
@@ -408,11 +731,17 @@ class TreeWidget(html5.Div):
 				if cursor:
 					params.update({"cursor": cursor})
 
-				r = NetworkService.request(self.module, "list/leaf", params,
-										   successHandler=self.onRequestSucceded,
-										   failureHandler=self.showErrorMsg)
+				if cacheKey is not None and not cursor:
+					self.renderCachedPages(node, cacheKey, "leaf")
+
+				r = scheduler.request(self.module, "list/leaf", params,
+									  successHandler=skelIngest.wrap(self.onRequestSucceded),
+									  failureHandler=self.showErrorMsg,
+									  priority="visible", conditional=True)
 				r.reqType = "leaf"
 				r.node = node
+				r.cursor = cursor
+				r.cacheKey = cacheKey
 				self._currentRequests.append(r)
 
 		if reqType == 'node':
@@ -423,6 +752,80 @@ class TreeWidget(html5.Div):
 			nodeReq()
 			leafReq()
 
+	def getCacheKey(self, node):
+		"""
+			Returns the key the children of 'node' are cached by in the treeCache.
+		"""
+		if not self.context:
+			return node
+
+		return "%s?%s" % (node, json.dumps(self.context, sort_keys=True))
+
+	def childListForNode(self, node):
+		"""
+			Returns the list the children of 'node' are inserted into.
+		"""
+		if node != self.rootNode:
+			tmp = self.itemForKey(node)
+			if tmp:
+				return tmp.ol
+
+		self.entryFrameNode = node
+		return self.entryFrame
+
+	def renderCachedPages(self, node, cacheKey, skelType):
+		"""
+			Renders the children of 'node' kept in the treeCache, until the requests revalidate them.
+		"""
+		ol = self.childListForNode(node)
+
+		for cursor, skellist, nextCursor in treeCache.getPages(self.module, cacheKey, skelType):
+			items = self.insertChildren(node, ol, [dict(skel) for skel in skellist], skelType)
+			self._cachedPages[(node, skelType, cursor)] = (skellist, nextCursor, items)
+
+	def dropCachedPages(self, node, skelType, cursor):
+		"""
+			Removes the items rendered from the cached page at 'cursor' and all cached pages following it.
+		"""
+		while (node, skelType, cursor) in self._cachedPages:
+			skellist, cursor, items = self._cachedPages.pop((node, skelType, cursor))
+
+			for item in items:
+				if item.parent():
+					item.parent().removeChild(item)
+
+				if self._itemsByKey.get(item.data["key"]) is item:
+					self.unregisterItem(item.data["key"])
+
+	def insertChildren(self, node, ol, skellist, skelType):
+		"""
+			Creates the items for 'skellist' and inserts them into 'ol', the list of children of 'node'.
+		"""
+		items = []
+		for skel in skellist:
+			if skelType == "leaf":
+				hi = self.leafWidget(self.module, skel, self.viewLeafStructure, self)
+			else:
+				hi = self.nodeWidget(self.module, skel, self.viewNodeStructure, self)
+			items.append(hi)
+
+		self.insertSorted(ol, items)
+
+		for hi in items:
+			self.registerItem(hi, node)
+			if hi.data["key"] in self._expandedNodes:
+				hi.toggleExpand()
+				if not hi.childrenLoaded:
+					hi.childrenLoaded = True
+					self.restoreNode(hi.data["key"])
+
+		if not ol._children and ol != self.entryFrame:
+			ol.parent().addClass("has-no-child")
+		elif ol._children and ol != self.entryFrame:
+			ol.parent().removeClass("has-no-child")
+
+		return items
+
 	def onRequestSucceded(self, req):
 		"""
 			The NetworkRequest for a (sub)node finished.
@@ -434,35 +837,55 @@ class TreeWidget(html5.Div):
 			return
 
 		self._currentRequests.remove(req)
-		data = NetworkService.decode(req)
+		data = skelIngest.decode(req)
+		entityStore.putList(self.module, data["skellist"])
+
+		if req.reqType == "node":
+			treeCache.putNodes(self.module, data["skellist"])
+
+		nodes = getattr(req, "nodes", None)
+
+		if nodes:  # children of several nodes, see loadNodes()
+			children = OrderedDict((node, []) for node in nodes)
+			for skel in data["skellist"]:
+				if skel.get("parententry") in children:
+					children[skel["parententry"]].append(skel)
+
+			targets = []
+			for node, skellist in children.items():
+				if skellist:
+					req.served.add(node)
+
+				tmp = self.itemForKey(node)
+				if tmp:
+					targets.append((node, tmp.ol, skellist))
 
-		if req.node == self.rootNode:
-			ol = self.entryFrame
 		else:
-			tmp = self.itemForKey(req.node)
-			if not tmp:
-				ol = self.entryFrame
-			else:
-				ol = tmp.ol
+			if req.cacheKey is not None:
+				treeCache.putPage(self.module, req.cacheKey, req.reqType, req.cursor, data["skellist"], data["cursor"])
 
-		for skel in data["skellist"]:
-			if req.reqType == "leaf":
-				hi = self.leafWidget(self.module, skel, self.viewLeafStructure, self)
+			cached = self._cachedPages.get((req.node, req.reqType, req.cursor))
+
+			if cached and cached[0] == data["skellist"] and cached[1] == data["cursor"]:
+				del self._cachedPages[(req.node, req.reqType, req.cursor)]  # already shown
+				targets = []
 			else:
-				hi = self.nodeWidget(self.module, skel, self.viewNodeStructure, self)
-			ol.appendChild(hi)
-			if hi.data["key"] in self._expandedNodes:
-				hi.toggleExpand()
-				if not hi.childrenLoaded:
-					hi.childrenLoaded = True
-					self.loadNode(hi.data["key"])
-		ol.sortChildren(self.getChildKey)
+				self.dropCachedPages(req.node, req.reqType, req.cursor)
+				targets = [(req.node, self.childListForNode(req.node), data["skellist"])]
 
-		if not ol._children and ol != self.entryFrame:
-			ol.parent().addClass("has-no-child")
+		for node, ol, skellist in targets:
+			self.insertChildren(node, ol, skellist, req.reqType)
 
 		if data["skellist"] and data["cursor"]:
-			self.loadNode(req.node, data["cursor"], req.reqType)
+			if nodes:
+				self.loadNodes(nodes, data["cursor"], req.reqType, req.served)
+			else:
+				self.loadNode(req.node, data["cursor"], req.reqType)
+
+		elif nodes:
+			for node in nodes:
+				if node not in req.served:
+					self.loadNode(node, reqType=req.reqType)
 
 		self.actionBar.resetLoadingState()
 
@@ -485,6 +908,43 @@ class TreeWidget(html5.Div):
 		event.preventDefault()
 		event.stopPropagation()
 
+	def insertSorted(self, ol, items):
+		"""
+			Inserts items into the already sorted children of 'ol', keeping them ordered by getChildKey().
+
+			Positions are found by binary search. The items belonging before the same child,
+			usually all of a batch, are collected in a DocumentFragment which is inserted at once,
+			so the list is changed once per position and existing children are never moved.
+		"""
+		items = sorted(items, key=self.getChildKey)
+		children = ol._children[:]
+		keys = [self.getChildKey(child) for child in children]
+
+		groups = OrderedDict()  # index of the following child -> items
+		for item in items:
+			groups.setdefault(bisect_right(keys, self.getChildKey(item)), []).append(item)
+
+		inserted = 0
+		for idx, group in groups.items():
+			fragment = html5.document.createDocumentFragment()
+
+			for item in group:
+				fragment.appendChild(item.element)
+				item._parent = ol
+
+			if idx < len(children):
+				ol.element.insertBefore(fragment, children[idx].element)
+			else:
+				ol.element.appendChild(fragment)
+
+			# The bookkeeping of html5.Widget.insertBefore()/appendChild()
+			ol._children[idx + inserted:idx + inserted] = group
+			inserted += len(group)
+
+			if ol._isAttached:
+				for item in group:
+					item.onAttach()
+
 	def getChildKey(self, widget):
 		"""
 			Order by sortindex
@@ -534,6 +994,7 @@ class TreeBrowserWidget(TreeWidget):
 		self.pathList = html5.Div()
 		self.pathList.addClass("vi-tree-breadcrumb")
 		self.appendChild(self.pathList, self.entryFrame)
+		self._pathGeneration = 0  # incremented with each rebuildPath(), to ignore responses for a former path
 
 	def reloadData(self):
 		super().reloadData()
@@ -544,36 +1005,45 @@ class TreeBrowserWidget(TreeWidget):
 			Rebuild the displayed path-list.
 		"""
 		self.pathList.removeAllChildren()
+		self._pathGeneration += 1
 
-		NetworkService.request(
-			self.module, "view/node/%s" % self.node,
-			successHandler=self.onPathRequestSucceded
-		)
+		self.extendPath(self.node, self._pathGeneration)
 
-	def onPathRequestSucceded(self, req):
+	def extendPath(self, key, generation):
 		"""
-			Rebuild the displayed path-list according to request data
+			Prepends the nodes from 'key' upwards to the path-list, as far as they are known to the treeCache.
+			Only the first unknown ancestor is fetched, the path continues from the nodes already seen.
+			Each parent's key is only known with its child, so the ancestors are fetched one after
+			another; the entityLoader shares the requests with the other views of the same tick.
 		"""
-		answ = NetworkService.decode(req)
-		skel = answ["values"]
+		path, missing = treeCache.getPath(self.module, key)
 
-		if skel["parententry"] and skel["parententry"] != skel["key"]:
-			c = BreadcrumbNodeWidget(self.module, skel, {"name":{"descr":"Name"}}, self)
+		for skel in path:
+			self.pathList.prependChild(BreadcrumbNodeWidget(self.module, skel, {"name":{"descr":"Name"}}, self))
 
-			NetworkService.request(
-				self.module, "view/node/%s" % skel["parententry"],
-				successHandler=self.onPathRequestSucceded
-			)
-
-		else:
-			c = BreadcrumbNodeWidget(self.module, {"key": self.rootNode, "name": "root"}, {"name":{"descr":"Name"}}, self)
-			c.addClass("is-rootnode")
+		if missing:
+			entityLoader.load(self.module, missing,
+							  lambda skel: self.onPathRequestSucceded(skel, generation),
+							  skelType="node")
+			return
 
+		c = BreadcrumbNodeWidget(self.module, {"key": self.rootNode, "name": "root"}, {"name":{"descr":"Name"}}, self)
+		c.addClass("is-rootnode")
 		self.pathList.prependChild(c)
 
+	def onPathRequestSucceded(self, skel, generation=None):
+		"""
+			Continue the displayed path-list with the fetched node
+		"""
+		treeCache.putNodes(self.module, [skel])
+
+		if generation is None or generation == self._pathGeneration:
+			self.extendPath(skel["key"], self._pathGeneration)
+
 	def activateSelection(self, element):
 		if isinstance(element, TreeNodeWidget):
 			self.entryFrame.removeAllChildren()
+			self.clearItems()
 			self.loadNode(element.data["key"])
 			self.rebuildPath()
 		else:
@@ -4,8 +4,9 @@ from flare.button import Button
 from flare.popup import Popup
 from flare.network import NetworkService, DeferredCall
 from vi.config import conf
+from vi.services.scheduler import scheduler
+from vi.services.tabs import tabBus
 from flare.i18n import translate
-import pyodide
 from datetime import datetime
 
 
@@ -27,12 +28,16 @@ class UserLogoutMsg(Popup):
 		self.popupFoot.appendChild(Button(translate("Refresh"), callback=self.startPolling))
 		self.popupFoot.appendChild(Button(translate("Login"), callback=self.showLoginWindow))
 
-		html5.document.addEventListener( "webkitvisibilitychange", pyodide.create_proxy(self.visibilityChanged) )
+		self.visibilityProxy = pyodide.create_proxy(self.visibilityChanged)
+		html5.document.addEventListener( "webkitvisibilitychange", self.visibilityProxy )
 
 		setInterval = html5.window.setInterval
 		self.interval = setInterval(pyodide.create_proxy(self.checkForSuspendResume), self.checkInterval)
 		self.hideMessage()
 
+		# Only the leading tab polls, the others receive its results
+		tabBus.on("session", self.onSessionMessage)
+
 	def visibilityChanged( self,e ):
 		if not html5.document.webkitHidden:
 			self.viIsActive = False
@@ -43,6 +48,15 @@ class UserLogoutMsg(Popup):
 		clearInterval = html5.window.clearInterval
 		clearInterval(self.interval)
 
+	def close(self, *args, **kwargs):
+		"""
+			Stops polling and listening to the other tabs, and removes this popup.
+		"""
+		self.stopInterval()
+		html5.document.removeEventListener( "webkitvisibilitychange", self.visibilityProxy )
+		tabBus.off("session", self.onSessionMessage)
+		super(UserLogoutMsg, self).close(*args, **kwargs)
+
 	def hideMessage(self):
 		"""
 			Make this popup invisible
@@ -68,7 +82,11 @@ class UserLogoutMsg(Popup):
 		"""
 			Test if at least self.pollIntervall seconds have passed and query the server if
 		"""
-		if (not self.viIsActive):
+		if not tabBus.isLeader():
+			return
+
+		# The other tabs rely on the leader, whether it is shown or not
+		if not self.viIsActive and not tabBus.getPeers():
 			return
 
 		if ((datetime.now() - self.lastChecked).seconds > self.pollInterval) or self.isCurrentlyFailed:
@@ -80,9 +98,10 @@ class UserLogoutMsg(Popup):
 			Start querying the server
 		"""
 
-		NetworkService.request("user", "view/self",
-		                       successHandler=self.onUserTestSuccess,
-		                       failureHandler=self.onUserTestFail)
+		scheduler.request("user", "view/self",
+		                  successHandler=self.onUserTestSuccess,
+		                  failureHandler=self.onUserTestFail,
+		                  priority="background")
 
 	def onUserTestSuccess(self, req):
 		"""
@@ -92,8 +111,11 @@ class UserLogoutMsg(Popup):
 			data = NetworkService.decode(req)
 		except:
 			self.showMessage()
+			tabBus.post("session", userKey=None)
 			return
 
+		tabBus.post("session", userKey=data["values"]["key"])
+
 		if self.isCurrentlyFailed:
 			if conf["currentUser"] != None and conf["currentUser"]["key"] == data["values"]["key"]:
 				self.hideMessage()
@@ -103,3 +125,15 @@ class UserLogoutMsg(Popup):
 			Error retrieving the current user response from the server
 		"""
 		self.showMessage()
+		tabBus.post("session", userKey=None)
+
+	def onSessionMessage(self, msg):
+		"""
+			Another tab polled the server
+		"""
+		self.lastChecked = datetime.now()
+
+		if not msg["userKey"]:
+			self.showMessage()
+		elif self.isCurrentlyFailed and conf["currentUser"] != None and conf["currentUser"]["key"] == msg["userKey"]:
+			self.hideMessage()